@@ -0,0 +1,182 @@
+"""
+Cost-aware admission control for API requests.
+
+Every route belongs to a cost class (``ENDPOINT_CLASSES``; unlisted routes are
+``medium``), and each class has its own concurrency limit and wait queue:
+
+- ``cheap``: health, metrics, quotes, info, history and search
+- ``medium``: per-symbol predictions, dashboards, screens and portfolios
+- ``expensive``: ensemble predictions, backtests and overlays, which train
+  several models per request
+
+A burst of expensive requests therefore queues behind its own small limit
+and never delays a cheap one. A request arriving at a full queue gets a
+``429`` with a ``Retry-After`` estimated from the class's recent service time
+and queue length. Clients may send their remaining budget in seconds as
+``X-Request-Timeout``. A request still queued when that budget runs out, or
+whose client has disconnected (checked for requests without a body, since
+probing reads the next message from the client), is dropped with a ``503``
+instead of doing work nobody will read.
+
+Time spent queued is exported per class (``stoky_admission_queue_seconds``)
+and as the ``queue`` stage of each request.
+"""
+
+import asyncio
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from metrics import observe_stage, record_admission_queue, record_admission_rejected, set_admission_load
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_CHEAP_CONCURRENCY = int(os.getenv("ADMISSION_CHEAP_CONCURRENCY", "64"))
+ADMISSION_CHEAP_QUEUE = int(os.getenv("ADMISSION_CHEAP_QUEUE", "256"))
+ADMISSION_MEDIUM_CONCURRENCY = int(os.getenv("ADMISSION_MEDIUM_CONCURRENCY", "8"))
+ADMISSION_MEDIUM_QUEUE = int(os.getenv("ADMISSION_MEDIUM_QUEUE", "32"))
+ADMISSION_EXPENSIVE_CONCURRENCY = int(os.getenv("ADMISSION_EXPENSIVE_CONCURRENCY", "2"))
+ADMISSION_EXPENSIVE_QUEUE = int(os.getenv("ADMISSION_EXPENSIVE_QUEUE", "8"))
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+ENDPOINT_CLASSES: Dict[str, str] = {
+    "/health": "cheap",
+    "/metrics": "cheap",
+    "/debug/profiles/{profile_id}": "cheap",
+    "/stock/search": "cheap",
+    "/stock/info/{symbol}": "cheap",
+    "/stock/quotes": "cheap",
+    "/stock/history/{symbol}": "cheap",
+    "/stock/predict/{symbol}": "medium",
+    "/stock/dashboard/{symbol}": "medium",
+    "/stock/model-info/{symbol}": "medium",
+    "/portfolio/analyze": "medium",
+    "/screen": "medium",
+    "/stock/predict-advanced/{symbol}": "expensive",
+    "/stock/model-info-advanced/{symbol}": "expensive",
+    "/stock/backtest/{symbol}": "expensive",
+    "/stock/predict-overlay/{symbol}": "expensive",
+}
+
+
+class AdmissionRejected(Exception):
+    """The request was not admitted; ``status`` and ``retry_after`` go to the client."""
+
+    MESSAGES = {
+        'queue_full': "Server busy, too many {} requests queued",
+        'deadline': "Request deadline passed while queued for a {} slot",
+        'disconnected': "Client disconnected while queued for a {} slot",
+    }
+
+    def __init__(self, cost_class: str, reason: str, status: int, retry_after: float):
+        super().__init__(self.MESSAGES[reason].format(cost_class))
+        self.cost_class = cost_class
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionClass:
+    """Concurrency limit and bounded wait queue of one cost class."""
+
+    # Weight of the newest request in the service time average
+    SERVICE_TIME_ALPHA = 0.2
+
+    def __init__(self, name: str, concurrency: int, queue_limit: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.active = 0
+        self.waiting = 0
+        self.service_seconds = 1.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore binds to the event loop it is first used on
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def _reject(self, reason: str, status: int) -> AdmissionRejected:
+        record_admission_rejected(self.name, reason)
+        return AdmissionRejected(self.name, reason, status, self.retry_after())
+
+    def retry_after(self) -> float:
+        """Seconds until a new request would likely get a slot."""
+        return max(1.0, self.service_seconds * (self.waiting + 1) / self.concurrency)
+
+    async def acquire(self, deadline: Optional[float] = None, disconnected=None):
+        """
+        Wait for a slot.
+
+        Args:
+            deadline (float): ``time.monotonic()`` after which the client no
+                longer wants the response, or None
+            disconnected: Optional coroutine function returning True once the
+                client has gone away; checked after queueing
+
+        Raises:
+            AdmissionRejected: If the queue is full (429), or the deadline
+                passed or the client disconnected while queued (503)
+        """
+        semaphore = self._get_semaphore()
+        if deadline is not None and deadline <= time.monotonic():
+            raise self._reject('deadline', 503)
+        if semaphore.locked() and self.waiting >= self.queue_limit:
+            raise self._reject('queue_full', 429)
+
+        start = time.monotonic()
+        self.waiting += 1
+        set_admission_load(self.name, self.active, self.waiting)
+        try:
+            timeout = None if deadline is None else deadline - start
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise self._reject('deadline', 503)
+        finally:
+            self.waiting -= 1
+            queued = time.monotonic() - start
+            record_admission_queue(self.name, queued)
+            observe_stage('queue', queued)
+
+        if disconnected is not None and queued > 0.001 and await disconnected():
+            semaphore.release()
+            raise self._reject('disconnected', 503)
+        self.active += 1
+        set_admission_load(self.name, self.active, self.waiting)
+
+    def release(self, service_seconds: float):
+        """Free a slot, folding the request's service time into the average."""
+        self.active -= 1
+        self.service_seconds += self.SERVICE_TIME_ALPHA * (service_seconds - self.service_seconds)
+        self._get_semaphore().release()
+        set_admission_load(self.name, self.active, self.waiting)
+
+
+_classes: Dict[str, AdmissionClass] = {
+    "cheap": AdmissionClass("cheap", ADMISSION_CHEAP_CONCURRENCY, ADMISSION_CHEAP_QUEUE),
+    "medium": AdmissionClass("medium", ADMISSION_MEDIUM_CONCURRENCY, ADMISSION_MEDIUM_QUEUE),
+    "expensive": AdmissionClass("expensive", ADMISSION_EXPENSIVE_CONCURRENCY, ADMISSION_EXPENSIVE_QUEUE),
+}
+
+
+def admission_class(endpoint: str) -> AdmissionClass:
+    """The cost class of the route template ``endpoint``."""
+    return _classes[ENDPOINT_CLASSES.get(endpoint, "medium")]
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """``time.monotonic()`` deadline from an ``X-Request-Timeout`` value (seconds), or None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        budget = float(value)
+    except ValueError:
+        return None
+    if not math.isfinite(budget):
+        return None
+    return time.monotonic() + budget
@@ -1,13 +1,19 @@
 import pandas as pd
 import numpy as np
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import logging
+import time
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, ExtraTreesRegressor
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.preprocessing import StandardScaler, RobustScaler
 from sklearn.metrics import r2_score
-import yfinance as yf
 from datetime import datetime
+import indicator_kernels
+from data_provider import DataProvider, get_data_provider
+from feature_selection import get_feature_columns
+from metrics import observe_model_training, observe_stage, timed_stage
+from model_store import FlatTreeEnsemble, ModelStore, get_model_store
+from model_tuning import model_params
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -28,14 +34,64 @@ class AdvancedStockPredictor:
     - Market sentiment indicators
     """
     
-    def __init__(self, symbol: str):
+    # Raw and target columns that are never used as model inputs
+    NON_FEATURE_COLUMNS = ['Target', 'Close', 'Open', 'High', 'Low', 'Volume']
+    
+    SMA_PERIODS = [5, 10, 20, 50, 100, 200]
+    EMA_PERIODS = [12, 26, 50, 100]
+    LAGS = [1, 2, 3, 5]
+    
+    # Derived feature -> intermediate column it is computed from
+    FEATURE_DEPENDENCIES = {
+        **{f'Price_SMA_{p}_Ratio': f'SMA_{p}' for p in SMA_PERIODS},
+        **{f'RSI_Lag_{lag}': 'RSI' for lag in LAGS},
+        'ATR_Ratio': 'ATR',
+    }
+    
+    ESTIMATORS = {
+        'random_forest': RandomForestRegressor,
+        'gradient_boosting': GradientBoostingRegressor,
+        'extra_trees': ExtraTreesRegressor,
+    }
+    # Used where ``model_tuning`` has saved no tuned config for the symbol
+    DEFAULT_PARAMS = {
+        'random_forest': {
+            'n_estimators': 50,       # Reduced from 200
+            'max_depth': 10,          # Reduced from 15
+            'min_samples_split': 5,
+            'min_samples_leaf': 2,
+            'random_state': 42,
+            'n_jobs': 2,              # Limited parallel jobs
+        },
+        'gradient_boosting': {
+            'n_estimators': 50,       # Reduced from 150
+            'learning_rate': 0.1,
+            'max_depth': 6,           # Reduced from 8
+            'random_state': 42,
+        },
+        'extra_trees': {
+            'n_estimators': 50,       # Reduced from 150
+            'max_depth': 8,           # Reduced from 12
+            'min_samples_split': 3,
+            'random_state': 42,
+            'n_jobs': 2,              # Limited parallel jobs
+        },
+    }
+    
+    def __init__(self, symbol: str, provider: Optional[DataProvider] = None, interval: str = "1d"):
         """
         Initialize the AdvancedStockPredictor with a stock symbol.
         
         Args:
             symbol (str): Stock symbol (e.g., 'AAPL', 'GOOGL')
+            provider (DataProvider, optional): Market-data source, defaults to
+                the configured provider
+            interval (str): Bar interval to train on and predict ('1d', or
+                intraday '1m', '5m', '15m', '1h'); ``Target`` is the next bar's close
         """
         self.symbol = symbol.upper()
+        self.provider = provider or get_data_provider()
+        self.interval = interval
         self.models = {}
         self.scaler = RobustScaler()
         self.is_trained = False
@@ -48,44 +104,31 @@ class AdvancedStockPredictor:
         
     def _initialize_models(self):
         """Initialize multiple ML models for ensemble prediction."""
-        self.models = {
-            'random_forest': RandomForestRegressor(
-                n_estimators=50,  # Reduced from 200
-                max_depth=10,     # Reduced from 15
-                min_samples_split=5,
-                min_samples_leaf=2,
-                random_state=42,
-                n_jobs=2          # Limited parallel jobs
-            ),
-            'gradient_boosting': GradientBoostingRegressor(
-                n_estimators=50,  # Reduced from 150
-                learning_rate=0.1,
-                max_depth=6,      # Reduced from 8
-                random_state=42
-            ),
-            'extra_trees': ExtraTreesRegressor(
-                n_estimators=50,  # Reduced from 150
-                max_depth=8,      # Reduced from 12
-                min_samples_split=3,
-                random_state=42,
-                n_jobs=2          # Limited parallel jobs
-            )
-        }
-        
+        self.models = self._new_models()
+    
+    def _new_models(self) -> Dict[str, Any]:
+        """Unfitted ensemble members, with the symbol's tuned settings if ``model_tuning`` saved any."""
+        params = model_params(self.symbol, 'advanced', self.interval, self.DEFAULT_PARAMS)
+        return {name: estimator(**params[name]) for name, estimator in self.ESTIMATORS.items()}
+    
     def fetch_stock_data(self, period: str = "3y") -> Optional[pd.DataFrame]:
         """
-        Fetch historical stock data using yfinance.
+        Fetch historical stock data from the market-data provider.
         
         Args:
             period (str): Time period for data ('1y', '2y', '3y', '5y', etc.)
             
         Returns:
             pd.DataFrame: Historical stock data or None if error
+            
+        Raises:
+            OSError: If the upstream is unavailable (``UpstreamUnavailable``,
+                connection errors, timeouts), so callers can answer 503 or
+                serve a cached result stale
         """
         try:
-            logger.info("Fetching %s data for %s", period, self.symbol)
-            ticker = yf.Ticker(self.symbol)
-            data = ticker.history(period=period)
+            logger.info("Fetching %s of %s bars for %s", period, self.interval, self.symbol)
+            data = self.provider.history(self.symbol, period=period, interval=self.interval)
             
             if data.empty:
                 logger.error("No data found for symbol %s", self.symbol)
@@ -94,7 +137,7 @@ class AdvancedStockPredictor:
             logger.info("Fetched %d trading days of data", len(data))
             return data
             
-        except (ValueError, KeyError, ConnectionError, TimeoutError) as e:
+        except (ValueError, KeyError) as e:
             logger.error("Error fetching data for %s: %s", self.symbol, e)
             return None
     
@@ -158,20 +201,17 @@ class AdvancedStockPredictor:
     def calculate_stochastic(self, data: pd.DataFrame, k_period: int = 14, d_period: int = 3) -> pd.DataFrame:
         """Calculate Stochastic Oscillator."""
         df = data.copy()
-        low_min = data['Low'].rolling(window=k_period).min()
-        high_max = data['High'].rolling(window=k_period).max()
-        
-        df['Stoch_K'] = 100 * (data['Close'] - low_min) / (high_max - low_min)
-        df['Stoch_D'] = df['Stoch_K'].rolling(window=d_period).mean()
-        
+        df['Stoch_K'], df['Stoch_D'] = indicator_kernels.stochastic(
+            data['High'].to_numpy(), data['Low'].to_numpy(), data['Close'].to_numpy(), k_period, d_period
+        )
         return df
     
     def calculate_williams_r(self, data: pd.DataFrame, period: int = 14) -> pd.Series:
         """Calculate Williams %R."""
-        high_max = data['High'].rolling(window=period).max()
-        low_min = data['Low'].rolling(window=period).min()
-        williams_r = -100 * (high_max - data['Close']) / (high_max - low_min)
-        return williams_r
+        williams_r = indicator_kernels.williams_r(
+            data['High'].to_numpy(), data['Low'].to_numpy(), data['Close'].to_numpy(), period
+        )
+        return pd.Series(williams_r, index=data.index)
     
     def calculate_atr(self, data: pd.DataFrame, period: int = 14) -> pd.Series:
         """Calculate Average True Range (ATR) for volatility."""
@@ -184,27 +224,11 @@ class AdvancedStockPredictor:
         return atr
     
     def calculate_adx(self, data: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-        """Calculate Average Directional Index (ADX)."""
-        df = data.copy()
-        
-        # Calculate True Range
-        df['TR'] = self.calculate_atr(data, 1)
-        
-        # Calculate Directional Movement
-        df['DM_Plus'] = np.where((data['High'] - data['High'].shift()) > (data['Low'].shift() - data['Low']),
-                                np.maximum(data['High'] - data['High'].shift(), 0), 0)
-        df['DM_Minus'] = np.where((data['Low'].shift() - data['Low']) > (data['High'] - data['High'].shift()),
-                                 np.maximum(data['Low'].shift() - data['Low'], 0), 0)
-        
-        # Calculate Directional Indicators
-        df['DI_Plus'] = 100 * (df['DM_Plus'].rolling(window=period).mean() / df['TR'].rolling(window=period).mean())
-        df['DI_Minus'] = 100 * (df['DM_Minus'].rolling(window=period).mean() / df['TR'].rolling(window=period).mean())
-        
-        # Calculate ADX
-        df['DX'] = 100 * np.abs(df['DI_Plus'] - df['DI_Minus']) / (df['DI_Plus'] + df['DI_Minus'])
-        df['ADX'] = df['DX'].rolling(window=period).mean()
-        
-        return df[['DI_Plus', 'DI_Minus', 'ADX']]
+        """Calculate Average Directional Index (ADX) with its directional indicators."""
+        di_plus, di_minus, adx = indicator_kernels.adx(
+            data['High'].to_numpy(), data['Low'].to_numpy(), data['Close'].to_numpy(), period
+        )
+        return pd.DataFrame({'DI_Plus': di_plus, 'DI_Minus': di_minus, 'ADX': adx}, index=data.index)
     
     def calculate_volume_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
         """Calculate volume-based indicators."""
@@ -215,40 +239,35 @@ class AdvancedStockPredictor:
         df['Volume_SMA_20'] = data['Volume'].rolling(window=20).mean()
         df['Volume_Ratio'] = data['Volume'] / df['Volume_SMA_20']
         
-        # On-Balance Volume (OBV)
-        df['OBV'] = (np.sign(data['Close'].diff()) * data['Volume']).fillna(0).cumsum()
-        
-        # Volume Price Trend (VPT)
-        df['VPT'] = (data['Volume'] * data['Close'].pct_change()).fillna(0).cumsum()
+        # On-Balance Volume (OBV) and Volume Price Trend (VPT)
+        df['OBV'], df['VPT'] = indicator_kernels.obv_vpt(data['Close'].to_numpy(), data['Volume'].to_numpy())
         
         return df
     
     def calculate_price_patterns(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Calculate price pattern indicators."""
+        """Calculate price gap, doji and hammer pattern flags."""
         df = data.copy()
-        
-        # Price gaps
-        df['Gap_Up'] = np.where(data['Open'] > data['High'].shift(), 1, 0)
-        df['Gap_Down'] = np.where(data['Open'] < data['Low'].shift(), 1, 0)
-        
-        # Doji patterns
-        body_size = np.abs(data['Close'] - data['Open'])
-        candle_size = data['High'] - data['Low']
-        df['Doji'] = np.where(body_size < (candle_size * 0.1), 1, 0)
-        
-        # Hammer patterns
-        lower_shadow = np.minimum(data['Open'], data['Close']) - data['Low']
-        upper_shadow = data['High'] - np.maximum(data['Open'], data['Close'])
-        df['Hammer'] = np.where((lower_shadow > 2 * body_size) & (upper_shadow < body_size), 1, 0)
+        patterns = indicator_kernels.candle_patterns(
+            data['Open'].to_numpy(), data['High'].to_numpy(), data['Low'].to_numpy(), data['Close'].to_numpy()
+        )
+        for name, flags in zip(['Gap_Up', 'Gap_Down', 'Doji', 'Hammer'], patterns):
+            df[name] = np.nan_to_num(flags).astype(np.int64)
         
         return df
     
-    def create_advanced_features(self, data: pd.DataFrame) -> pd.DataFrame:
+    @timed_stage('features')
+    def create_advanced_features(self, data: pd.DataFrame, include_target: bool = True,
+                                 columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Create comprehensive technical indicator features for machine learning.
         
         Args:
             data (pd.DataFrame): Raw stock data
+            include_target (bool): Add the next-day ``Target`` column. Disable it
+                to keep the most recent bar, which has no target yet.
+            columns (List[str], optional): Compute only these feature columns
+                (e.g. a persisted feature set); None computes all of them.
+                Rows are dropped only for NaNs in the columns returned.
             
         Returns:
             pd.DataFrame: Data with advanced technical indicator features
@@ -256,80 +275,120 @@ class AdvancedStockPredictor:
         try:
             logger.info("Creating advanced features for %s", self.symbol)
             
+            wanted = None if columns is None else set(columns)
+            if wanted is not None:
+                wanted |= {self.FEATURE_DEPENDENCIES[c] for c in wanted if c in self.FEATURE_DEPENDENCIES}
+            
+            def need(*names: str) -> bool:
+                return wanted is None or not wanted.isdisjoint(names)
+            
             # Create a copy to avoid modifying original data
             df = data.copy()
             
             # Basic price features
-            df['Price_Change'] = data['Close'].pct_change()
-            df['Price_Change_2d'] = data['Close'].pct_change(periods=2)
-            df['Price_Change_5d'] = data['Close'].pct_change(periods=5)
-            df['High_Low_Ratio'] = data['High'] / data['Low']
-            df['Open_Close_Ratio'] = data['Open'] / data['Close']
+            if need('Price_Change'):
+                df['Price_Change'] = data['Close'].pct_change()
+            if need('Price_Change_2d'):
+                df['Price_Change_2d'] = data['Close'].pct_change(periods=2)
+            if need('Price_Change_5d'):
+                df['Price_Change_5d'] = data['Close'].pct_change(periods=5)
+            if need('High_Low_Ratio'):
+                df['High_Low_Ratio'] = data['High'] / data['Low']
+            if need('Open_Close_Ratio'):
+                df['Open_Close_Ratio'] = data['Open'] / data['Close']
             
             # Moving averages
-            sma_periods = [5, 10, 20, 50, 100, 200]
-            ema_periods = [12, 26, 50, 100]
+            sma_periods = [p for p in self.SMA_PERIODS if need(f'SMA_{p}', f'SMA_{p}_slope')]
+            ema_periods = [p for p in self.EMA_PERIODS if need(f'EMA_{p}')]
             
             df = self.calculate_advanced_sma(df, sma_periods)
             df = self.calculate_ema(df, ema_periods)
             
             # Price relative to moving averages
             for period in sma_periods:
-                df[f'Price_SMA_{period}_Ratio'] = data['Close'] / df[f'SMA_{period}']
+                if need(f'Price_SMA_{period}_Ratio'):
+                    df[f'Price_SMA_{period}_Ratio'] = data['Close'] / df[f'SMA_{period}']
                 
             # Bollinger Bands
-            df = self.calculate_bollinger_bands(df)
+            if need('BB_Upper', 'BB_Lower', 'BB_Middle', 'BB_Width', 'BB_Position'):
+                df = self.calculate_bollinger_bands(df)
             
             # Momentum indicators
-            df['RSI'] = self.calculate_rsi(data)
-            df['RSI_14'] = self.calculate_rsi(data, 14)
-            df['RSI_21'] = self.calculate_rsi(data, 21)
+            if need('RSI'):
+                df['RSI'] = self.calculate_rsi(data)
+            if need('RSI_14'):
+                df['RSI_14'] = self.calculate_rsi(data, 14)
+            if need('RSI_21'):
+                df['RSI_21'] = self.calculate_rsi(data, 21)
             
             # MACD
-            macd_df = self.calculate_macd(data)
-            df = pd.concat([df, macd_df[['MACD', 'MACD_Signal', 'MACD_Histogram']]], axis=1)
+            if need('MACD', 'MACD_Signal', 'MACD_Histogram'):
+                macd_df = self.calculate_macd(data)
+                df = pd.concat([df, macd_df[['MACD', 'MACD_Signal', 'MACD_Histogram']]], axis=1)
             
             # Stochastic
-            stoch_df = self.calculate_stochastic(data)
-            df = pd.concat([df, stoch_df[['Stoch_K', 'Stoch_D']]], axis=1)
+            if need('Stoch_K', 'Stoch_D'):
+                stoch_df = self.calculate_stochastic(data)
+                df = pd.concat([df, stoch_df[['Stoch_K', 'Stoch_D']]], axis=1)
             
             # Williams %R
-            df['Williams_R'] = self.calculate_williams_r(data)
+            if need('Williams_R'):
+                df['Williams_R'] = self.calculate_williams_r(data)
             
             # Volatility indicators
-            df['ATR'] = self.calculate_atr(data)
-            df['ATR_Ratio'] = df['ATR'] / data['Close']
+            if need('ATR'):
+                df['ATR'] = self.calculate_atr(data)
+            if need('ATR_Ratio'):
+                df['ATR_Ratio'] = df['ATR'] / data['Close']
             
             # ADX
-            adx_df = self.calculate_adx(data)
-            df = pd.concat([df, adx_df], axis=1)
+            if need('DI_Plus', 'DI_Minus', 'ADX'):
+                adx_df = self.calculate_adx(data)
+                df = pd.concat([df, adx_df], axis=1)
             
             # Volume indicators
-            volume_df = self.calculate_volume_indicators(df)
-            df = pd.concat([df, volume_df[['Volume_SMA_10', 'Volume_SMA_20', 'Volume_Ratio', 'OBV', 'VPT']]], axis=1)
+            if need('Volume_SMA_10', 'Volume_SMA_20', 'Volume_Ratio', 'OBV', 'VPT'):
+                volume_df = self.calculate_volume_indicators(data)
+                df = pd.concat([df, volume_df[['Volume_SMA_10', 'Volume_SMA_20', 'Volume_Ratio', 'OBV', 'VPT']]], axis=1)
             
             # Price patterns
-            pattern_df = self.calculate_price_patterns(data)
-            df = pd.concat([df, pattern_df[['Gap_Up', 'Gap_Down', 'Doji', 'Hammer']]], axis=1)
+            if need('Gap_Up', 'Gap_Down', 'Doji', 'Hammer'):
+                pattern_df = self.calculate_price_patterns(data)
+                df = pd.concat([df, pattern_df[['Gap_Up', 'Gap_Down', 'Doji', 'Hammer']]], axis=1)
             
             # Lagged features
-            for lag in [1, 2, 3, 5]:
-                df[f'Close_Lag_{lag}'] = data['Close'].shift(lag)
-                df[f'Volume_Lag_{lag}'] = data['Volume'].shift(lag)
-                df[f'RSI_Lag_{lag}'] = df['RSI'].shift(lag)
+            for lag in self.LAGS:
+                if need(f'Close_Lag_{lag}'):
+                    df[f'Close_Lag_{lag}'] = data['Close'].shift(lag)
+                if need(f'Volume_Lag_{lag}'):
+                    df[f'Volume_Lag_{lag}'] = data['Volume'].shift(lag)
+                if need(f'RSI_Lag_{lag}'):
+                    df[f'RSI_Lag_{lag}'] = df['RSI'].shift(lag)
             
             # Rolling statistics
-            df['Close_Rolling_Std_10'] = data['Close'].rolling(window=10).std()
-            df['Close_Rolling_Std_20'] = data['Close'].rolling(window=20).std()
-            df['Volume_Rolling_Std_10'] = data['Volume'].rolling(window=10).std()
+            if need('Close_Rolling_Std_10'):
+                df['Close_Rolling_Std_10'] = data['Close'].rolling(window=10).std()
+            if need('Close_Rolling_Std_20'):
+                df['Close_Rolling_Std_20'] = data['Close'].rolling(window=20).std()
+            if need('Volume_Rolling_Std_10'):
+                df['Volume_Rolling_Std_10'] = data['Volume'].rolling(window=10).std()
             
             # Market timing features
-            df['Day_of_Week'] = df.index.dayofweek
-            df['Month'] = df.index.month
-            df['Quarter'] = df.index.quarter
-            
-            # Target variable (next day's closing price)
-            df['Target'] = data['Close'].shift(-1)
+            if need('Day_of_Week'):
+                df['Day_of_Week'] = df.index.dayofweek
+            if need('Month'):
+                df['Month'] = df.index.month
+            if need('Quarter'):
+                df['Quarter'] = df.index.quarter
+            
+            # Target variable (next bar's closing price)
+            if include_target:
+                df['Target'] = data['Close'].shift(-1)
+            
+            # Keep only the requested columns (intermediates included above are dropped)
+            if columns is not None:
+                keep = set(columns) | set(self.NON_FEATURE_COLUMNS)
+                df = df[[c for c in df.columns if c in keep]]
             
             # Remove rows with NaN values
             df = df.dropna()
@@ -341,12 +400,15 @@ class AdvancedStockPredictor:
             logger.error("Error creating features: %s", e)
             return None
     
-    def train_models(self, data: pd.DataFrame) -> bool:
+    @timed_stage('training')
+    def train_models(self, data: pd.DataFrame, cv_splits: int = 5) -> bool:
         """
         Train multiple ML models using time series validation.
         
         Args:
             data (pd.DataFrame): Prepared data with features
+            cv_splits (int): Time series CV folds used to score (and weight)
+                each model. 0 skips validation and weights models equally.
             
         Returns:
             bool: True if training successful, False otherwise
@@ -354,8 +416,12 @@ class AdvancedStockPredictor:
         try:
             logger.info("Starting model training with time series validation")
             
+            # Published (memory-mapped) models are read-only; start from fresh estimators
+            if any(isinstance(model, FlatTreeEnsemble) for model in self.models.values()):
+                self._initialize_models()
+            
             # Prepare features and target
-            feature_cols = [col for col in data.columns if col not in ['Target', 'Close', 'Open', 'High', 'Low', 'Volume']]
+            feature_cols = [col for col in data.columns if col not in self.NON_FEATURE_COLUMNS]
             self.feature_columns = feature_cols
             
             X = data[feature_cols]
@@ -364,7 +430,7 @@ class AdvancedStockPredictor:
             logger.info("Training with %d features and %d samples", len(feature_cols), len(X))
             
             # Time series split for validation
-            tscv = TimeSeriesSplit(n_splits=5)
+            tscv = TimeSeriesSplit(n_splits=cv_splits) if cv_splits else None
             
             # Scale features
             X_scaled = self.scaler.fit_transform(X)
@@ -372,10 +438,11 @@ class AdvancedStockPredictor:
             # Train each model
             for name, model in self.models.items():
                 logger.info("Training %s", name)
+                start = time.perf_counter()
                 
                 # Time series cross-validation
                 cv_scores = []
-                for train_idx, val_idx in tscv.split(X_scaled):
+                for train_idx, val_idx in (tscv.split(X_scaled) if tscv else []):
                     X_train, X_val = X_scaled[train_idx], X_scaled[val_idx]
                     y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
                     
@@ -396,9 +463,12 @@ class AdvancedStockPredictor:
                     cv_scores.append(score)
                 
                 # Store average CV score
-                avg_score = np.mean(cv_scores)
-                self.model_scores[name] = avg_score
-                logger.info("%s CV Score: %.4f", name, avg_score)
+                if cv_scores:
+                    avg_score = np.mean(cv_scores)
+                    self.model_scores[name] = avg_score
+                    logger.info("%s CV Score: %.4f", name, avg_score)
+                else:
+                    self.model_scores[name] = 1.0
                 
                 # Final training on all data
                 if name == 'neural_network':
@@ -409,6 +479,8 @@ class AdvancedStockPredictor:
                     self.models[f'{name}_y_scaler'] = y_scaler
                 else:
                     model.fit(X_scaled, y)
+                
+                observe_model_training(name, time.perf_counter() - start)
             
             # Calculate feature importance for tree-based models
             self._calculate_feature_importance()
@@ -421,6 +493,36 @@ class AdvancedStockPredictor:
             logger.error("Error training models: %s", e)
             return False
     
+    def cross_validate(self, data: pd.DataFrame, columns: List[str], cv_splits: int = 3) -> Tuple[float, Dict[str, float]]:
+        """
+        Score a feature subset with fresh ensemble members over a time series CV,
+        without touching the fitted models.
+        
+        Args:
+            data (pd.DataFrame): Prepared data with features and ``Target``
+            columns (List[str]): Feature columns to train on
+            cv_splits (int): Time series CV folds
+            
+        Returns:
+            Tuple[float, Dict[str, float]]: Mean R² of the members across folds,
+                and each column's importance averaged over the members (from
+                the last, largest fold)
+        """
+        X = data[columns].to_numpy(dtype=np.float64)
+        y = data['Target'].to_numpy(dtype=np.float64)
+        splits = list(TimeSeriesSplit(n_splits=cv_splits).split(X))
+        
+        scores = []
+        importance = np.zeros(len(columns))
+        models = self._new_models()
+        for model in models.values():
+            for train_idx, val_idx in splits:
+                model.fit(X[train_idx], y[train_idx])
+                scores.append(r2_score(y[val_idx], model.predict(X[val_idx])))
+            importance += model.feature_importances_
+        
+        return float(np.mean(scores)), dict(zip(columns, (importance / len(models)).tolist()))
+    
     def _calculate_feature_importance(self):
         """Calculate feature importance from tree-based models."""
         try:
@@ -449,6 +551,38 @@ class AdvancedStockPredictor:
         except (KeyError, AttributeError, ValueError) as e:
             logger.error("Error calculating feature importance: %s", e)
     
+    def predict_batch(self, features: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Score every row of a feature frame with one batched ``predict`` call
+        per ensemble member.
+        
+        Args:
+            features (pd.DataFrame): Output of ``create_advanced_features``
+            
+        Returns:
+            Dict[str, np.ndarray]: Predicted next-day closes per model, plus
+                the score-weighted ``ensemble``
+        """
+        if not self.is_trained:
+            raise ValueError("Models not trained. Call train_models() first.")
+        
+        inference_start = time.perf_counter()
+        X_scaled = self.scaler.transform(features[self.feature_columns].values)
+        
+        predictions = {}
+        for name, model in self.models.items():
+            if name.endswith('_y_scaler'):
+                continue
+            pred = model.predict(X_scaled)
+            if name == 'neural_network':
+                pred = self.models[f'{name}_y_scaler'].inverse_transform(pred.reshape(-1, 1)).ravel()
+            predictions[name] = pred
+        
+        weights = np.array([self.model_scores.get(name, 0.5) for name in predictions])
+        predictions['ensemble'] = np.average(np.vstack(list(predictions.values())), axis=0, weights=weights)
+        observe_stage('inference', time.perf_counter() - inference_start)
+        return predictions
+    
     def predict_ensemble(self, data: pd.DataFrame) -> Dict[str, Any]:
         """
         Make ensemble predictions using multiple models.
@@ -463,8 +597,8 @@ class AdvancedStockPredictor:
             if not self.is_trained:
                 raise ValueError("Models not trained. Call train_models() first.")
             
-            # Prepare features
-            features_df = self.create_advanced_features(data)
+            # Prepare features (only the columns the models were trained on)
+            features_df = self.create_advanced_features(data, columns=self.feature_columns)
             if features_df is None or len(features_df) == 0:
                 raise ValueError("Failed to create features")
             
@@ -475,6 +609,7 @@ class AdvancedStockPredictor:
             # Get predictions from all models
             predictions = {}
             weights = {}
+            inference_start = time.perf_counter()
             
             for name, model in self.models.items():
                 if name.endswith('_y_scaler'):
@@ -495,6 +630,8 @@ class AdvancedStockPredictor:
                     logger.warning("Error with %s prediction: %s", name, e)
                     continue
             
+            observe_stage('inference', time.perf_counter() - inference_start)
+            
             if not predictions:
                 raise ValueError("No successful predictions from any model")
             
@@ -533,6 +670,7 @@ class AdvancedStockPredictor:
                 'prediction_std': float(prediction_std),
                 'prediction_range': float(prediction_range),
                 'prediction_date': datetime.now().isoformat(),
+                'interval': self.interval,
                 'symbol': self.symbol
             }
             
@@ -540,6 +678,67 @@ class AdvancedStockPredictor:
             logger.error("Error making prediction: %s", e)
             return None
     
+    def _store_key(self, period: str) -> str:
+        suffix = f"-{self.interval}" if self.interval != "1d" else ""
+        return f"advanced-{self.symbol}-{period}{suffix}"
+    
+    def publish(self, data_end: str, period: str, store: Optional[ModelStore] = None) -> bool:
+        """
+        Publish the fitted ensemble to the shared model store and switch to the
+        memory-mapped copy, so other workers can serve it without retraining.
+        
+        Args:
+            data_end (str): Timestamp of the last bar the models were trained on
+            period (str): Training data period
+            store (ModelStore, optional): Defaults to the process-wide store
+            
+        Returns:
+            bool: True if the models were published
+        """
+        store = store or get_model_store()
+        members = {name: model for name, model in self.models.items() if not name.endswith('_y_scaler')}
+        if store is None or not self.is_trained or not all(FlatTreeEnsemble.supports(m) for m in members.values()):
+            return False
+        
+        try:
+            key = self._store_key(period)
+            store.publish(key, members, meta={
+                'data_end': data_end,
+                'feature_columns': self.feature_columns,
+                'model_scores': {name: float(score) for name, score in self.model_scores.items()},
+                'feature_importance': {name: float(value) for name, value in self.feature_importance.items()},
+            }, extras={'scaler': self.scaler})
+            return self.load_published(data_end, period, store)
+        except OSError as e:
+            logger.warning("Could not publish models for %s: %s", self.symbol, e)
+            return False
+    
+    def load_published(self, data_end: str, period: str, store: Optional[ModelStore] = None) -> bool:
+        """
+        Use models another worker published for the same data, if any.
+        
+        Args:
+            data_end (str): Timestamp of the latest bar; older models are ignored
+            period (str): Training data period
+            store (ModelStore, optional): Defaults to the process-wide store
+            
+        Returns:
+            bool: True if published models were loaded
+        """
+        store = store or get_model_store()
+        stored = store.load(self._store_key(period)) if store is not None else None
+        if stored is None or stored.meta.get('data_end') != data_end:
+            return False
+        
+        self.models = dict(stored.models)
+        self.scaler = stored.extras['scaler']
+        self.feature_columns = stored.meta['feature_columns']
+        self.model_scores = stored.meta['model_scores']
+        self.feature_importance = stored.meta['feature_importance']
+        self.is_trained = True
+        logger.info("Using published models for %s (%s)", self.symbol, stored.version)
+        return True
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the trained models."""
         if not self.is_trained:
@@ -570,14 +769,20 @@ class AdvancedStockPredictor:
             if data is None:
                 return None
             
-            # Create features and train
-            features_df = self.create_advanced_features(data)
+            # Reuse models already trained on this data by any worker
+            data_end = data.index[-1].isoformat()
+            if self.load_published(data_end, period):
+                return self.predict_ensemble(data)
+            
+            # Create the symbol's selected features (all of them if none are selected) and train
+            features_df = self.create_advanced_features(data, columns=get_feature_columns(self))
             if features_df is None:
                 return None
             
             # Train models
             if not self.train_models(features_df):
                 return None
+            self.publish(data_end, period)
             
             # Make prediction
             prediction = self.predict_ensemble(data)
@@ -1,28 +1,119 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Match
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+import importlib
 import logging
-import yfinance as yf
+import math
+import os
+import threading
+import time
 from datetime import datetime, timedelta
-import uvicorn
 
-from model import StockPredictor
-from advanced_model import AdvancedStockPredictor
+from admission import ADMISSION_ENABLED, DEADLINE_HEADER, AdmissionRejected, admission_class, parse_deadline
+from cluster import RELAYED_HEADERS, SERVED_BY_HEADER, get_cluster
 from currency_utils import get_currency_from_symbol, get_exchange_name
+from compute import run_compute, run_io
+from metrics import (
+    IN_FLIGHT, REQUEST_SECONDS, current_endpoint, record_cluster_request, render_latest, request_timings,
+    server_timing_header, stage_timer
+)
+from profiling import SamplingProfiler, current_profiler, is_operator, load_profile
+from swr_cache import SWRCache, is_stale, served_stale
+from upstream import UpstreamUnavailable
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+# One access-log line per request with its stage timings (off by default)
+REQUEST_LOG = os.getenv("REQUEST_LOG", "false").lower() in ("1", "true", "yes")
+
+# Predictions are stale-while-revalidate: served for PREDICTION_SOFT_TTL
+# seconds, then served while a background recompute runs until PREDICTION_HARD_TTL
+PREDICTION_SOFT_TTL = float(os.getenv("PREDICTION_SOFT_TTL", "900"))
+PREDICTION_HARD_TTL = float(os.getenv("PREDICTION_HARD_TTL", "3600"))
+_prediction_cache = SWRCache('prediction', PREDICTION_SOFT_TTL, PREDICTION_HARD_TTL)
+
+# Most symbols one /stock/quotes request may ask for
+MAX_BATCH_SYMBOLS = int(os.getenv("MAX_BATCH_SYMBOLS", "50"))
+# Most holdings one /portfolio/analyze request may include
+MAX_PORTFOLIO_SYMBOLS = int(os.getenv("MAX_PORTFOLIO_SYMBOLS", "1000"))
+# Largest absolute share count per holding; beyond it portfolio values overflow float64
+MAX_PORTFOLIO_UNITS = 1e12
+
+# pandas, sklearn and the predictors are imported on first use so /health
+# answers as soon as the worker is up. PRELOAD_MODULES imports them (and loads
+# the pooled model) on a background thread right after startup instead.
+PRELOAD_MODULES = os.getenv("PRELOAD_MODULES", "true").lower() in ("1", "true", "yes")
+HEAVY_MODULES = ('pandas', 'data_provider', 'sklearn.ensemble', 'model', 'advanced_model',
+                 'pooled_model', 'backtest', 'indicator_kernels')
+
+def _preload():
+    """Import the heavy modules, load the pooled model, the symbol list and the JIT kernels ahead of the first request."""
+    start = time.perf_counter()
+    try:
+        for name in HEAVY_MODULES:
+            importlib.import_module(name)
+        import indicator_kernels
+        from pooled_model import get_pooled_predictor
+        from symbol_directory import get_symbol_directory
+        get_pooled_predictor()
+        get_symbol_directory()
+        indicator_kernels.warm_up()
+        logger.info("Preloaded %d modules in %.2fs", len(HEAVY_MODULES), time.perf_counter() - start)
+    except Exception as e:
+        logger.error("Background preload failed: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail at startup, not on the first request, if the cluster config is broken
+    get_cluster()
+    if PRELOAD_MODULES:
+        threading.Thread(target=_preload, name="stoky-preload", daemon=True).start()
+    yield
+
+def _upstream_busy(e: UpstreamUnavailable) -> HTTPException:
+    """503 telling the client when the upstream is worth retrying."""
+    return HTTPException(
+        status_code=503,
+        detail="Market data provider is unavailable, please retry later",
+        headers={"Retry-After": str(math.ceil(e.retry_after))}
+    )
+
+def _target_currency(convert_to: Optional[str]) -> Optional[str]:
+    """Validated ``convert_to`` currency code, or None when no conversion was asked for."""
+    if convert_to is None:
+        return None
+    from fx import CURRENCIES
+    
+    currency = convert_to.upper().strip()
+    if currency not in CURRENCIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported currency: {convert_to}. Must be one of: {', '.join(CURRENCIES)}"
+        )
+    return currency
+
+class TimedJSONResponse(JSONResponse):
+    """JSON response that records body encoding as the ``serialization`` stage."""
+
+    def render(self, content: Any) -> bytes:
+        with stage_timer('serialization'):
+            return super().render(content)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Stock Advisor API",
     description="A FastAPI backend for stock analysis and price prediction",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=TimedJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware for frontend compatibility
@@ -34,6 +125,155 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _route_template(scope) -> str:
+    """Return the route path template (e.g. ``/stock/info/{symbol}``) for metric labels."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+def _symbol_param(scope) -> Optional[str]:
+    """The ``{symbol}`` path parameter of the matched route, if it has one."""
+    for route in app.router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return child_scope.get("path_params", {}).get("symbol")
+    return None
+
+def _profiling_requested(request: Request) -> bool:
+    """True when an operator asked for this request to be profiled."""
+    wants_profile = request.query_params.get("profile") == "1" or request.headers.get("x-profile") == "1"
+    return wants_profile and is_operator(request.headers.get("x-operator-token"))
+
+# Middleware registered first runs innermost: admission sees only requests
+# served on this node, and track_requests (outermost) sees every request
+
+@app.middleware("http")
+async def admit_requests(request: Request, call_next):
+    """
+    Hold the request until its cost class has a free slot; see ``admission``.
+    
+    Full queues answer ``429`` with ``Retry-After``. Requests whose
+    ``X-Request-Timeout`` budget runs out while queued answer ``503``, as do
+    bodyless requests whose client disconnected while queued.
+    """
+    if not ADMISSION_ENABLED:
+        return await call_next(request)
+    
+    cost_class = admission_class(current_endpoint.get())
+    # Probing for a disconnect reads the next ASGI message, which for a request
+    # with a body is the body the endpoint still needs: only probe bodyless ones
+    has_body = (request.headers.get("content-length", "0") != "0"
+                or "transfer-encoding" in request.headers)
+    try:
+        await cost_class.acquire(parse_deadline(request.headers.get(DEADLINE_HEADER)),
+                                 None if has_body else request.is_disconnected)
+    except AdmissionRejected as e:
+        logger.warning("Rejected %s %s: %s", request.method, request.url.path, e)
+        return JSONResponse(status_code=e.status, content={"detail": str(e)},
+                            headers={"Retry-After": str(math.ceil(e.retry_after))})
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        cost_class.release(time.perf_counter() - start)
+
+@app.middleware("http")
+async def route_to_owner(request: Request, call_next):
+    """
+    In cluster mode, send requests for a symbol owned by another node to
+    that node: forwarded with the owner's response relayed, or redirected
+    (``CLUSTER_ROUTING``). Falls back to serving locally if the owner is
+    unreachable. See ``cluster``.
+    """
+    cluster = get_cluster()
+    if cluster is None:
+        return await call_next(request)
+    
+    if cluster.is_forwarded(request.headers, request.method, request.url.path, request.url.query):
+        record_cluster_request("received")
+        symbol, owner = None, cluster.node_id
+    else:
+        symbol = _symbol_param(request.scope)
+        owner = cluster.owner(symbol) if symbol else cluster.node_id
+    if owner != cluster.node_id:
+        if cluster.routing == "redirect":
+            record_cluster_request("redirected")
+            return Response(status_code=307,
+                            headers={"Location": cluster.url(owner, request.url.path, request.url.query)})
+        try:
+            forwarded = await run_io(cluster.forward, owner, request.method, request.url.path,
+                                     request.url.query, dict(request.headers), await request.body())
+            record_cluster_request("forwarded")
+            return Response(content=forwarded.content, status_code=forwarded.status_code,
+                            headers={name: forwarded.headers[name] for name in RELAYED_HEADERS
+                                     if name in forwarded.headers})
+        except OSError as e:
+            logger.warning("Owner %s of %s unreachable, serving locally: %s", owner, symbol, e)
+            record_cluster_request("fallback")
+    elif symbol:
+        record_cluster_request("local")
+    
+    response = await call_next(request)
+    response.headers[SERVED_BY_HEADER] = cluster.node_id
+    return response
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """
+    Label the request with its endpoint for stage metrics, track in-flight
+    requests and end-to-end latency, and add a ``Server-Timing`` header.
+    
+    Responses that include data served stale because the upstream was
+    unavailable carry an ``X-Stale-Data`` header naming the sources.
+    
+    Operators can profile a single request with ``?profile=1`` (or the
+    ``X-Profile: 1`` header) plus ``X-Operator-Token``; the flame data is stored
+    and its id returned in ``X-Profile-Id``.
+    """
+    endpoint = _route_template(request.scope)
+    endpoint_token = current_endpoint.set(endpoint)
+    timings = {}
+    timings_token = request_timings.set(timings)
+    stale = set()
+    stale_token = served_stale.set(stale)
+    
+    profiler = None
+    profiler_token = None
+    if _profiling_requested(request):
+        profiler = SamplingProfiler()
+        profiler_token = current_profiler.set(profiler)
+        profiler.start()
+    
+    in_flight = IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - start)
+        if stale:
+            response.headers["X-Stale-Data"] = ",".join(sorted(stale))
+        if profiler is not None:
+            profiler.stop()
+            response.headers["X-Profile-Id"] = profiler.save(f"{request.method}{request.url.path}")
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        in_flight.dec()
+        REQUEST_SECONDS.labels(endpoint, request.method, str(status)).observe(elapsed)
+        if profiler is not None:
+            profiler.stop()
+            current_profiler.reset(profiler_token)
+        if REQUEST_LOG:
+            logger.info("%s %s %d %.1fms %s", request.method, request.url.path, status,
+                        elapsed * 1000, server_timing_header(timings, elapsed))
+        served_stale.reset(stale_token)
+        request_timings.reset(timings_token)
+        current_endpoint.reset(endpoint_token)
+
 # Pydantic models for request/response
 class StockInfoResponse(BaseModel):
     symbol: str
@@ -48,6 +288,8 @@ class StockInfoResponse(BaseModel):
     dividend_yield: Optional[float] = None
     currency: str
     exchange: str
+    fx_rate: Optional[float] = None
+    stale: bool = False
 
 class PredictionResponse(BaseModel):
     symbol: str
@@ -56,6 +298,9 @@ class PredictionResponse(BaseModel):
     price_change_pct: float
     prediction_date: str
     model_confidence: str
+    model_type: str = "per_symbol"
+    interval: str = "1d"
+    stale: bool = False
 
 class AdvancedPredictionResponse(BaseModel):
     symbol: str
@@ -70,12 +315,117 @@ class AdvancedPredictionResponse(BaseModel):
     model_weights: Dict[str, float]
     prediction_std: float
     prediction_range: float
+    interval: str = "1d"
+    stale: bool = False
 
 class HistoricalDataResponse(BaseModel):
     symbol: str
     data: List[Dict[str, Any]]
     period: str
     total_records: int
+    interval: str = "1d"
+    currency: Optional[str] = None
+    stale: bool = False
+    cursor: Optional[str] = None
+    revised: bool = False
+
+class BacktestResponse(BaseModel):
+    symbol: str
+    config: Dict[str, Any]
+    start_date: str
+    end_date: str
+    test_days: int
+    refits: int
+    metrics: Dict[str, float]
+    predictions: Dict[str, List[Any]]
+
+class PredictionOverlayResponse(BaseModel):
+    symbol: str
+    model: str
+    period: str
+    data: List[Dict[str, Any]]
+    total_records: int
+    train_end_date: str
+    holdout_metrics: Dict[str, float]
+    next_prediction: float
+
+class SymbolMatch(BaseModel):
+    symbol: str
+    name: str
+    exchange: str
+    currency: str
+
+class SymbolSearchResponse(BaseModel):
+    query: str
+    results: List[SymbolMatch]
+    total: int
+
+class QuoteItem(BaseModel):
+    symbol: str
+    price: float
+    previous_close: float
+    change: float
+    change_percent: float
+    volume: int
+    currency: str
+    fx_rate: Optional[float] = None
+
+class BatchQuoteResponse(BaseModel):
+    quotes: List[QuoteItem]
+    missing: List[str]
+    currency: Optional[str] = None
+    total_price: Optional[float] = None
+    stale: bool = False
+
+class PortfolioRequest(BaseModel):
+    holdings: Dict[str, float]
+    period: str = "1y"
+    currency: str = "USD"
+    benchmark: Optional[str] = None
+    include_matrices: bool = True
+
+class PortfolioAnalysisResponse(BaseModel):
+    symbols: List[str]
+    currency: str
+    benchmark: Optional[str] = None
+    missing: List[str]
+    start_date: str
+    end_date: str
+    total_value: float
+    weights: Dict[str, Optional[float]]
+    value_history: List[Dict[str, Any]]
+    total_return: Optional[float] = None
+    annualized_return: Optional[float] = None
+    volatility: Optional[float] = None
+    symbol_volatility: Dict[str, Optional[float]]
+    beta: Optional[float] = None
+    symbol_betas: Optional[Dict[str, Optional[float]]] = None
+    max_drawdown: Optional[float] = None
+    peak_date: str
+    trough_date: str
+    correlation: Optional[List[List[Optional[float]]]] = None
+    covariance: Optional[List[List[Optional[float]]]] = None
+    stale: bool = False
+
+class ScreenMatch(BaseModel):
+    symbol: str
+    date: str
+    values: Dict[str, Optional[float]]
+
+class ScreenResponse(BaseModel):
+    condition: str
+    as_of: Optional[str] = None
+    universe_size: int
+    matches: List[ScreenMatch]
+    total: int
+    stale: bool = False
+
+class DashboardResponse(BaseModel):
+    symbol: str
+    info: Optional[StockInfoResponse] = None
+    history: Optional[HistoricalDataResponse] = None
+    prediction: Optional[PredictionResponse] = None
+    stale: bool = False
 
 class ErrorResponse(BaseModel):
     error: str
@@ -91,21 +441,141 @@ async def health_check():
     Returns:
         dict: API status and timestamp
     """
-    return {
+    health = {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "service": "Stock Advisor API",
         "version": "1.0.0"
     }
+    cluster = get_cluster()
+    if cluster is not None:
+        health["node"] = cluster.node_id
+    return health
+
+# Prometheus metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, cache, upstream error
+    and training counters, in-flight requests and compute pool queue depth.
+    """
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+# Stored request profiles (operator only)
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(profile_id: str, request: Request):
+    """
+    Return a stored request profile in folded-stack format, ready for
+    flamegraph.pl or speedscope.
+    """
+    if not is_operator(request.headers.get("x-operator-token")):
+        raise HTTPException(status_code=403, detail="Operator token required")
+    
+    folded = load_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    return PlainTextResponse(folded)
+
+# Autocomplete stock symbols
+@app.get("/stock/search", response_model=SymbolSearchResponse)
+async def search_symbols(
+    q: str = Query(..., min_length=1, max_length=32, description="Ticker or company name prefix"),
+    limit: int = Query(default=10, ge=1, le=50, description="Maximum number of results")
+):
+    """
+    Autocomplete stock symbols by ticker or company name prefix.
+    
+    Args:
+        q (str): Query prefix (e.g., 'PET', 'bank of')
+        limit (int): Maximum number of results
+        
+    Returns:
+        SymbolSearchResponse: Matching symbols with exchange and currency
+    """
+    from symbol_directory import get_symbol_directory
+    
+    # An in-memory index lookup, cheap enough for the event loop
+    results = get_symbol_directory().search(q, limit=limit)
+    return SymbolSearchResponse(
+        query=q,
+        results=[SymbolMatch(**entry._asdict()) for entry in results],
+        total=len(results)
+    )
 
 # Get basic stock information
+async def _stock_info(symbol: str, quote: Dict[str, Any], info: Dict[str, Any],
+                      target: Optional[str]) -> StockInfoResponse:
+    """
+    Build the ``StockInfoResponse`` for a quote and its fundamentals.
+    
+    Args:
+        symbol (str): Validated stock symbol
+        quote (Dict[str, Any]): Provider quote (price, previous_close, volume)
+        info (Dict[str, Any]): Provider fundamentals
+        target (str): Currency to convert prices to, or None
+        
+    Returns:
+        StockInfoResponse: Basic stock information
+        
+    Raises:
+        ValueError: If there is no exchange rate for the conversion
+    """
+    # Extract current and previous prices
+    current_price = quote['price']
+    previous_close = quote['previous_close']
+    market_cap = info.get('marketCap')
+    
+    # Get currency and exchange information
+    currency = get_currency_from_symbol(symbol)
+    exchange = get_exchange_name(symbol)
+    
+    fx_rate = None
+    if target is not None:
+        from fx import get_rate_table
+        
+        table = await run_io(get_rate_table)
+        # Quotes may be in minor units (pence); market cap is in major units
+        fx_rate = table.rate(currency, target)
+        factor = float(table.symbol_factors([symbol], target)[0])
+        current_price *= factor
+        previous_close *= factor
+        if market_cap is not None:
+            market_cap = int(market_cap * fx_rate)
+        currency = target
+    
+    # Calculate change
+    change = current_price - previous_close
+    change_percent = (change / previous_close) * 100 if previous_close != 0 else 0.0
+    
+    return StockInfoResponse(
+        symbol=symbol,
+        name=info.get('longName', symbol),
+        current_price=current_price,
+        previous_close=previous_close,
+        change=change,
+        change_percent=change_percent,
+        volume=quote['volume'],
+        market_cap=market_cap,
+        pe_ratio=info.get('trailingPE'),
+        dividend_yield=info.get('dividendYield'),
+        currency=currency,
+        exchange=exchange,
+        fx_rate=fx_rate,
+        stale=is_stale()
+    )
+
 @app.get("/stock/info/{symbol}", response_model=StockInfoResponse)
-async def get_stock_info(symbol: str):
+async def get_stock_info(
+    symbol: str,
+    convert_to: Optional[str] = Query(default=None, description="Currency to report prices in (e.g., 'USD')")
+):
     """
     Get basic stock information including current price, volume, and key metrics.
     
     Args:
         symbol (str): Stock symbol (e.g., 'AAPL', 'GOOGL')
+        convert_to (str): Optional currency to convert prices and market cap to
         
     Returns:
         StockInfoResponse: Basic stock information
@@ -113,8 +583,10 @@ async def get_stock_info(symbol: str):
     Raises:
         HTTPException: If stock symbol is invalid or data cannot be fetched
     """
+    from data_provider import get_data_provider
+    
     try:
-        logger.info(f"Fetching stock info for {symbol}")
+        logger.info("Fetching stock info for %s", symbol)
         
         # Validate and clean symbol
         symbol = symbol.upper().strip()
@@ -123,70 +595,166 @@ async def get_stock_info(symbol: str):
                 status_code=400, 
                 detail=f"Invalid stock symbol: {symbol}"
             )
+        target = _target_currency(convert_to)
         
         # Fetch stock data
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        hist = ticker.history(period="2d")
+        provider = get_data_provider()
+        quote = await run_io(provider.quote, symbol)
         
-        if hist.empty:
+        if quote is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"No data found for stock symbol: {symbol}"
             )
+        info = await run_io(provider.fundamentals, symbol)
+        stock_info = await _stock_info(symbol, quote, info, target)
         
-        # Extract current and previous prices
-        current_price = float(hist['Close'].iloc[-1])
-        previous_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_price
+        logger.info("Successfully fetched info for %s", symbol)
+        return stock_info
         
-        # Calculate change
-        change = current_price - previous_close
-        change_percent = (change / previous_close) * 100 if previous_close != 0 else 0.0
+    except HTTPException:
+        raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except ValueError as e:
+        # No exchange rate for the requested conversion
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error("Error fetching stock info for %s: %s", symbol, e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal error while fetching stock info for {symbol}"
+        )
+
+# Get quotes for several symbols at once
+@app.get("/stock/quotes", response_model=BatchQuoteResponse)
+async def get_stock_quotes(
+    symbols: str = Query(..., description="Comma-separated stock symbols (e.g., 'AAPL,PETR4.SA,VOD.L')"),
+    convert_to: Optional[str] = Query(default=None, description="Currency to report prices in (e.g., 'USD')")
+):
+    """
+    Get latest quotes for up to MAX_BATCH_SYMBOLS symbols, optionally all
+    converted to one currency and totalled.
+    
+    Args:
+        symbols (str): Comma-separated stock symbols
+        convert_to (str): Optional currency to convert every price to
         
-        # Get currency and exchange information
-        currency = get_currency_from_symbol(symbol)
-        exchange = get_exchange_name(symbol)
+    Returns:
+        BatchQuoteResponse: Quotes for the symbols with data, the symbols
+            without, and the price total when converted
         
-        # Build response
-        stock_info = StockInfoResponse(
-            symbol=symbol,
-            name=info.get('longName', symbol),
-            current_price=current_price,
-            previous_close=previous_close,
-            change=change,
-            change_percent=change_percent,
-            volume=int(hist['Volume'].iloc[-1]),
-            market_cap=info.get('marketCap'),
-            pe_ratio=info.get('trailingPE'),
-            dividend_yield=info.get('dividendYield'),
-            currency=currency,
-            exchange=exchange
+    Raises:
+        HTTPException: If the symbol list or currency is invalid
+    """
+    import asyncio
+    
+    import numpy as np
+    
+    from data_provider import get_data_provider
+    
+    requested = list(dict.fromkeys(s.upper().strip() for s in symbols.split(',') if s.strip()))
+    if not requested or len(requested) > MAX_BATCH_SYMBOLS or any(len(s) > 10 for s in requested):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Provide 1 to {MAX_BATCH_SYMBOLS} comma-separated symbols of at most 10 characters"
         )
+    target = _target_currency(convert_to)
+    
+    try:
+        provider = get_data_provider()
+        quotes = await asyncio.gather(*(run_io(provider.quote, s) for s in requested))
+        found = [(s, q) for s, q in zip(requested, quotes) if q is not None]
+        missing = [s for s, q in zip(requested, quotes) if q is None]
         
-        logger.info(f"Successfully fetched info for {symbol}")
-        return stock_info
+        found_symbols = [s for s, _ in found]
+        prices = np.array([[q['price'], q['previous_close']] for _, q in found], dtype=np.float64).reshape(-1, 2)
+        currencies = [get_currency_from_symbol(s) for s in found_symbols]
+        fx_rates = [None] * len(found)
+        if target is not None and found:
+            from fx import get_rate_table
+            
+            table = await run_io(get_rate_table)
+            # One multiply converts every price and previous close
+            factors = table.symbol_factors(found_symbols, target)
+            prices = prices * factors[:, None]
+            fx_rates = [table.rate(c, target) for c in currencies]
+            currencies = [target] * len(found)
         
-    except HTTPException:
-        raise
+        change = prices[:, 0] - prices[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_percent = np.where(prices[:, 1] != 0, change / prices[:, 1] * 100, 0.0)
+        
+        items = [
+            QuoteItem(
+                symbol=s, price=price, previous_close=previous, change=delta,
+                change_percent=pct, volume=q['volume'], currency=currency, fx_rate=rate
+            )
+            for (s, q), (price, previous), delta, pct, currency, rate in zip(
+                found, prices.tolist(), change.tolist(), change_percent.tolist(), currencies, fx_rates
+            )
+        ]
+        return BatchQuoteResponse(
+            quotes=items,
+            missing=missing,
+            currency=target,
+            total_price=float(prices[:, 0].sum()) if target is not None else None,
+            stale=is_stale()
+        )
+        
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        logger.error(f"Error fetching stock info for {symbol}: {str(e)}")
+        logger.error("Error fetching quotes for %s: %s", symbols, e)
         raise HTTPException(
             status_code=500,
-            detail=f"Internal error while fetching stock info for {symbol}"
+            detail="Internal error while fetching quotes"
         )
 
+def _history_records(hist, interval: str = "1d") -> List[Dict[str, Any]]:
+    """OHLCV rows of ``hist`` as ``HistoricalDataResponse`` records, converted a column at a time."""
+    from data_provider import is_intraday
+    
+    with stage_timer('serialization'):
+        return [
+            {"date": date, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+            for date, open_, high, low, close, volume in zip(
+                hist.index.strftime('%Y-%m-%d %H:%M' if is_intraday(interval) else '%Y-%m-%d'),
+                hist['Open'].tolist(),
+                hist['High'].tolist(),
+                hist['Low'].tolist(),
+                hist['Close'].tolist(),
+                hist['Volume'].astype('int64').tolist()
+            )
+        ]
+
 # Get historical stock data
 @app.get("/stock/history/{symbol}", response_model=HistoricalDataResponse)
 async def get_stock_history(
     symbol: str,
-    period: str = Query(default="1y", description="Time period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)")
+    period: str = Query(default="1y", description="Time period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)"),
+    interval: str = Query(default="1d", description="Bar interval (1d, or intraday 1m, 5m, 15m, 1h)"),
+    convert_to: Optional[str] = Query(default=None, description="Currency to report prices in (e.g., 'USD')"),
+    since: Optional[str] = Query(default=None, description="Cursor from an earlier response, or a date, to return only newer bars")
 ):
     """
     Get historical stock price data.
     
+    Intraday intervals are served from bounded in-memory ring buffers; their
+    dates include the exchange-local time of each bar.
+    
+    Every response carries a ``cursor``. Passing it back as ``since`` returns
+    only the bars from the cursor's last bar on, or the whole period with
+    ``revised`` set if earlier bars have changed since (see ``history_sync``).
+    
     Args:
         symbol (str): Stock symbol
         period (str): Time period for historical data
+        interval (str): Bar interval ('1d', '1m', '5m', '15m', '1h')
+        convert_to (str): Optional currency to convert OHLC prices to
+        since (str): Optional cursor or date the client already has bars up to
         
     Returns:
         HistoricalDataResponse: Historical stock data
@@ -194,8 +762,11 @@ async def get_stock_history(
     Raises:
         HTTPException: If symbol is invalid or data cannot be fetched
     """
+    from data_provider import get_data_provider, validate_interval
+    from history_sync import bars_since, make_cursor
+    
     try:
-        logger.info(f"Fetching historical data for {symbol} with period {period}")
+        logger.info("Fetching historical data for %s with period %s and interval %s", symbol, period, interval)
         
         # Validate symbol
         symbol = symbol.upper().strip()
@@ -209,10 +780,14 @@ async def get_stock_history(
                 status_code=400,
                 detail=f"Invalid period. Must be one of: {', '.join(valid_periods)}"
             )
+        try:
+            validate_interval(interval, period)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        target = _target_currency(convert_to)
         
         # Fetch historical data
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period)
+        hist = await run_io(get_data_provider().history, symbol, period=period, interval=interval)
         
         if hist.empty:
             raise HTTPException(
@@ -220,49 +795,163 @@ async def get_stock_history(
                 detail=f"No historical data found for {symbol}"
             )
         
-        # Convert to list of dictionaries
-        data_list = []
-        for date, row in hist.iterrows():
-            data_list.append({
-                "date": date.strftime('%Y-%m-%d'),
-                "open": float(row['Open']),
-                "high": float(row['High']),
-                "low": float(row['Low']),
-                "close": float(row['Close']),
-                "volume": int(row['Volume'])
-            })
+        # Cursors fingerprint the bars as stored, before any conversion
+        cursor = make_cursor(hist)
+        revised = False
+        if since:
+            try:
+                hist, revised = bars_since(hist, since)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        if target is not None and not hist.empty:
+            from fx import get_rate_table
+            
+            table = await run_io(get_rate_table)
+            hist = table.convert_frame(hist, symbol, target)
+        
+        data_list = _history_records(hist, interval)
         
         response = HistoricalDataResponse(
             symbol=symbol,
             data=data_list,
             period=period,
-            total_records=len(data_list)
+            total_records=len(data_list),
+            interval=interval,
+            currency=target or get_currency_from_symbol(symbol),
+            stale=is_stale(),
+            cursor=cursor,
+            revised=revised
         )
         
-        logger.info(f"Successfully fetched {len(data_list)} historical records for {symbol}")
+        logger.info("Successfully fetched %s historical records for %s", len(data_list), symbol)
         return response
         
     except HTTPException:
         raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except ValueError as e:
+        # No exchange rate for the requested conversion
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        logger.error(f"Error fetching historical data for {symbol}: {str(e)}")
+        logger.error("Error fetching historical data for %s: %s", symbol, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal error while fetching historical data for {symbol}"
         )
 
+async def _basic_prediction(symbol: str, days_ahead: int, refine: bool, interval: str, period: str,
+                            data=None) -> Dict[str, Any]:
+    """
+    Compute a ``PredictionResponse`` payload, from the pooled model when one
+    is loaded (daily bars, ``refine`` unset), else from a per-symbol model.
+    
+    Args:
+        symbol (str): Validated stock symbol
+        days_ahead (int): Number of days (bars, for intraday) to predict ahead
+        refine (bool): Force a per-symbol model
+        interval (str): Bar interval
+        period (str): History a per-symbol model trains on
+        data (pd.DataFrame): History already fetched for the symbol, covering
+            at least ``period``. Fetched when not given.
+        
+    Returns:
+        Dict[str, Any]: The prediction
+        
+    Raises:
+        HTTPException: If there is no data or no model can be trained
+    """
+    from data_provider import is_intraday, slice_period
+    from model import StockPredictor
+    from pooled_model import get_pooled_predictor
+    
+    # Serve from the pooled model when available
+    pooled = None if refine or is_intraday(interval) else get_pooled_predictor()
+    if pooled is not None:
+        if data is not None:
+            stock_data = slice_period(data, "1y")
+        else:
+            stock_data = await run_io(StockPredictor(symbol).fetch_stock_data, period="1y")
+        if stock_data is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Unable to fetch data for stock symbol: {symbol}"
+            )
+    
+        prediction = await run_compute(pooled.predict_from_data, symbol, stock_data, days_ahead=days_ahead)
+        if prediction is not None:
+            logger.info("Served pooled prediction for %s", symbol)
+            return prediction
+        logger.warning("Pooled model could not score %s, training a per-symbol model", symbol)
+    
+    # Initialize predictor
+    predictor = StockPredictor(symbol, interval=interval)
+    
+    # Fetch and prepare data
+    if data is not None:
+        stock_data = slice_period(data, period)
+    else:
+        stock_data = await run_io(predictor.fetch_stock_data, period=period)
+    if stock_data is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unable to fetch data for stock symbol: {symbol}"
+        )
+    
+    # Reuse a model any worker already trained on this data
+    data_end = stock_data.index[-1].isoformat()
+    if not await run_io(predictor.load_published, data_end, period):
+        # Create features
+        featured_data = await run_compute(predictor.create_features, stock_data)
+        if featured_data is None or featured_data.empty:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unable to create features for {symbol}. Insufficient data."
+            )
+    
+        # Train model
+        if not await run_compute(predictor.train_model, featured_data):
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to train prediction model for {symbol}"
+            )
+        await run_io(predictor.publish, data_end, period)
+    
+    # Generate prediction from the frame just trained on, not another fetch
+    prediction = await run_compute(predictor.predict_price, days_ahead=days_ahead, data=stock_data)
+    if prediction is None:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate prediction for {symbol}"
+        )
+    
+    logger.info("Successfully generated prediction for %s", symbol)
+    return prediction
+
 # Predict future stock prices
 @app.get("/stock/predict/{symbol}", response_model=PredictionResponse)
 async def predict_stock_price(
     symbol: str,
-    days_ahead: int = Query(default=1, ge=1, le=30, description="Number of days to predict ahead (1-30)")
+    days_ahead: int = Query(default=1, ge=1, le=30, description="Number of days to predict ahead (1-30)"),
+    refine: bool = Query(default=False, description="Train a per-symbol model instead of using the pooled model"),
+    interval: str = Query(default="1d", description="Bar interval (1d, or intraday 1m, 5m, 15m, 1h)")
 ):
     """
     Predict future stock prices using machine learning.
     
+    Uses the offline-trained pooled model when one is available, so a request
+    only costs a data fetch and one feature row. Falls back to training a
+    per-symbol model when no pooled model is loaded or ``refine`` is set.
+    Intraday intervals always train a per-symbol model on the longest history
+    the upstream keeps for that interval, predicting the next bar.
+    Predictions are cached stale-while-revalidate per symbol and settings.
+    
     Args:
         symbol (str): Stock symbol
-        days_ahead (int): Number of days to predict ahead (1-30)
+        days_ahead (int): Number of days (bars, for intraday) to predict ahead (1-30)
+        refine (bool): Force a per-symbol model
+        interval (str): Bar interval ('1d', '1m', '5m', '15m', '1h')
         
     Returns:
         PredictionResponse: Price prediction results
@@ -270,66 +959,180 @@ async def predict_stock_price(
     Raises:
         HTTPException: If prediction fails or symbol is invalid
     """
+    from data_provider import INTRADAY_PERIODS, is_intraday, validate_interval
+    
     try:
-        logger.info(f"Generating prediction for {symbol}, {days_ahead} days ahead")
+        logger.info("Generating prediction for %s, %s days ahead", symbol, days_ahead)
         
         # Validate symbol
         symbol = symbol.upper().strip()
         if not symbol:
             raise HTTPException(status_code=400, detail="Stock symbol is required")
         
-        # Initialize predictor
-        predictor = StockPredictor(symbol)
+        # The pooled model is trained on daily bars; intraday trains on what the upstream keeps
+        intraday = is_intraday(interval)
+        period = INTRADAY_PERIODS[interval][-1] if intraday else "2y"
+        try:
+            validate_interval(interval, period)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Fetch and prepare data
-        stock_data = predictor.fetch_stock_data(period="2y")
-        if stock_data is None:
+        async def compute() -> Dict[str, Any]:
+            return await _basic_prediction(symbol, days_ahead, refine, interval, period)
+        
+        prediction = await _prediction_cache.aget(('basic', symbol, days_ahead, refine, interval), compute)
+        return PredictionResponse(**prediction, stale=is_stale())
+        
+    except HTTPException:
+        raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except Exception as e:
+        logger.error("Error predicting stock price for %s: %s", symbol, e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal error while predicting stock price for {symbol}"
+        )
+
+# Everything a symbol page shows, from one history fetch
+@app.get("/stock/dashboard/{symbol}", response_model=DashboardResponse)
+async def get_stock_dashboard(
+    symbol: str,
+    sections: str = Query(default="info,history,prediction", description="Comma-separated sections to include (info, history, prediction)"),
+    period: str = Query(default="1y", description="Chart period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)"),
+    days_ahead: int = Query(default=1, ge=1, le=30, description="Number of days to predict ahead (1-30)"),
+    convert_to: Optional[str] = Query(default=None, description="Currency to report info and chart prices in (e.g., 'USD')")
+):
+    """
+    Get the quote, chart history and prediction of a symbol in one response.
+    
+    Fetches the longest daily window the requested sections need once (the
+    chart period, or the 2y a per-symbol model trains on) and derives every
+    section from it: the quote from its last two bars, the chart by slicing
+    it, and the prediction by scoring (or training on) it. Fundamentals are
+    only fetched for the info section. Predictions share the
+    ``/stock/predict`` cache.
+    
+    Args:
+        symbol (str): Stock symbol
+        sections (str): Sections to include
+        period (str): Time period of the chart history
+        days_ahead (int): Number of days to predict ahead (1-30)
+        convert_to (str): Optional currency to convert info and chart prices to
+        
+    Returns:
+        DashboardResponse: The requested sections
+        
+    Raises:
+        HTTPException: If the symbol, sections or period are invalid, or data cannot be fetched
+    """
+    import asyncio
+    from data_provider import get_data_provider, period_days, slice_period
+    
+    try:
+        logger.info("Fetching dashboard for %s (%s)", symbol, sections)
+        
+        # Validate symbol
+        symbol = symbol.upper().strip()
+        if not symbol or len(symbol) > 10:
+            raise HTTPException(status_code=400, detail=f"Invalid stock symbol: {symbol}")
+        
+        valid_sections = ['info', 'history', 'prediction']
+        requested = {s.strip().lower() for s in sections.split(',') if s.strip()}
+        if not requested or not requested <= set(valid_sections):
             raise HTTPException(
-                status_code=404,
-                detail=f"Unable to fetch data for stock symbol: {symbol}"
+                status_code=400,
+                detail=f"Invalid sections. Must be a comma-separated subset of: {', '.join(valid_sections)}"
             )
-        
-        # Create features
-        featured_data = predictor.create_features(stock_data)
-        if featured_data is None or featured_data.empty:
+        valid_periods = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
+        if period not in valid_periods:
             raise HTTPException(
-                status_code=422,
-                detail=f"Unable to create features for {symbol}. Insufficient data."
+                status_code=400,
+                detail=f"Invalid period. Must be one of: {', '.join(valid_periods)}"
             )
+        target = _target_currency(convert_to)
         
-        # Train model
-        if not predictor.train_model(featured_data):
+        # One fetch covering every section: the quote needs two bars, the model 2y
+        training_period = "2y"
+        needed = ['5d']
+        if 'history' in requested:
+            needed.append(period)
+        if 'prediction' in requested:
+            needed.append(training_period)
+        fetch_period = max(needed, key=period_days)
+        
+        provider = get_data_provider()
+        hist = await run_io(provider.history, symbol, period=fetch_period)
+        if hist.empty:
             raise HTTPException(
-                status_code=500,
-                detail=f"Failed to train prediction model for {symbol}"
+                status_code=404,
+                detail=f"No data found for stock symbol: {symbol}"
             )
         
-        # Generate prediction
-        prediction = predictor.predict_price(days_ahead=days_ahead)
-        if prediction is None:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate prediction for {symbol}"
+        async def compute() -> Dict[str, Any]:
+            return await _basic_prediction(symbol, days_ahead, False, "1d", training_period, data=hist)
+        
+        # Fundamentals (a separate upstream call) load while the prediction computes
+        info, prediction = await asyncio.gather(
+            run_io(provider.fundamentals, symbol) if 'info' in requested else asyncio.sleep(0),
+            _prediction_cache.aget(('basic', symbol, days_ahead, False, "1d"), compute)
+            if 'prediction' in requested else asyncio.sleep(0)
+        )
+        
+        response = DashboardResponse(symbol=symbol)
+        if 'info' in requested:
+            price = float(hist['Close'].iloc[-1])
+            quote = {
+                'price': price,
+                'previous_close': float(hist['Close'].iloc[-2]) if len(hist) > 1 else price,
+                'volume': int(hist['Volume'].iloc[-1]),
+            }
+            response.info = await _stock_info(symbol, quote, info, target)
+        
+        if 'history' in requested:
+            chart = slice_period(hist, period)
+            if target is not None:
+                from fx import get_rate_table
+                
+                table = await run_io(get_rate_table)
+                chart = table.convert_frame(chart, symbol, target)
+            data_list = _history_records(chart)
+            response.history = HistoricalDataResponse(
+                symbol=symbol,
+                data=data_list,
+                period=period,
+                total_records=len(data_list),
+                currency=target or get_currency_from_symbol(symbol),
+                stale=is_stale()
             )
         
-        response = PredictionResponse(**prediction)
-        logger.info(f"Successfully generated prediction for {symbol}")
+        if 'prediction' in requested:
+            response.prediction = PredictionResponse(**prediction, stale=is_stale())
+        
+        response.stale = is_stale()
+        logger.info("Successfully built dashboard for %s from %d bars", symbol, len(hist))
         return response
         
     except HTTPException:
         raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except ValueError as e:
+        # No exchange rate for the requested conversion
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        logger.error(f"Error predicting stock price for {symbol}: {str(e)}")
+        logger.error("Error building dashboard for %s: %s", symbol, e)
         raise HTTPException(
             status_code=500,
-            detail=f"Internal error while predicting stock price for {symbol}"
+            detail=f"Internal error while building dashboard for {symbol}"
         )
 
 # Advanced ML Prediction with Ensemble Models
 @app.get("/stock/predict-advanced/{symbol}", response_model=AdvancedPredictionResponse)
 async def predict_stock_price_advanced(
     symbol: str,
-    period: str = Query(default="3y", description="Training data period (1y, 2y, 3y, 5y)")
+    period: Optional[str] = Query(default=None, description="Training data period (1y, 2y, 3y, 5y; default 3y, or the longest available for intraday intervals)"),
+    interval: str = Query(default="1d", description="Bar interval (1d, or intraday 1m, 5m, 15m, 1h)")
 ):
     """
     Predict future stock prices using advanced ensemble machine learning.
@@ -341,6 +1144,7 @@ async def predict_stock_price_advanced(
     Args:
         symbol (str): Stock symbol
         period (str): Training data period (1y, 2y, 3y, 5y)
+        interval (str): Bar interval; intraday models predict the next bar
         
     Returns:
         AdvancedPredictionResponse: Detailed prediction results with confidence metrics
@@ -348,29 +1152,42 @@ async def predict_stock_price_advanced(
     Raises:
         HTTPException: If prediction fails or symbol is invalid
     """
+    from advanced_model import AdvancedStockPredictor
+    from data_provider import INTRADAY_PERIODS, is_intraday, validate_interval
+    
     try:
-        logger.info(f"Generating advanced prediction for {symbol} with {period} training data")
+        period = period or (INTRADAY_PERIODS[interval][-1] if is_intraday(interval) else "3y")
+        logger.info("Generating advanced prediction for %s with %s of %s training data", symbol, period, interval)
         
         # Validate symbol
         symbol = symbol.upper().strip()
         if not symbol:
             raise HTTPException(status_code=400, detail="Stock symbol is required")
+        try:
+            validate_interval(interval, period)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Initialize advanced predictor
         try:
-            predictor = AdvancedStockPredictor(symbol)
+            predictor = AdvancedStockPredictor(symbol, interval=interval)
         except Exception as e:
-            logger.error(f"Failed to initialize advanced predictor: {e}")
+            logger.error("Failed to initialize advanced predictor: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to initialize advanced predictor: {str(e)}"
             )
         
-        # Train and predict in one step
+        # Train and predict in one step (or serve the cached prediction)
         try:
-            prediction = predictor.train_and_predict(period=period)
+            prediction = await _prediction_cache.aget(
+                ('advanced', symbol, period, interval),
+                lambda: run_compute(predictor.train_and_predict, period=period)
+            )
+        except UpstreamUnavailable as e:
+            raise _upstream_busy(e)
         except Exception as e:
-            logger.error(f"Failed during training/prediction: {e}")
+            logger.error("Failed during training/prediction: %s", e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed during advanced prediction training: {str(e)}"
@@ -382,19 +1199,138 @@ async def predict_stock_price_advanced(
                 detail=f"Failed to generate advanced prediction for {symbol}"
             )
         
-        response = AdvancedPredictionResponse(**prediction)
-        logger.info(f"Successfully generated advanced prediction for {symbol}")
+        response = AdvancedPredictionResponse(**prediction, stale=is_stale())
+        logger.info("Successfully generated advanced prediction for %s", symbol)
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error generating advanced prediction for {symbol}: {str(e)}")
+        logger.error("Error generating advanced prediction for %s: %s", symbol, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal error while generating advanced prediction for {symbol}: {str(e)}"
         )
 
+# Walk-forward backtest
+@app.get("/stock/backtest/{symbol}", response_model=BacktestResponse)
+async def backtest_stock(
+    symbol: str,
+    model: str = Query(default="basic", pattern="^(basic|advanced)$", description="Predictor to backtest (basic, advanced)"),
+    period: str = Query(default="5y", description="History to backtest over (2y, 5y, 10y, max)"),
+    refit_every: int = Query(default=21, ge=1, le=252, description="Trading days between refits"),
+    min_train: int = Query(default=252, ge=100, le=2520, description="Trading days of history before the first prediction"),
+    train_window: Optional[int] = Query(default=None, ge=100, description="Rolling training window in days (default expanding)"),
+    cv_splits: int = Query(default=0, ge=0, le=5, description="CV folds used to weight the advanced ensemble at each refit")
+):
+    """
+    Walk-forward backtest of the per-symbol predictors.
+    
+    The model is refitted every ``refit_every`` trading days on the history
+    available at that point and predicts the next-day close for each day until
+    the next refit. Results are cached per symbol and settings.
+    
+    Args:
+        symbol (str): Stock symbol
+        model (str): 'basic' (Random Forest) or 'advanced' (ensemble)
+        period (str): History to backtest over
+        refit_every (int): Trading days between refits
+        min_train (int): Training days before the first prediction
+        train_window (int, optional): Rolling training window
+        cv_splits (int): CV folds for the advanced ensemble weights
+        
+    Returns:
+        BacktestResponse: MAE, RMSE, MAPE, directional hit rate and the daily predictions
+        
+    Raises:
+        HTTPException: If the symbol has no data or too little history
+    """
+    from backtest import BacktestConfig, run_backtest
+    
+    try:
+        logger.info("Backtesting %s (%s, refit every %d days)", symbol, model, refit_every)
+        
+        symbol = symbol.upper().strip()
+        if not symbol:
+            raise HTTPException(status_code=400, detail="Stock symbol is required")
+        
+        config = BacktestConfig(model, period, refit_every, min_train, train_window, cv_splits)
+        result = await run_compute(run_backtest, symbol, config)
+        return BacktestResponse(**result)
+        
+    except HTTPException:
+        raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error("Error backtesting %s: %s", symbol, e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal error while backtesting {symbol}"
+        )
+
+# Predicted vs actual closes for charts
+@app.get("/stock/predict-overlay/{symbol}", response_model=PredictionOverlayResponse)
+async def predict_overlay(
+    symbol: str,
+    model: str = Query(default="advanced", pattern="^(basic|advanced)$", description="Predictor to chart (basic, advanced)"),
+    period: str = Query(default="1y", description="Visible period (1mo, 3mo, 6mo, 1y, 2y, 5y)"),
+    training_period: str = Query(default="3y", description="History used for training (2y, 3y, 5y, 10y)"),
+    holdout: float = Query(default=0.2, gt=0, lt=1, description="Fraction of recent history kept out of training")
+):
+    """
+    Predicted next-day close for every day of the visible period, next to
+    the actual close, in the same row shape as ``/stock/history``.
+    
+    The model is fitted once on the older part of ``training_period`` and
+    scores the whole feature matrix in one batched pass; each row is marked
+    ``train`` or ``holdout`` so the chart can show where out-of-sample starts.
+    
+    Args:
+        symbol (str): Stock symbol
+        model (str): 'basic' (Random Forest) or 'advanced' (ensemble)
+        period (str): Visible period of the returned rows
+        training_period (str): History used for features and training
+        holdout (float): Fraction of recent history kept out of training
+        
+    Returns:
+        PredictionOverlayResponse: Rows of date, close, predicted and split
+        
+    Raises:
+        HTTPException: If the symbol has no data or too little history
+    """
+    from backtest import run_prediction_overlay
+    
+    try:
+        logger.info("Building %s prediction overlay for %s over %s", model, symbol, period)
+        
+        symbol = symbol.upper().strip()
+        if not symbol:
+            raise HTTPException(status_code=400, detail="Stock symbol is required")
+        
+        result = await run_compute(run_prediction_overlay, symbol, model=model, period=period,
+                                   training_period=training_period, holdout=holdout)
+        return PredictionOverlayResponse(**result)
+        
+    except HTTPException:
+        raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error("Error building prediction overlay for %s: %s", symbol, e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal error while building prediction overlay for {symbol}"
+        )
+
 # Get model information
 @app.get("/stock/model-info/{symbol}")
 async def get_model_info(symbol: str):
@@ -407,41 +1343,48 @@ async def get_model_info(symbol: str):
     Returns:
         dict: Model information and feature importance
     """
+    from model import StockPredictor
+    
     try:
-        logger.info(f"Getting model info for {symbol}")
+        logger.info("Getting model info for %s", symbol)
         
         symbol = symbol.upper().strip()
         predictor = StockPredictor(symbol)
         
         # Fetch and prepare data
-        stock_data = predictor.fetch_stock_data(period="1y")
+        stock_data = await run_io(predictor.fetch_stock_data, period="1y")
         if stock_data is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Unable to fetch data for {symbol}"
             )
         
-        featured_data = predictor.create_features(stock_data)
-        if featured_data is None:
-            raise HTTPException(
-                status_code=422,
-                detail=f"Unable to create features for {symbol}"
-            )
-        
-        # Train model
-        if not predictor.train_model(featured_data):
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to train model for {symbol}"
-            )
+        data_end = stock_data.index[-1].isoformat()
+        if not await run_io(predictor.load_published, data_end, "1y"):
+            featured_data = await run_compute(predictor.create_features, stock_data)
+            if featured_data is None:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Unable to create features for {symbol}"
+                )
+            
+            # Train model
+            if not await run_compute(predictor.train_model, featured_data):
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Failed to train model for {symbol}"
+                )
+            await run_io(predictor.publish, data_end, "1y")
         
         model_info = predictor.get_model_info()
         return model_info
         
     except HTTPException:
         raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
     except Exception as e:
-        logger.error(f"Error getting model info for {symbol}: {str(e)}")
+        logger.error("Error getting model info for %s: %s", symbol, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal error while getting model info for {symbol}"
@@ -463,32 +1406,161 @@ async def get_advanced_model_info(
     Returns:
         dict: Advanced model information, scores, and feature importance
     """
+    from advanced_model import AdvancedStockPredictor
+    
     try:
-        logger.info(f"Getting advanced model info for {symbol}")
+        logger.info("Getting advanced model info for %s", symbol)
         
         symbol = symbol.upper().strip()
         predictor = AdvancedStockPredictor(symbol)
         
         # Train models to get info
-        _ = predictor.train_and_predict(period=period)
+        _ = await run_compute(predictor.train_and_predict, period=period)
         
         model_info = predictor.get_model_info()
         return model_info
         
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
     except Exception as e:
-        logger.error(f"Error getting advanced model info for {symbol}: {str(e)}")
+        logger.error("Error getting advanced model info for %s: %s", symbol, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal error while getting advanced model info for {symbol}"
         )
 
+# Portfolio value history and risk statistics
+@app.post("/portfolio/analyze", response_model=PortfolioAnalysisResponse)
+async def analyze_portfolio(request: PortfolioRequest):
+    """
+    Analyze a portfolio of holdings across symbols and exchanges.
+    
+    Every holding's daily closes are aligned into one date x symbol panel in
+    ``currency``; the value history, volatility, correlation and covariance
+    matrices, betas against ``benchmark`` and the maximum drawdown are
+    computed from it with matrix operations.
+    
+    Args:
+        request (PortfolioRequest): Holdings (symbol -> shares), history period,
+            reporting currency, benchmark index and whether to include the matrices
+        
+    Returns:
+        PortfolioAnalysisResponse: Portfolio statistics
+        
+    Raises:
+        HTTPException: If the holdings are invalid or none has data
+    """
+    import numpy as np
+    
+    from portfolio import PORTFOLIO_BENCHMARK, load_panel, portfolio_statistics
+    
+    try:
+        holdings: Dict[str, float] = {}
+        for symbol, units in request.holdings.items():
+            symbol = symbol.upper().strip()
+            if not symbol or len(symbol) > 10 or not math.isfinite(units) or abs(units) > MAX_PORTFOLIO_UNITS:
+                raise HTTPException(status_code=400, detail=f"Invalid holding: {symbol} {units}")
+            holdings[symbol] = holdings.get(symbol, 0.0) + units
+        if not holdings or len(holdings) > MAX_PORTFOLIO_SYMBOLS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Provide 1 to {MAX_PORTFOLIO_SYMBOLS} holdings"
+            )
+        
+        valid_periods = ['1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
+        if request.period not in valid_periods:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid period. Must be one of: {', '.join(valid_periods)}"
+            )
+        currency = _target_currency(request.currency)
+        benchmark = (request.benchmark or PORTFOLIO_BENCHMARK).upper().strip()
+        
+        logger.info("Analyzing portfolio of %d symbols over %s", len(holdings), request.period)
+        panel = await run_io(load_panel, list(holdings), request.period, currency, benchmark)
+        shares = np.array([holdings[s] for s in panel.symbols])
+        statistics = await run_compute(portfolio_statistics, panel, shares, request.include_matrices)
+        
+        return PortfolioAnalysisResponse(
+            symbols=panel.symbols,
+            currency=currency,
+            benchmark=benchmark if panel.benchmark is not None else None,
+            missing=panel.missing,
+            stale=is_stale(),
+            **statistics
+        )
+        
+    except HTTPException:
+        raise
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error("Error analyzing portfolio: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail="Internal error while analyzing portfolio"
+        )
+
+# Technical screener over the symbol universe
+@app.get("/screen", response_model=ScreenResponse)
+async def screen_symbols(
+    condition: str = Query(..., min_length=1, max_length=500, description="Indicator condition (e.g., 'RSI<30 AND Price_SMA_200_Ratio>1')"),
+    limit: int = Query(default=100, ge=1, le=5000, description="Maximum number of matches")
+):
+    """
+    Screen the configured symbol universe with an indicator condition.
+    
+    Indicators are named as in the advanced model's features (RSI, SMA_50,
+    Price_SMA_200_Ratio, MACD_Histogram, ADX, ...) and evaluated on each
+    symbol's latest bar. Results are cached until the next bar.
+    
+    Args:
+        condition (str): Comparisons joined with AND, OR, NOT and parentheses
+        limit (int): Maximum number of matches to return
+        
+    Returns:
+        ScreenResponse: Matching symbols with the referenced indicator values
+        
+    Raises:
+        HTTPException: If the condition cannot be parsed
+    """
+    from screener import Condition, get_panel, screen
+    
+    try:
+        Condition(condition)
+        panel = await run_io(get_panel)
+        result = await run_compute(screen, condition, panel)
+        return ScreenResponse(
+            condition=result['condition'],
+            as_of=result['as_of'],
+            universe_size=result['universe_size'],
+            matches=result['matches'][:limit],
+            total=len(result['matches']),
+            stale=is_stale()
+        )
+        
+    except UpstreamUnavailable as e:
+        raise _upstream_busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error("Error screening %r: %s", condition, e)
+        raise HTTPException(
+            status_code=500,
+            detail="Internal error while screening"
+        )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """
     Global exception handler for unhandled errors.
     """
-    logger.error(f"Unhandled error: {str(exc)}")
+    logger.error("Unhandled error: %s", exc)
     return JSONResponse(
         status_code=500,
         content={
@@ -499,6 +1571,7 @@ async def global_exception_handler(request, exc):
 
 # Run the application
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
@@ -0,0 +1,408 @@
+"""
+Walk-forward backtesting and prediction overlays for the per-symbol predictors.
+
+Replays how ``StockPredictor`` ("basic") or ``AdvancedStockPredictor``
+("advanced") would have performed: starting after ``min_train`` bars, the model
+is fitted on the history available at that point, used unchanged to predict the
+next ``refit_every`` days, then refitted, and so on to the end of the history.
+
+Features are computed once for the whole history and sliced per window, each
+fitted model scores its whole block in one batched ``predict`` call, and the
+error metrics are computed over the full prediction vector at the end.
+
+``prediction_overlay`` fits once on the older part of the history and scores
+every row in one pass, for charting predicted against actual closes.
+
+Results are cached per (symbol, settings) for ``BACKTEST_CACHE_TTL`` seconds.
+
+Usage:
+    python -m backtest AAPL --model advanced --period 5y --refit-every 21
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from advanced_model import AdvancedStockPredictor
+from data_provider import DataProvider, slice_period
+from metrics import record_cache
+from model import StockPredictor
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_CACHE_TTL = float(os.getenv("BACKTEST_CACHE_TTL", "3600"))
+BACKTEST_CACHE_SIZE = int(os.getenv("BACKTEST_CACHE_SIZE", "128"))
+
+MODEL_TYPES = ('basic', 'advanced')
+
+
+class BacktestConfig(NamedTuple):
+    """
+    Walk-forward settings. Hashable, so it doubles as the cache key.
+
+    Attributes:
+        model: 'basic' (StockPredictor) or 'advanced' (AdvancedStockPredictor)
+        period: History to fetch ('2y', '5y', 'max', ...)
+        refit_every: Trading days between refits
+        min_train: Feature rows required before the first prediction
+        train_window: Train on only the most recent rows (None for an
+            expanding window over all history so far)
+        cv_splits: Time series CV folds used to weight the advanced ensemble at
+            each refit (0 weights the members equally and is much faster)
+    """
+    model: str = 'basic'
+    period: str = '5y'
+    refit_every: int = 21
+    min_train: int = 252
+    train_window: Optional[int] = None
+    cv_splits: int = 0
+
+
+class _ResultCache:
+    """Small thread-safe TTL cache of finished results."""
+
+    def __init__(self, name: str, ttl: float, max_entries: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+        record_cache(self.name, entry is not None)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: Tuple, result: Dict[str, Any]):
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic(), result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _ResultCache('backtest', BACKTEST_CACHE_TTL, BACKTEST_CACHE_SIZE)
+_overlay_cache = _ResultCache('overlay', BACKTEST_CACHE_TTL, BACKTEST_CACHE_SIZE)
+
+
+def compute_metrics(current: np.ndarray, actual: np.ndarray, predicted: np.ndarray) -> Dict[str, float]:
+    """
+    Error metrics for next-day close predictions.
+
+    Args:
+        current (np.ndarray): Close on the day each prediction was made
+        actual (np.ndarray): Realised next-day close
+        predicted (np.ndarray): Predicted next-day close
+
+    Returns:
+        Dict[str, float]: MAE, RMSE, MAPE, directional hit rate, and the MAE
+            of the naive "tomorrow closes where today did" forecast
+    """
+    error = predicted - actual
+    actual_move = np.sign(actual - current)
+    predicted_move = np.sign(predicted - current)
+    return {
+        'mae': float(np.mean(np.abs(error))),
+        'rmse': float(np.sqrt(np.mean(error ** 2))),
+        'mape': float(np.mean(np.abs(error) / actual) * 100),
+        'hit_rate': float(np.mean(actual_move == predicted_move)),
+        'naive_mae': float(np.mean(np.abs(actual - current))),
+    }
+
+
+def _build_predictor(symbol: str, config: BacktestConfig, provider: Optional[DataProvider]):
+    if config.model == 'advanced':
+        return AdvancedStockPredictor(symbol, provider=provider)
+    return StockPredictor(symbol, provider=provider)
+
+
+def _create_features(predictor, data: pd.DataFrame, include_target: bool = True) -> Optional[pd.DataFrame]:
+    if isinstance(predictor, AdvancedStockPredictor):
+        return predictor.create_advanced_features(data, include_target=include_target)
+    return predictor.create_features(data, include_target=include_target)
+
+
+def _fit(predictor, window: pd.DataFrame, config: BacktestConfig) -> bool:
+    if isinstance(predictor, AdvancedStockPredictor):
+        return predictor.train_models(window, cv_splits=config.cv_splits)
+    # The walk-forward blocks are the out-of-sample evaluation; fit on the whole window
+    return predictor.train_model(window, holdout=0)
+
+
+def _predict(predictor, block: pd.DataFrame) -> np.ndarray:
+    if isinstance(predictor, AdvancedStockPredictor):
+        return predictor.predict_batch(block)['ensemble']
+    return predictor.predict_batch(block)
+
+
+def walk_forward(symbol: str, data: pd.DataFrame, config: BacktestConfig = BacktestConfig(),
+                 provider: Optional[DataProvider] = None) -> Dict[str, Any]:
+    """
+    Run a walk-forward backtest over already fetched bars.
+
+    Args:
+        symbol (str): Stock symbol
+        data (pd.DataFrame): OHLCV history, oldest first
+        config (BacktestConfig): Walk-forward settings
+        provider (DataProvider, optional): Passed to the predictor
+
+    Returns:
+        Dict[str, Any]: Metrics, refit count and the per-day predictions
+
+    Raises:
+        ValueError: If the config is invalid or there is too little history
+    """
+    if config.model not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type {config.model!r}, expected one of {MODEL_TYPES}")
+    if config.refit_every < 1 or config.min_train < 50:
+        raise ValueError("refit_every must be >= 1 and min_train >= 50")
+
+    predictor = _build_predictor(symbol, config, provider)
+    features = _create_features(predictor, data)
+    if features is None or len(features) <= config.min_train:
+        raise ValueError(
+            f"Not enough history for {symbol}: need more than {config.min_train} feature rows"
+        )
+
+    n_rows = len(features)
+    predicted = np.empty(n_rows - config.min_train)
+    refits = 0
+    started = time.perf_counter()
+
+    for block_start in range(config.min_train, n_rows, config.refit_every):
+        train_start = 0 if config.train_window is None else max(0, block_start - config.train_window)
+        if not _fit(predictor, features.iloc[train_start:block_start], config):
+            raise ValueError(f"Training failed at {features.index[block_start].date()}")
+        refits += 1
+
+        block_end = min(block_start + config.refit_every, n_rows)
+        predicted[block_start - config.min_train:block_end - config.min_train] = \
+            _predict(predictor, features.iloc[block_start:block_end])
+
+    tested = features.iloc[config.min_train:]
+    current = tested['Close'].to_numpy(dtype=float)
+    actual = tested['Target'].to_numpy(dtype=float)
+
+    logger.info("Backtested %s (%s) over %d days with %d refits in %.1fs",
+                symbol, config.model, len(tested), refits, time.perf_counter() - started)
+
+    return {
+        'symbol': symbol,
+        'config': config._asdict(),
+        'start_date': tested.index[0].strftime('%Y-%m-%d'),
+        'end_date': tested.index[-1].strftime('%Y-%m-%d'),
+        'test_days': len(tested),
+        'refits': refits,
+        'metrics': compute_metrics(current, actual, predicted),
+        'predictions': {
+            'date': tested.index.strftime('%Y-%m-%d').tolist(),
+            'close': current.tolist(),
+            'actual': actual.tolist(),
+            'predicted': predicted.tolist(),
+        },
+    }
+
+
+def run_backtest(symbol: str, config: BacktestConfig = BacktestConfig(),
+                 provider: Optional[DataProvider] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Fetch history for ``symbol`` and backtest it, reusing a cached result for
+    the same (symbol, config) when one is fresh.
+
+    Args:
+        symbol (str): Stock symbol
+        config (BacktestConfig): Walk-forward settings
+        provider (DataProvider, optional): Market-data source
+        use_cache (bool): Look up and store the result in the cache
+
+    Returns:
+        Dict[str, Any]: See ``walk_forward``
+
+    Raises:
+        LookupError: If no history is available for the symbol
+        ValueError: If the config is invalid or there is too little history
+    """
+    symbol = symbol.upper()
+    key = (symbol, config)
+    if use_cache:
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+    predictor = _build_predictor(symbol, config, provider)
+    data = predictor.fetch_stock_data(period=config.period)
+    if data is None:
+        raise LookupError(f"No data found for {symbol}")
+
+    result = walk_forward(symbol, data, config, provider=predictor.provider)
+    if use_cache:
+        _cache.put(key, result)
+    return result
+
+
+def prediction_overlay(symbol: str, data: pd.DataFrame, model: str = 'advanced', period: str = '1y',
+                       holdout: float = 0.2, provider: Optional[DataProvider] = None) -> Dict[str, Any]:
+    """
+    Fit a predictor on the older part of ``data`` and score every row in one
+    batched pass, for charting predicted against actual closes.
+
+    Each output row pairs a day's actual close with the close predicted for it
+    from the previous day's features, and is marked ``train`` when that
+    previous day was in the training set or ``holdout`` otherwise.
+
+    Args:
+        symbol (str): Stock symbol
+        data (pd.DataFrame): OHLCV history used for features and training
+        model (str): 'basic' or 'advanced'
+        period (str): Visible period of the returned rows
+        holdout (float): Fraction of the most recent labelled rows kept out of training
+        provider (DataProvider, optional): Passed to the predictor
+
+    Returns:
+        Dict[str, Any]: Rows in the history row shape, holdout metrics and the
+            forecast for the day after the last bar
+
+    Raises:
+        ValueError: If the settings are invalid or there is too little history
+    """
+    if model not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type {model!r}, expected one of {MODEL_TYPES}")
+    if not 0 < holdout < 1:
+        raise ValueError("holdout must be between 0 and 1")
+
+    # Cross-validated ensemble weights, as in /stock/predict-advanced
+    config = BacktestConfig(model=model, cv_splits=5)
+    predictor = _build_predictor(symbol, config, provider)
+    features = _create_features(predictor, data, include_target=False)
+    if features is None or len(features) < 100:
+        raise ValueError(f"Not enough history for {symbol} to fit a {model} model")
+
+    # Features hold no gaps after warm-up, so the next row's close is the target
+    features['Target'] = features['Close'].shift(-1)
+    n_labelled = len(features) - 1
+    split = int(n_labelled * (1 - holdout))
+
+    if not _fit(predictor, features.iloc[:split], config):
+        raise ValueError(f"Training failed for {symbol}")
+
+    predicted = _predict(predictor, features)
+    close = features['Close'].to_numpy(dtype=float)
+
+    # Row i shows the prediction made on day i - 1 for day i
+    dates = features.index[1:]
+    splits = np.where(np.arange(n_labelled) < split, 'train', 'holdout')
+    visible = len(slice_period(features.iloc[1:], period))
+
+    holdout_metrics = compute_metrics(close[split:-1], close[split + 1:], predicted[split:-1])
+
+    rows = [
+        {'date': date, 'close': actual, 'predicted': pred, 'split': mark}
+        for date, actual, pred, mark in zip(
+            dates[-visible:].strftime('%Y-%m-%d'), close[1:][-visible:].tolist(),
+            predicted[:-1][-visible:].tolist(), splits[-visible:].tolist()
+        )
+    ]
+
+    return {
+        'symbol': symbol,
+        'model': model,
+        'period': period,
+        'data': rows,
+        'total_records': len(rows),
+        'train_end_date': features.index[split - 1].strftime('%Y-%m-%d'),
+        'holdout_metrics': holdout_metrics,
+        'next_prediction': float(predicted[-1]),
+    }
+
+
+def run_prediction_overlay(symbol: str, model: str = 'advanced', period: str = '1y',
+                           training_period: str = '3y', holdout: float = 0.2,
+                           provider: Optional[DataProvider] = None,
+                           use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Fetch ``training_period`` of history for ``symbol`` and build its
+    prediction overlay, reusing a cached result for the same settings.
+
+    Args:
+        symbol (str): Stock symbol
+        model (str): 'basic' or 'advanced'
+        period (str): Visible period of the returned rows
+        training_period (str): History used for features and training
+        holdout (float): Fraction of the most recent rows kept out of training
+        provider (DataProvider, optional): Market-data source
+        use_cache (bool): Look up and store the result in the cache
+
+    Returns:
+        Dict[str, Any]: See ``prediction_overlay``
+
+    Raises:
+        LookupError: If no history is available for the symbol
+        ValueError: If the settings are invalid or there is too little history
+    """
+    symbol = symbol.upper()
+    key = (symbol, model, period, training_period, holdout)
+    if use_cache:
+        cached = _overlay_cache.get(key)
+        if cached is not None:
+            return cached
+
+    predictor = _build_predictor(symbol, BacktestConfig(model=model), provider)
+    data = predictor.fetch_stock_data(period=training_period)
+    if data is None:
+        raise LookupError(f"No data found for {symbol}")
+
+    result = prediction_overlay(symbol, data, model, period, holdout, provider=predictor.provider)
+    if use_cache:
+        _overlay_cache.put(key, result)
+    return result
+
+
+def clear_cache():
+    """Drop all cached backtest and overlay results."""
+    _cache.clear()
+    _overlay_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of a per-symbol predictor")
+    parser.add_argument("symbol")
+    parser.add_argument("--model", choices=MODEL_TYPES, default='basic')
+    parser.add_argument("--period", default='5y')
+    parser.add_argument("--refit-every", type=int, default=21, help="Trading days between refits")
+    parser.add_argument("--min-train", type=int, default=252, help="Rows before the first prediction")
+    parser.add_argument("--train-window", type=int, help="Rolling training window (default expanding)")
+    parser.add_argument("--cv-splits", type=int, default=0, help="CV folds for advanced ensemble weights")
+    parser.add_argument("--output", help="Write the full result as JSON")
+    args = parser.parse_args()
+
+    config = BacktestConfig(args.model, args.period, args.refit_every, args.min_train,
+                            args.train_window, args.cv_splits)
+    result = run_backtest(args.symbol, config, use_cache=False)
+
+    print(f"{result['symbol']} {result['start_date']} -> {result['end_date']}: "
+          f"{result['test_days']} days, {result['refits']} refits")
+    for name, value in result['metrics'].items():
+        print(f"  {name:<10} {value:.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Memory-mapped columnar store of daily OHLCV bars.
+
+Each symbol is a directory of fixed-width binary columns, one file per field::
+
+    <BAR_STORE_DIR>/<SYMBOL>/date.<gen>.i8     int64 UTC nanoseconds, ascending
+    <BAR_STORE_DIR>/<SYMBOL>/open.<gen>.f8     float64, one value per bar
+    ...                      high, low, close, volume
+    <BAR_STORE_DIR>/<SYMBOL>/meta.json         generation, row count, time zone, sync time
+
+Reads map the columns with ``np.memmap`` and wrap them in a DataFrame without
+copying, so a history request is a couple of binary searches instead of an
+upstream call or a file parse, and the bars live once in the OS page cache no
+matter how many workers read them. Mappings are kept for the most recently
+read symbols, up to ``BAR_STORE_MAX_MAPPED_FILES`` column files, since each
+one holds a file descriptor.
+
+Writers hold a per-symbol file lock. Appends only ever extend the column files
+and publish the new row count in ``meta.json`` last, so readers never see a
+partially written bar (files are never shrunk under a live mapping). A
+backfill writes a new generation of files and switches ``meta.json`` to it.
+
+``BarStoreProvider`` puts the store in front of a remote provider: the first
+request for a symbol backfills ``BAR_STORE_BACKFILL`` of history, later ones
+read from the store and only fetch the bars added since the last sync. If
+those fetched bars show that earlier stored bars changed upstream (a split or
+dividend adjustment), the symbol is backfilled again as a new generation. Syncs
+are stale-while-revalidate: once ``BAR_STORE_REFRESH`` (the soft TTL) has
+passed the stored bars are served while a background sync runs; past
+``BAR_STORE_HARD_TTL`` the sync happens first, and if the upstream is down the
+stored bars are served anyway and flagged stale.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_provider import OHLCV_COLUMNS, DataProvider, period_days, slice_period
+from metrics import record_stale
+from swr_cache import SWRCache, mark_stale, refresh_in_background
+from utils import MappedLRU, file_lock
+
+logger = logging.getLogger(__name__)
+
+BAR_STORE_DIR = os.getenv("BAR_STORE_DIR", "./data/bars")
+BAR_STORE_REFRESH = float(os.getenv("BAR_STORE_REFRESH", "900"))
+BAR_STORE_HARD_TTL = float(os.getenv("BAR_STORE_HARD_TTL", "3600"))
+FUNDAMENTALS_SOFT_TTL = float(os.getenv("FUNDAMENTALS_SOFT_TTL", "3600"))
+FUNDAMENTALS_HARD_TTL = float(os.getenv("FUNDAMENTALS_HARD_TTL", "86400"))
+BAR_STORE_BACKFILL = os.getenv("BAR_STORE_BACKFILL", "10y")
+# Column files kept mapped (6 per symbol); each holds a file descriptor
+BAR_STORE_MAX_MAPPED_FILES = int(os.getenv("BAR_STORE_MAX_MAPPED_FILES", "384"))
+
+FIELDS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'}
+
+# Periods the upstream accepts, with the calendar days each covers
+_PERIOD_DAYS = [('5d', 7), ('1mo', 31), ('3mo', 92), ('6mo', 183), ('1y', 366),
+                ('2y', 731), ('5y', 1827), ('10y', 3653), ('max', float('inf'))]
+_SYMBOL_PATTERN = re.compile(r'^[A-Z0-9.^=_-]+$')
+
+
+def _covering_period(days: float) -> str:
+    """Smallest upstream period that spans ``days`` calendar days."""
+    for period, period_span in _PERIOD_DAYS:
+        if days <= period_span:
+            return period
+    return 'max'
+
+
+class BarStore:
+    """
+    Columnar daily bars per symbol, appended in place and read through memmaps.
+    """
+
+    def __init__(self, directory: str = BAR_STORE_DIR, max_mapped_files: int = BAR_STORE_MAX_MAPPED_FILES):
+        self.directory = directory
+        self._maps = MappedLRU(max_mapped_files)
+
+    def _symbol_dir(self, symbol: str) -> str:
+        symbol = symbol.upper()
+        if not _SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol for bar store: {symbol}")
+        return os.path.join(self.directory, symbol)
+
+    def lock(self, symbol: str):
+        """Per-symbol writer lock, shared by every worker on the machine."""
+        return file_lock(os.path.join(self._symbol_dir(symbol), ".lock"))
+
+    def meta(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Row count, time zone, covered period and last sync time, or None."""
+        try:
+            with open(os.path.join(self._symbol_dir(symbol), "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, symbol: str, meta: Dict[str, Any]):
+        path = os.path.join(self._symbol_dir(symbol), "meta.json")
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _column_path(symbol_dir: str, field: str, generation: int) -> str:
+        return os.path.join(symbol_dir, f"{field}.{generation}.{'i8' if field == 'date' else 'f8'}")
+
+    def _columns(self, symbol: str, meta: Dict[str, Any]) -> Dict[str, np.memmap]:
+        """Read-only memmaps of the published rows, reused until the store changes or they are evicted."""
+        key = (meta['generation'], meta['length'])
+        cached = self._maps.get(symbol)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        symbol_dir = self._symbol_dir(symbol)
+        columns = {
+            field: np.memmap(self._column_path(symbol_dir, field, meta['generation']),
+                             dtype=np.int64 if field == 'date' else np.float64,
+                             mode='r', shape=(meta['length'],))
+            for field in ('date', *FIELDS.values())
+        }
+        self._maps.put(symbol, (key, columns), len(columns))
+        return columns
+
+    def read(self, symbol: str, period: str = "max") -> Optional[pd.DataFrame]:
+        """
+        Bars for ``period`` as a DataFrame whose columns are views of the memmaps.
+
+        The frame is read-only underneath; pandas copies on the first write.
+
+        Returns:
+            pd.DataFrame: Bars indexed by date, or None if the symbol is not stored
+        """
+        symbol = symbol.upper()
+        meta = self.meta(symbol)
+        if meta is None or meta['length'] == 0:
+            return None
+
+        columns = self._columns(symbol, meta)
+        index = pd.DatetimeIndex(columns['date'].view('M8[ns]'), name='Date').tz_localize('UTC')
+        if meta.get('tz'):
+            index = index.tz_convert(meta['tz'])
+        else:
+            index = index.tz_localize(None)
+
+        frame = pd.DataFrame({name: columns[field] for name, field in FIELDS.items()},
+                             index=index, copy=False)
+        return slice_period(frame, period)
+
+    def write(self, symbol: str, bars: pd.DataFrame, covered: Optional[str] = None,
+              replace: bool = False) -> int:
+        """
+        Merge ``bars`` into the store.
+
+        Bars newer than the last stored one are appended; a bar with the same
+        date as the last stored one overwrites it (the session may have been
+        in progress when it was stored). ``replace`` writes a fresh generation,
+        used when backfilling a longer history.
+
+        Args:
+            symbol (str): Stock symbol
+            bars (pd.DataFrame): Daily bars sorted by date
+            covered (str, optional): Period the stored history now spans
+            replace (bool): Drop existing bars first
+
+        Returns:
+            int: Number of rows stored afterwards
+        """
+        symbol = symbol.upper()
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        with self.lock(symbol):
+            return self._write(symbol, bars, covered, replace)
+
+    def _write(self, symbol: str, bars: pd.DataFrame, covered: Optional[str], replace: bool) -> int:
+        """``write`` for callers already holding the symbol lock."""
+        symbol_dir = self._symbol_dir(symbol)
+        meta = self.meta(symbol)
+        tz = str(bars.index.tz) if getattr(bars.index, 'tz', None) is not None else None
+        dates = bars.index.tz_convert('UTC').tz_localize(None) if tz else bars.index
+        dates = np.asarray(dates, dtype='M8[ns]').view(np.int64)
+
+        if meta is None or replace:
+            generation = (meta['generation'] + 1) if meta else 0
+            start = length = 0
+        else:
+            generation, length = meta['generation'], meta['length']
+            start = length
+            if length:
+                last = self._columns(symbol, meta)['date'][length - 1]
+                keep = dates >= last
+                dates, bars = dates[keep], bars[keep]
+                if len(dates) and dates[0] == last:
+                    start = length - 1
+
+        columns = {'date': dates}
+        for name, field in FIELDS.items():
+            columns[field] = bars[name].to_numpy(dtype=np.float64)
+        for field, values in columns.items():
+            path = self._column_path(symbol_dir, field, generation)
+            # Only extend or overwrite: shrinking a mapped file would fault readers
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(start * 8)
+                f.write(values.tobytes())
+
+        new_length = start + len(dates) if len(dates) else length
+        self._write_meta(symbol, {
+            'generation': generation,
+            'length': int(new_length),
+            'tz': tz or (meta or {}).get('tz'),
+            'covered': covered or (meta or {}).get('covered', BAR_STORE_BACKFILL),
+            'synced_at': time.time(),
+        })
+
+        if meta is not None and generation != meta['generation']:
+            # Workers still mapping the old generation keep their mapping
+            for field in ('date', *FIELDS.values()):
+                try:
+                    os.remove(self._column_path(symbol_dir, field, meta['generation']))
+                except OSError:
+                    pass
+        return int(new_length)
+
+    def revised(self, symbol: str, bars: pd.DataFrame) -> bool:
+        """
+        True if any of ``bars`` before the last stored bar has a different close than the stored bar of that date.
+
+        Appends only ever replace the last stored bar, so revisions further
+        back (split or dividend adjustments) need a fresh backfill.
+        """
+        stored = self.read(symbol)
+        if stored is None or bars.empty:
+            return False
+        earlier = bars[bars.index < stored.index[-1]]
+        common = earlier.index.intersection(stored.index)
+        if common.empty:
+            return False
+        return not np.allclose(earlier.loc[common, 'Close'].to_numpy(dtype=np.float64),
+                               stored.loc[common, 'Close'].to_numpy(), rtol=1e-6, equal_nan=True)
+
+    def _touch(self, symbol: str):
+        """Record a sync that found nothing new (caller holds the symbol lock)."""
+        meta = self.meta(symbol)
+        if meta is not None:
+            meta['synced_at'] = time.time()
+            self._write_meta(symbol, meta)
+
+
+class BarStoreProvider(DataProvider):
+    """
+    Serves daily history from a ``BarStore``, syncing it from a remote provider.
+
+    Fundamentals are kept in a stale-while-revalidate memory cache. Other
+    intervals go straight to the wrapped provider.
+    """
+
+    def __init__(self, inner: DataProvider, store: Optional[BarStore] = None,
+                 refresh_seconds: float = BAR_STORE_REFRESH, backfill: str = BAR_STORE_BACKFILL,
+                 hard_ttl: float = BAR_STORE_HARD_TTL):
+        self.inner = inner
+        self.name = inner.name
+        self.remote = inner.remote
+        self.store = store or BarStore()
+        self.refresh_seconds = refresh_seconds
+        self.hard_ttl = max(hard_ttl, refresh_seconds)
+        self.backfill = backfill
+        self._fundamentals = SWRCache('fundamentals', FUNDAMENTALS_SOFT_TTL, FUNDAMENTALS_HARD_TTL)
+
+    def _sync(self, symbol: str, period: str) -> bool:
+        """
+        Make sure the store covers ``period``, refreshing it as its age requires.
+
+        Returns:
+            bool: False if the upstream has no bars for the symbol
+        """
+        meta = self.store.meta(symbol)
+        if meta is None or period_days(period) > period_days(meta['covered']):
+            return self._refresh(symbol, period)
+
+        age = time.time() - meta['synced_at']
+        if age < self.refresh_seconds:
+            return True
+        if age < self.hard_ttl:
+            refresh_in_background('bars', symbol, self._refresh, symbol, period)
+            return True
+        try:
+            return self._refresh(symbol, period)
+        except OSError as e:
+            # Upstream unavailable: the stored bars are better than nothing
+            logger.warning("Serving stale bars for %s: %s", symbol, e)
+            record_stale('bars')
+            mark_stale('bars')
+            return True
+
+    def _refresh(self, symbol: str, period: str) -> bool:
+        """Backfill or append from the upstream unless another worker just did."""
+        os.makedirs(self.store._symbol_dir(symbol), exist_ok=True)
+        with self.store.lock(symbol):
+            # Another worker may have synced while we waited for the lock
+            meta = self.store.meta(symbol)
+            needs_backfill = meta is None or period_days(period) > period_days(meta['covered'])
+            if not needs_backfill and time.time() - meta['synced_at'] < self.refresh_seconds:
+                return True
+
+            if not needs_backfill:
+                last = self.store.read(symbol, period='1d').index[-1]
+                gap_days = (pd.Timestamp.now(tz=last.tz) - last).days + 1
+                bars = self.inner.history(symbol, period=_covering_period(gap_days))
+                if not self.store.revised(symbol, bars):
+                    if bars.empty:
+                        self.store._touch(symbol)
+                    else:
+                        self.store._write(symbol, bars[OHLCV_COLUMNS], None, replace=False)
+                    return True
+                # Earlier bars changed upstream: refetch everything as a new generation
+                logger.info("Stored bars of %s were revised upstream, backfilling again", symbol)
+                period = meta['covered']
+
+            covered = max(period, self.backfill, key=period_days)
+            bars = self.inner.history(symbol, period=covered)
+            if bars.empty:
+                return False
+            logger.info("Backfilled %d bars of %s into the bar store", len(bars), symbol)
+            self.store._write(symbol, bars[OHLCV_COLUMNS], covered, replace=True)
+            return True
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        if interval != "1d":
+            return self.inner.history(symbol, period=period, interval=interval)
+
+        symbol = symbol.upper()
+        if not self._sync(symbol, period):
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return self.store.read(symbol, period)
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        symbol = symbol.upper()
+        return self._fundamentals.get(symbol, lambda: self.inner.fundamentals(symbol))
@@ -0,0 +1,120 @@
+"""
+Admission control: cheap-request latency during a burst of expensive ones.
+
+Spawns the API (as ``benchmarks.loadtest`` does) against the stand-in
+upstream, once with ``ADMISSION_ENABLED=false`` and once with it on. Each run
+fires ``--burst`` uncached ``/stock/predict-advanced`` requests at once, half
+of them with an ``X-Request-Timeout`` budget. Meanwhile ``--users``
+closed-loop users call ``/stock/info`` and ``/health``. Reports cheap-request
+latency, expensive outcomes by status, and the queue time exported per cost
+class.
+
+Runs fully offline on synthetic data.
+
+Usage:
+    python -m benchmarks.bench_admission --burst 24 --users 8
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.fake_upstream import UpstreamBehaviour, start_fake_upstream
+from benchmarks.loadtest import DEFAULT_SYMBOLS, free_port, start_api, wait_healthy
+
+
+async def run_case(upstream_url: str, admission: bool, args) -> None:
+    import httpx
+
+    port = free_port()
+    # A fresh model cache per run, so neither run reuses the other's published models
+    api = start_api(upstream_url, port, {'ADMISSION_ENABLED': str(admission).lower(), 'PRELOAD_MODULES': 'true',
+                                         'MODEL_CACHE_DIR': tempfile.mkdtemp(prefix='stoky-models-')},
+                    verbose=False)
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.burst + args.users + 4)
+    try:
+        async with httpx.AsyncClient(timeout=600, limits=limits) as client:
+            await wait_healthy(client, base_url)
+            for symbol in DEFAULT_SYMBOLS:
+                await client.get(f"{base_url}/stock/info/{symbol}")
+
+            cheap = []
+            outcomes = Counter()
+            done = asyncio.Event()
+
+            async def expensive(i: int):
+                headers = {'X-Request-Timeout': str(args.budget)} if i % 2 else {}
+                start = time.perf_counter()
+                response = await client.get(f"{base_url}/stock/predict-advanced/BURST{i:03d}?period=1y",
+                                            headers=headers)
+                budget = 'budget' if headers else 'no budget'
+                outcomes[(budget, response.status_code)] += 1
+                if response.status_code == 429:
+                    outcomes[('retry_after', response.headers.get('retry-after'))] += 1
+                return time.perf_counter() - start
+
+            async def user(seed: int):
+                rng = random.Random(seed)
+                while not done.is_set():
+                    path = rng.choice([f"/stock/info/{rng.choice(DEFAULT_SYMBOLS)}", "/health"])
+                    start = time.perf_counter()
+                    response = await client.get(f"{base_url}{path}")
+                    cheap.append((time.perf_counter() - start, response.status_code))
+
+            async def burst():
+                try:
+                    return await asyncio.gather(*(expensive(i) for i in range(args.burst)))
+                finally:
+                    done.set()
+
+            start = time.perf_counter()
+            results = await asyncio.gather(burst(), *(user(u) for u in range(args.users)))
+            elapsed = time.perf_counter() - start
+            metrics = (await client.get(f"{base_url}/metrics")).text
+    finally:
+        api.terminate()
+        api.wait(timeout=10)
+
+    latencies = np.array([c[0] for c in cheap]) * 1000
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"\nadmission {'on' if admission else 'off'}: burst finished in {elapsed:.1f}s "
+          f"(slowest expensive {max(results[0]):.1f}s)")
+    print(f"  cheap requests: {len(cheap)}, p50 {p50:.0f} ms, p99 {p99:.0f} ms, "
+          f"non-200 {sum(1 for c in cheap if c[1] != 200)}")
+    print(f"  expensive outcomes: {dict(sorted(outcomes.items(), key=str))}")
+    for cost_class in ('cheap', 'medium', 'expensive'):
+        total = re.search(rf'stoky_admission_queue_seconds_sum{{cost_class="{cost_class}"}} (\S+)', metrics)
+        count = re.search(rf'stoky_admission_queue_seconds_count{{cost_class="{cost_class}"}} (\S+)', metrics)
+        if total and count and float(count.group(1)):
+            print(f"  queue time {cost_class}: mean {float(total.group(1)) / float(count.group(1)) * 1000:.1f} ms "
+                  f"over {int(float(count.group(1)))} requests")
+
+
+async def run(args):
+    upstream = start_fake_upstream(behaviour=UpstreamBehaviour(args.upstream_latency_ms, 10.0))
+    upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}"
+    try:
+        for admission in (False, True):
+            await run_case(upstream_url, admission, args)
+    finally:
+        upstream.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=24, help="Concurrent /stock/predict-advanced requests")
+    parser.add_argument("--users", type=int, default=8, help="Closed-loop users on cheap endpoints")
+    parser.add_argument("--budget", type=float, default=5.0, help="X-Request-Timeout of half the burst")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Consistent-hash ring: load balance across nodes and keys moved on resize.
+
+Maps ``--symbols`` synthetic symbols onto rings of 2 to ``--max-nodes``
+nodes and reports the most and least loaded node relative to an even split,
+and the fraction of symbols that change owner when one node is added (ideal:
+1 / new node count). Also times an owner lookup.
+
+Runs fully offline.
+
+Usage:
+    python -m benchmarks.bench_cluster --symbols 20000 --max-nodes 8 --vnodes 128
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from cluster import CLUSTER_VNODES, HashRing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=20000)
+    parser.add_argument("--max-nodes", type=int, default=8)
+    parser.add_argument("--vnodes", type=int, default=CLUSTER_VNODES)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:05d}" for i in range(args.symbols)]
+    print(f"{args.symbols:,} symbols, {args.vnodes} points per node")
+    print(f"{'nodes':>5}{'max load':>10}{'min load':>10}{'moved on add':>14}{'ideal':>8}")
+    previous = None
+    for n in range(2, args.max_nodes + 1):
+        ring = HashRing([f"api-{i}" for i in range(1, n + 1)], args.vnodes)
+        owners = [ring.owner(symbol) for symbol in symbols]
+        loads = Counter(owners)
+        even = args.symbols / n
+        moved = sum(a != b for a, b in zip(previous, owners)) / args.symbols if previous else None
+        print(f"{n:>5}{max(loads.values()) / even:>9.2f}x{min(loads.values()) / even:>9.2f}x"
+              f"{f'{moved:.1%}' if moved is not None else '':>14}{f'{1 / n:.1%}' if moved is not None else '':>8}")
+        previous = owners
+
+    start = time.perf_counter()
+    for symbol in symbols:
+        ring.owner(symbol)
+    print(f"Owner lookup: {(time.perf_counter() - start) / args.symbols * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
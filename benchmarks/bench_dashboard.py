@@ -0,0 +1,77 @@
+"""
+Symbol page load: ``/stock/dashboard`` vs separate info, history and predict calls.
+
+Points the API (in-process, ``DATA_SOURCE=yahoo_http`` with a temporary bar
+store and model cache) at ``benchmarks.fake_upstream`` and opens ``--symbols``
+symbols the way the frontend does, first with three calls per symbol, then
+with one dashboard call per symbol on a fresh set of symbols.
+``--no-bar-store`` sends every history fetch to the upstream. Reports wall
+time and upstream requests per page, cold (first open) and warm (reopened).
+
+Runs fully offline on synthetic data.
+
+Usage:
+    python -m benchmarks.bench_dashboard --symbols 10 --latency-ms 80
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import data_provider
+from benchmarks.fake_upstream import UpstreamBehaviour, start_fake_upstream
+
+
+def open_page(client, upstream, paths):
+    """Wall time (ms) and upstream requests to load ``paths``, one after the other."""
+    before = upstream.request_count
+    start = time.perf_counter()
+    for path in paths:
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.text)
+    return (time.perf_counter() - start) * 1000, upstream.request_count - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=10, help="Symbols opened per variant")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Fake upstream latency")
+    parser.add_argument("--no-bar-store", action="store_true", help="Fetch every history from the upstream")
+    args = parser.parse_args()
+
+    upstream = start_fake_upstream(behaviour=UpstreamBehaviour(args.latency_ms, jitter_ms=0))
+    scratch = tempfile.mkdtemp()
+    os.environ.update(DATA_SOURCE='yahoo_http', PRELOAD_MODULES='false',
+                      YAHOO_BASE_URL=f"http://127.0.0.1:{upstream.server_address[1]}",
+                      BAR_STORE_DIR=os.path.join(scratch, 'bars'), MODEL_CACHE_DIR=scratch)
+    # data_provider is already imported (by fake_upstream), so set it directly
+    data_provider.BAR_STORE_ENABLED = not args.no_bar_store
+    logging.disable(logging.WARNING)
+
+    from fastapi.testclient import TestClient
+
+    import app
+
+    client = TestClient(app.app)
+    variants = {
+        'separate calls': lambda s: [f"/stock/info/{s}", f"/stock/history/{s}?period=1y", f"/stock/predict/{s}"],
+        'dashboard': lambda s: [f"/stock/dashboard/{s}?period=1y"],
+    }
+    print(f"{args.symbols} symbols per variant, upstream latency {args.latency_ms:.0f} ms, "
+          f"bar store {'off' if args.no_bar_store else 'on'}")
+    print(f"{'':<18}{'cold page':>12}{'requests':>10}{'warm page':>12}{'requests':>10}")
+    for n, (label, paths) in enumerate(variants.items()):
+        symbols = [f"D{n}S{i:03d}" for i in range(args.symbols)]
+        cold = [open_page(client, upstream, paths(s)) for s in symbols]
+        warm = [open_page(client, upstream, paths(s)) for s in symbols]
+        print(f"{label:<18}"
+              f"{statistics.median(ms for ms, _ in cold):>9.0f} ms{statistics.mean(r for _, r in cold):>10.1f}"
+              f"{statistics.median(ms for ms, _ in warm):>9.0f} ms{statistics.mean(r for _, r in warm):>10.1f}")
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Mobile history refresh: full ``/stock/history`` vs ``since=<cursor>`` deltas.
+
+Points the API (in-process, ``DATA_SOURCE=yahoo_http`` with a temporary bar
+store) at ``benchmarks.fake_upstream``, loads ``--symbols`` symbols once, then
+refreshes each the way the mobile app does: a full re-download, and a delta
+from the cursor of the first response. Reports median response size, latency
+and upstream requests per refresh.
+
+Runs fully offline on synthetic data.
+
+Usage:
+    python -m benchmarks.bench_history_sync --symbols 20 --period 5y
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.fake_upstream import UpstreamBehaviour, start_fake_upstream
+
+
+def refresh(client, upstream, path, params):
+    """Bytes, wall time (ms) and upstream requests of one history request."""
+    before = upstream.request_count
+    start = time.perf_counter()
+    response = client.get(path, params=params)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, response.text
+    return len(response.content), elapsed, upstream.request_count - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Fake upstream latency")
+    args = parser.parse_args()
+
+    upstream = start_fake_upstream(behaviour=UpstreamBehaviour(args.latency_ms, jitter_ms=0))
+    scratch = tempfile.mkdtemp()
+    os.environ.update(DATA_SOURCE='yahoo_http', PRELOAD_MODULES='false',
+                      YAHOO_BASE_URL=f"http://127.0.0.1:{upstream.server_address[1]}",
+                      BAR_STORE_DIR=os.path.join(scratch, 'bars'), MODEL_CACHE_DIR=scratch)
+    logging.disable(logging.WARNING)
+
+    from fastapi.testclient import TestClient
+
+    import app
+
+    client = TestClient(app.app)
+    symbols = [f"H{i:03d}" for i in range(args.symbols)]
+    cursors = {s: client.get(f"/stock/history/{s}", params={'period': args.period}).json()['cursor']
+               for s in symbols}
+
+    variants = {
+        'full': lambda s: {'period': args.period},
+        'since=<cursor>': lambda s: {'period': args.period, 'since': cursors[s]},
+    }
+    print(f"{args.symbols} symbols, period {args.period}, upstream latency {args.latency_ms:.0f} ms")
+    print(f"{'refresh':<16}{'bytes':>10}{'latency':>12}{'upstream':>10}")
+    for label, params in variants.items():
+        results = [refresh(client, upstream, f"/stock/history/{s}", params(s)) for s in symbols]
+        print(f"{label:<16}{statistics.median(r[0] for r in results):>10,.0f}"
+              f"{statistics.median(r[1] for r in results):>9.1f} ms"
+              f"{statistics.mean(r[2] for r in results):>10.1f}")
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
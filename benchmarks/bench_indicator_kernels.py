@@ -0,0 +1,176 @@
+"""
+Indicator kernels: parity with the pandas implementations and timings.
+
+Checks the JIT (when numba is installed) and NumPy kernels in
+``indicator_kernels`` against the pandas code ``AdvancedStockPredictor`` used
+before them, on a 30-year daily series and on a multi-symbol panel, then times
+all three. Exits non-zero on a parity failure.
+
+Runs fully offline on synthetic data.
+
+Usage:
+    python -m benchmarks.bench_indicator_kernels --symbols 500 --repeat 5
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicator_kernels
+from benchmarks.fixtures import series_fixture
+from benchmarks.synthetic import TRADING_DAYS_PER_YEAR, make_universe
+
+RTOL = 1e-9
+ATOL = 1e-9
+
+
+# The pandas implementations the kernels replaced
+
+def pandas_stochastic(data, k_period=14, d_period=3):
+    low_min = data['Low'].rolling(window=k_period).min()
+    high_max = data['High'].rolling(window=k_period).max()
+    k = 100 * (data['Close'] - low_min) / (high_max - low_min)
+    return k, k.rolling(window=d_period).mean()
+
+
+def pandas_williams_r(data, period=14):
+    high_max = data['High'].rolling(window=period).max()
+    low_min = data['Low'].rolling(window=period).min()
+    return -100 * (high_max - data['Close']) / (high_max - low_min)
+
+
+def pandas_adx(data, period=14):
+    high_low = data['High'] - data['Low']
+    high_close = np.abs(data['High'] - data['Close'].shift())
+    low_close = np.abs(data['Low'] - data['Close'].shift())
+    true_range = np.maximum(high_low, np.maximum(high_close, low_close)).rolling(window=1).mean()
+    dm_plus = pd.Series(np.where((data['High'] - data['High'].shift()) > (data['Low'].shift() - data['Low']),
+                                 np.maximum(data['High'] - data['High'].shift(), 0), 0), index=data.index)
+    dm_minus = pd.Series(np.where((data['Low'].shift() - data['Low']) > (data['High'] - data['High'].shift()),
+                                  np.maximum(data['Low'].shift() - data['Low'], 0), 0), index=data.index)
+    di_plus = 100 * (dm_plus.rolling(window=period).mean() / true_range.rolling(window=period).mean())
+    di_minus = 100 * (dm_minus.rolling(window=period).mean() / true_range.rolling(window=period).mean())
+    dx = 100 * np.abs(di_plus - di_minus) / (di_plus + di_minus)
+    return di_plus, di_minus, dx.rolling(window=period).mean()
+
+
+def pandas_obv_vpt(data):
+    obv = (np.sign(data['Close'].diff()) * data['Volume']).fillna(0).cumsum()
+    vpt = (data['Volume'] * data['Close'].pct_change()).fillna(0).cumsum()
+    return obv, vpt
+
+
+def pandas_candle_patterns(data):
+    body_size = np.abs(data['Close'] - data['Open'])
+    candle_size = data['High'] - data['Low']
+    lower_shadow = np.minimum(data['Open'], data['Close']) - data['Low']
+    upper_shadow = data['High'] - np.maximum(data['Open'], data['Close'])
+    return (
+        np.where(data['Open'] > data['High'].shift(), 1, 0),
+        np.where(data['Open'] < data['Low'].shift(), 1, 0),
+        np.where(body_size < (candle_size * 0.1), 1, 0),
+        np.where((lower_shadow > 2 * body_size) & (upper_shadow < body_size), 1, 0),
+    )
+
+
+def pandas_all(data):
+    return (*pandas_stochastic(data), pandas_williams_r(data), *pandas_adx(data),
+            *pandas_obv_vpt(data), *pandas_candle_patterns(data))
+
+
+def kernels_all(open_, high, low, close, volume, jit):
+    return (*indicator_kernels.stochastic(high, low, close, jit=jit),
+            indicator_kernels.williams_r(high, low, close, jit=jit),
+            *indicator_kernels.adx(high, low, close, jit=jit),
+            *indicator_kernels.obv_vpt(close, volume, jit=jit),
+            *indicator_kernels.candle_patterns(open_, high, low, close, jit=jit))
+
+
+OUTPUTS = ['Stoch_K', 'Stoch_D', 'Williams_R', 'DI_Plus', 'DI_Minus', 'ADX', 'OBV', 'VPT',
+           'Gap_Up', 'Gap_Down', 'Doji', 'Hammer']
+
+
+def arrays(frames, n_bars):
+    """OHLCV matrices of right-aligned frames (shorter histories start with NaN)."""
+    fields = {}
+    for field in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        matrix = np.full((n_bars, len(frames)), np.nan)
+        for j, frame in enumerate(frames):
+            matrix[n_bars - len(frame):, j] = frame[field].to_numpy(dtype=np.float64)
+        fields[field] = matrix
+    return fields
+
+
+def check_parity(label, frames, n_bars, jit) -> int:
+    """Compare each kernel output column with pandas on that column's own frame."""
+    fields = arrays(frames, n_bars)
+    outputs = kernels_all(fields['Open'], fields['High'], fields['Low'], fields['Close'], fields['Volume'], jit)
+    failures = 0
+    for j, frame in enumerate(frames):
+        expected = pandas_all(frame)
+        for name, got, want in zip(OUTPUTS, outputs, expected):
+            got = got[n_bars - len(frame):, j]
+            want = np.asarray(want, dtype=np.float64)
+            if not np.allclose(got, want, rtol=RTOL, atol=ATOL, equal_nan=True):
+                worst = np.nanmax(np.abs(got - want))
+                print(f"  MISMATCH {label} symbol {j} {name}: max abs diff {worst:.3g}")
+                failures += 1
+    return failures
+
+
+def time_ms(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=500, help="Symbols in the multi-symbol panel")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per implementation")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    np.seterr(divide='ignore', invalid='ignore')
+
+    series = series_fixture('30y')
+    panel_bars = 5 * TRADING_DAYS_PER_YEAR
+    universe = list(make_universe(args.symbols, panel_bars).values())
+    # Vary history lengths so the panel has leading NaNs
+    universe = [frame.iloc[(j * 37) % 400:] for j, frame in enumerate(universe)]
+
+    backends = [('numpy', False)] + ([('jit', True)] if indicator_kernels.JIT_ENABLED else [])
+    failures = 0
+    for backend, jit in backends:
+        failures += check_parity(f"{backend} 30y", [series], len(series), jit)
+        failures += check_parity(f"{backend} panel", universe[:50], panel_bars, jit)
+    print(f"Parity vs pandas ({', '.join(b for b, _ in backends)}): "
+          f"{'OK' if not failures else f'{failures} mismatches'}")
+    if not indicator_kernels.JIT_ENABLED:
+        print("numba not installed (or INDICATOR_JIT off): JIT kernels skipped")
+
+    fields = arrays([series], len(series))
+    panel = arrays(universe, panel_bars)
+    print(f"\n{'':<28}{'30y series':>14}{f'{args.symbols} x 5y panel':>20}")
+    pandas_series = time_ms(lambda: pandas_all(series), args.repeat)
+    pandas_panel = time_ms(lambda: [pandas_all(frame) for frame in universe], max(1, args.repeat // 2))
+    print(f"{'pandas (per symbol)':<28}{pandas_series:>11.2f} ms{pandas_panel:>17.1f} ms")
+    for backend, jit in backends:
+        single = time_ms(lambda: kernels_all(*fields.values(), jit), args.repeat)
+        many = time_ms(lambda: kernels_all(*panel.values(), jit), args.repeat)
+        print(f"{backend + ' kernels':<28}{single:>11.2f} ms{many:>17.1f} ms")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
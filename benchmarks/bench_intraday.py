@@ -0,0 +1,70 @@
+"""
+Intraday ring buffers: bounded memory and update cost over a long run.
+
+Replays ``--sessions`` trading sessions of 1-minute bars into one
+``BarRingBuffer`` the way the provider syncs it (each refresh re-sends the
+session so far, replacing the forming bar), and compares it with keeping an
+ever-growing DataFrame. Also times serving a request from the buffer.
+
+Runs fully offline on synthetic data.
+
+Usage:
+    python -m benchmarks.bench_intraday --sessions 250 --refresh-every 15
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import FIXTURE_END
+from data_provider import OHLCV_COLUMNS, generate_intraday_ohlcv, slice_period
+from intraday import INTRADAY_BUFFER_BARS, BarRingBuffer
+
+BARS_PER_SESSION = 390
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=250, help="Sessions of 1m bars to replay")
+    parser.add_argument("--refresh-every", type=int, default=15, help="Bars between syncs")
+    parser.add_argument("--capacity", type=int, default=INTRADAY_BUFFER_BARS)
+    args = parser.parse_args()
+
+    bars = generate_intraday_ohlcv(args.sessions, '1m', seed=7, end=FIXTURE_END)[OHLCV_COLUMNS]
+
+    buffer = BarRingBuffer(args.capacity)
+    growing = bars.iloc[:0]
+    merge_s = concat_s = 0.0
+    syncs = 0
+    for session_start in range(0, len(bars), BARS_PER_SESSION):
+        for end in range(args.refresh_every, BARS_PER_SESSION + 1, args.refresh_every):
+            update = bars.iloc[session_start:session_start + end]
+            start = time.perf_counter()
+            buffer.merge(update)
+            merge_s += time.perf_counter() - start
+
+            start = time.perf_counter()
+            growing = pd.concat([growing[growing.index < update.index[0]], update])
+            concat_s += time.perf_counter() - start
+            syncs += 1
+
+    assert buffer.frame().equals(bars.iloc[-args.capacity:].set_axis(bars.index[-args.capacity:].as_unit('ns')))
+
+    buffer_mb = (buffer.times.nbytes + buffer.values.nbytes) / 1e6
+    growing_mb = growing.memory_usage(index=True).sum() / 1e6
+
+    start = time.perf_counter()
+    for _ in range(100):
+        slice_period(buffer.frame(), '1d', '1m')
+    serve_ms = (time.perf_counter() - start) * 10
+
+    print(f"Replayed {len(bars):,} 1m bars ({args.sessions} sessions) in {syncs:,} syncs")
+    print(f"{'':<24}{'memory':>10}{'per sync':>12}")
+    print(f"{'ring buffer':<24}{buffer_mb:>7.2f} MB{merge_s / syncs * 1e6:>9.0f} us")
+    print(f"{'growing DataFrame':<24}{growing_mb:>7.2f} MB{concat_s / syncs * 1e6:>9.0f} us")
+    print(f"Serve '1d' from the buffer: {serve_ms:.2f} ms ({len(buffer):,} bars held, capacity {args.capacity:,})")
+
+
+if __name__ == "__main__":
+    main()
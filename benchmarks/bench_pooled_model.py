@@ -0,0 +1,64 @@
+"""
+Per-request latency: per-symbol training vs. the pooled cross-sectional model.
+
+Runs fully offline on synthetic data. The fetch is excluded from both timings
+because it is identical for the two paths.
+
+Usage:
+    python -m benchmarks.bench_pooled_model --symbols 20 --repeat 5
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+from benchmarks.synthetic import TRADING_DAYS_PER_YEAR, make_universe
+from model import StockPredictor
+from pooled_model import PooledStockPredictor
+
+
+def per_symbol_request(symbol, data):
+    """What /stock/predict did before: features, train, then score the latest row."""
+    predictor = StockPredictor(symbol)
+    featured = predictor.create_features(data)
+    predictor.train_model(featured)
+    latest = predictor.create_features(data.iloc[-126:])
+    return predictor.model.predict(latest[predictor.feature_columns].iloc[-1:])[0]
+
+
+def time_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=20, help="Universe size for the pooled model")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per path")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    frames = make_universe(args.symbols, 5 * TRADING_DAYS_PER_YEAR)
+    start = time.perf_counter()
+    pooled = PooledStockPredictor()
+    pooled.train(frames)
+    offline_s = time.perf_counter() - start
+
+    symbol, data = next(iter(frames.items()))
+    per_symbol = time_ms(lambda: per_symbol_request(symbol, data.iloc[-2 * TRADING_DAYS_PER_YEAR:]), args.repeat)
+    pooled_ms = time_ms(lambda: pooled.predict_from_data(symbol, data.iloc[-TRADING_DAYS_PER_YEAR:]), args.repeat)
+
+    print(f"Offline pooled training ({args.symbols} symbols x 5y): {offline_s:.1f} s")
+    print(f"Per-symbol train + predict:  {per_symbol:8.1f} ms / request")
+    print(f"Pooled model predict:        {pooled_ms:8.1f} ms / request")
+    print(f"Speed-up:                    {per_symbol / pooled_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
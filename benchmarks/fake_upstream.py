@@ -0,0 +1,162 @@
+"""
+Local stand-in for the Yahoo Finance JSON API.
+
+Serves ``/v8/finance/chart/{symbol}`` and ``/v10/finance/quoteSummary/{symbol}``
+in Yahoo's response shape from synthetic bars, with configurable latency and
+error rates, so the API can be load-tested without touching Yahoo.
+
+Usage:
+    python -m benchmarks.fake_upstream --port 8900 --latency-ms 80 --error-rate 0.02
+    DATA_SOURCE=yahoo_http YAHOO_BASE_URL=http://127.0.0.1:8900 python -m uvicorn app:app
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from data_provider import SyntheticProvider
+
+MARKET_OPEN_UTC_OFFSET = 14 * 3600 + 30 * 60
+
+
+class UpstreamBehaviour:
+    """Latency and failure settings shared by every request handler."""
+
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 20.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        """Return the delay in seconds and an error status to send, if any."""
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            roll = self._random.random()
+
+        if roll < self.throttle_rate:
+            return delay, 429
+        if roll < self.throttle_rate + self.error_rate:
+            return delay, 503
+        return delay, None
+
+
+class FakeYahooServer(ThreadingHTTPServer):
+    """Threaded HTTP server carrying the synthetic data and behaviour settings."""
+
+    daemon_threads = True
+
+    def __init__(self, address, behaviour: UpstreamBehaviour, seed: int = 0):
+        super().__init__(address, FakeYahooHandler)
+        self.behaviour = behaviour
+        self.provider = SyntheticProvider(seed=seed)
+        self._payloads: Dict[Tuple[str, str], bytes] = {}
+        self._payload_lock = threading.Lock()
+        self.request_count = 0
+
+    def chart_payload(self, symbol: str, period: str) -> bytes:
+        key = (symbol, period)
+        payload = self._payloads.get(key)
+        if payload is None:
+            hist = self.provider.history(symbol, period=period)
+            payload = json.dumps({'chart': {'result': [{
+                'meta': {'symbol': symbol, 'currency': 'USD', 'exchangeTimezoneName': 'America/New_York'},
+                # Daily bars are stamped during the New York session, like Yahoo's
+                'timestamp': [int(ts.timestamp()) + MARKET_OPEN_UTC_OFFSET for ts in hist.index],
+                'indicators': {'quote': [{
+                    'open': hist['Open'].round(4).tolist(),
+                    'high': hist['High'].round(4).tolist(),
+                    'low': hist['Low'].round(4).tolist(),
+                    'close': hist['Close'].round(4).tolist(),
+                    'volume': hist['Volume'].astype(int).tolist(),
+                }]},
+            }], 'error': None}}).encode()
+            with self._payload_lock:
+                self._payloads[key] = payload
+        return payload
+
+    def quote_summary_payload(self, symbol: str) -> bytes:
+        info = self.provider.fundamentals(symbol)
+        return json.dumps({'quoteSummary': {'result': [{
+            'price': {'longName': info['longName'], 'marketCap': {'raw': info['marketCap']}},
+            'summaryDetail': {'trailingPE': {'raw': info['trailingPE']},
+                              'dividendYield': {'raw': info['dividendYield']}},
+        }], 'error': None}}).encode()
+
+
+class FakeYahooHandler(BaseHTTPRequestHandler):
+    """Routes the two Yahoo endpoints the API uses."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.request_count += 1
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+
+        delay, error_status = self.server.behaviour.draw()
+        time.sleep(delay)
+
+        if error_status is not None:
+            self._send(error_status, b'{"error": "upstream unavailable"}')
+        elif parts[:3] == ['v8', 'finance', 'chart'] and len(parts) == 4:
+            period = params.get('range', ['1y'])[0]
+            self._send(200, self.server.chart_payload(parts[3].upper(), period))
+        elif parts[:3] == ['v10', 'finance', 'quoteSummary'] and len(parts) == 4:
+            self._send(200, self.server.quote_summary_payload(parts[3].upper()))
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_upstream(host: str = "127.0.0.1", port: int = 0,
+                        behaviour: Optional[UpstreamBehaviour] = None) -> FakeYahooServer:
+    """
+    Start the stand-in upstream on a background thread.
+
+    Returns:
+        FakeYahooServer: Running server; ``server.server_address`` has the bound port
+    """
+    server = FakeYahooServer((host, port), behaviour or UpstreamBehaviour())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yahoo-shaped local upstream for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Latency standard deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    args = parser.parse_args()
+
+    behaviour = UpstreamBehaviour(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate)
+    server = FakeYahooServer((args.host, args.port), behaviour)
+    print(f"Fake Yahoo upstream on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Deterministic fixtures for the offline benchmark suite.
+"""
+
+from typing import Dict
+
+import pandas as pd
+
+from benchmarks.synthetic import TRADING_DAYS_PER_YEAR, make_ohlcv, make_universe
+
+# Single-symbol histories of increasing length
+SERIES_FIXTURES = {
+    '1y': 1 * TRADING_DAYS_PER_YEAR,
+    '5y': 5 * TRADING_DAYS_PER_YEAR,
+    '30y': 30 * TRADING_DAYS_PER_YEAR,
+}
+
+# Many-symbol panels: (symbol count, bars per symbol)
+PANEL_FIXTURES = {
+    'panel_50x5y': (50, 5 * TRADING_DAYS_PER_YEAR),
+    'panel_500x1y': (500, 1 * TRADING_DAYS_PER_YEAR),
+}
+
+
+def series_fixture(name: str, seed: int = 7) -> pd.DataFrame:
+    """Return the named single-symbol fixture."""
+    return make_ohlcv(SERIES_FIXTURES[name], seed=seed)
+
+
+def panel_fixture(name: str, seed: int = 11) -> Dict[str, pd.DataFrame]:
+    """Return the named many-symbol fixture."""
+    n_symbols, n_bars = PANEL_FIXTURES[name]
+    return make_universe(n_symbols, n_bars, seed=seed)
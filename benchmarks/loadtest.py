@@ -0,0 +1,221 @@
+"""
+Load-test harness for one uvicorn worker against a local stand-in upstream.
+
+Starts ``benchmarks.fake_upstream`` and ``uvicorn app:app --workers 1`` pointed
+at it (``DATA_SOURCE=yahoo_http``), then replays a weighted traffic mix at
+increasing concurrency levels. Reports throughput and p50/p95/p99 latency per
+endpoint for every level, so the saturation point of the worker is visible.
+
+Usage:
+    python -m benchmarks.loadtest --concurrency 1 4 16 64 --duration 20
+    python -m benchmarks.loadtest --target http://127.0.0.1:8000   # existing server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.fake_upstream import UpstreamBehaviour, start_fake_upstream
+
+# (endpoint label, path template, weight)
+TRAFFIC_MIX = [
+    ('/stock/info', '/stock/info/{symbol}', 0.70),
+    ('/stock/history', '/stock/history/{symbol}?period=1y', 0.20),
+    ('/stock/predict', '/stock/predict/{symbol}', 0.07),
+    ('/stock/predict-advanced', '/stock/predict-advanced/{symbol}?period=2y', 0.03),
+]
+
+DEFAULT_SYMBOLS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NVDA', 'TSLA', 'JPM',
+                   'V', 'PETR4.SA', 'VOD.L', '7203.T', 'SHOP.TO', 'ASML.AS']
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_api(upstream_url: str, port: int, extra_env: Dict[str, str], verbose: bool) -> subprocess.Popen:
+    """Launch a single uvicorn worker that reads from the stand-in upstream."""
+    # A fresh bar store per run, so every run starts cold against the upstream.
+    # The stand-in upstream has no rate limit of its own unless asked for one
+    # (--throttle-rate), so the local budget is off; override with --env.
+    env = {**os.environ, 'DATA_SOURCE': 'yahoo_http', 'YAHOO_BASE_URL': upstream_url,
+           'BAR_STORE_DIR': tempfile.mkdtemp(prefix='stoky-bars-'),
+           'UPSTREAM_STATE_DIR': tempfile.mkdtemp(prefix='stoky-upstream-'), 'UPSTREAM_RATE': '0',
+           **extra_env}
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1',
+         '--port', str(port), '--workers', '1', '--log-level', 'warning'],
+        env=env, stdout=output, stderr=output,
+    )
+
+
+async def wait_healthy(client, base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"API at {base_url} did not become healthy")
+
+
+async def run_level(client, base_url: str, concurrency: int, duration: float,
+                    symbols: List[str], seed: int) -> Dict[str, List[Tuple[float, int]]]:
+    """
+    Run ``concurrency`` closed-loop users for ``duration`` seconds.
+
+    Returns:
+        Dict[str, List[Tuple[float, int]]]: (latency seconds, status) samples per endpoint
+    """
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    labels = [m[0] for m in TRAFFIC_MIX]
+    templates = {m[0]: m[1] for m in TRAFFIC_MIX}
+    weights = [m[2] for m in TRAFFIC_MIX]
+    stop_at = time.monotonic() + duration
+
+    async def user(user_id: int):
+        rng = random.Random(seed * 1000 + user_id)
+        while time.monotonic() < stop_at:
+            label = rng.choices(labels, weights)[0]
+            path = templates[label].format(symbol=rng.choice(symbols))
+            start = time.perf_counter()
+            try:
+                status = (await client.get(f"{base_url}{path}")).status_code
+            except Exception:
+                status = 0
+            samples[label].append((time.perf_counter() - start, status))
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return samples
+
+
+def summarise(samples: Dict[str, List[Tuple[float, int]]], duration: float) -> Dict[str, Dict[str, float]]:
+    """Throughput, error count and latency percentiles (ms) per endpoint and overall."""
+    summary = {}
+    everything = []
+    for label, rows in samples.items():
+        everything.extend(rows)
+        summary[label] = _stats(rows, duration)
+    summary['ALL'] = _stats(everything, duration)
+    return summary
+
+
+def _stats(rows: List[Tuple[float, int]], duration: float) -> Dict[str, float]:
+    latencies = np.array([r[0] for r in rows]) * 1000
+    errors = sum(1 for r in rows if r[1] != 200)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        'requests': len(rows),
+        'errors': errors,
+        'throughput_rps': len(rows) / duration,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+    }
+
+
+def print_level(concurrency: int, summary: Dict[str, Dict[str, float]]):
+    print(f"\nconcurrency={concurrency}")
+    print(f"  {'endpoint':<26}{'req':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for label, s in summary.items():
+        print(f"  {label:<26}{s['requests']:>7}{s['errors']:>6}{s['throughput_rps']:>9.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+
+async def run(args) -> Dict:
+    import httpx
+
+    api_process: Optional[subprocess.Popen] = None
+    upstream = None
+    base_url = args.target
+
+    if base_url is None:
+        behaviour = UpstreamBehaviour(args.upstream_latency_ms, args.upstream_jitter_ms,
+                                      args.upstream_error_rate, args.upstream_throttle_rate)
+        upstream = start_fake_upstream(behaviour=behaviour)
+        upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}"
+        port = free_port()
+        api_process = start_api(upstream_url, port, dict(e.split('=', 1) for e in args.env), args.verbose)
+        base_url = f"http://127.0.0.1:{port}"
+
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    levels = []
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            await wait_healthy(client, base_url)
+            if args.warmup:
+                await run_level(client, base_url, 2, args.warmup, args.symbols, seed=0)
+
+            for concurrency in args.concurrency:
+                samples = await run_level(client, base_url, concurrency, args.duration, args.symbols,
+                                          seed=concurrency)
+                summary = summarise(samples, args.duration)
+                print_level(concurrency, summary)
+                levels.append({'concurrency': concurrency, 'endpoints': summary})
+    finally:
+        if api_process is not None:
+            api_process.terminate()
+            api_process.wait(timeout=10)
+        if upstream is not None:
+            upstream.shutdown()
+
+    best = max(levels, key=lambda level: level['endpoints']['ALL']['throughput_rps'])
+    print(f"\nPeak throughput {best['endpoints']['ALL']['throughput_rps']:.1f} req/s "
+          f"at concurrency {best['concurrency']} (saturation point)")
+
+    return {
+        'target': base_url if args.target else 'spawned uvicorn --workers 1',
+        'duration_s': args.duration,
+        'traffic_mix': {label: weight for label, _, weight in TRAFFIC_MIX},
+        'upstream': None if args.target else {
+            'latency_ms': args.upstream_latency_ms,
+            'jitter_ms': args.upstream_jitter_ms,
+            'error_rate': args.upstream_error_rate,
+            'throttle_rate': args.upstream_throttle_rate,
+        },
+        'levels': levels,
+        'saturation_concurrency': best['concurrency'],
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load-test one API worker against a stand-in upstream")
+    parser.add_argument("--target", help="Base URL of an already running API (skips spawning)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Warm-up seconds before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request")
+    parser.add_argument("--symbols", nargs="+", default=DEFAULT_SYMBOLS)
+    parser.add_argument("--upstream-latency-ms", type=float, default=80.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=30.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--env", nargs="*", default=[], help="Extra KEY=VALUE settings for the API process")
+    parser.add_argument("--verbose", action="store_true", help="Show the API process logs")
+    parser.add_argument("--output", default="loadtest_output.json", help="JSON results file")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Offline benchmark suite for feature creation, training and API endpoints.
+
+Everything runs on deterministic synthetic fixtures with no network access,
+and results are written as JSON so two runs can be compared.
+
+Usage:
+    python -m benchmarks.run_benchmarks                       # full suite
+    python -m benchmarks.run_benchmarks --suite features --quick
+    python -m benchmarks.run_benchmarks --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.fixtures import (
+    PANEL_FIXTURES,
+    SERIES_FIXTURES,
+    panel_fixture,
+    series_fixture,
+)
+
+SUITES = ['features', 'training', 'endpoints']
+
+
+def bench(name: str, fn: Callable[[], Any], repeat: int, warmup: int = 1,
+          setup: Optional[Callable[[], Any]] = None, **labels) -> Dict[str, Any]:
+    """
+    Time ``fn`` and summarise the samples in milliseconds.
+
+    Args:
+        name (str): Benchmark name
+        fn (Callable): Zero-argument callable to time
+        repeat (int): Timed repetitions
+        warmup (int): Untimed repetitions run first
+        setup (Callable): Untimed callable run before every repetition, e.g. to empty a cache
+        **labels: Extra fields stored with the result (fixture, endpoint, ...)
+
+    Returns:
+        Dict[str, Any]: Result record
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    result = {
+        'name': name,
+        **labels,
+        'repeat': repeat,
+        'min_ms': min(samples),
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'max_ms': max(samples),
+    }
+    print(f"  {name:<50} {labels.get('fixture', ''):<14} {result['median_ms']:10.2f} ms")
+    return result
+
+
+def run_feature_benchmarks(repeat: int, quick: bool) -> List[Dict[str, Any]]:
+    """Time StockPredictor.create_features and create_advanced_features."""
+    from advanced_model import AdvancedStockPredictor
+    from model import StockPredictor
+
+    results = []
+    basic = StockPredictor("BENCH")
+    advanced = AdvancedStockPredictor("BENCH")
+
+    for fixture in SERIES_FIXTURES:
+        data = series_fixture(fixture)
+        results.append(bench("StockPredictor.create_features",
+                             lambda: basic.create_features(data), repeat, fixture=fixture))
+        results.append(bench("AdvancedStockPredictor.create_advanced_features",
+                             lambda: advanced.create_advanced_features(data), repeat, fixture=fixture))
+
+    for fixture in PANEL_FIXTURES:
+        if quick and fixture != 'panel_50x5y':
+            continue
+        panel = panel_fixture(fixture)
+
+        def run_panel():
+            for symbol, frame in panel.items():
+                AdvancedStockPredictor(symbol).create_advanced_features(frame)
+
+        results.append(bench("create_advanced_features (panel)", run_panel,
+                             max(1, repeat // 3), warmup=0, fixture=fixture, symbols=len(panel)))
+
+    return results
+
+
+def run_training_benchmarks(repeat: int, quick: bool) -> List[Dict[str, Any]]:
+    """Time StockPredictor.train_model and the advanced ensemble train/predict."""
+    from advanced_model import AdvancedStockPredictor
+    from model import StockPredictor
+
+    results = []
+    fixtures = ['1y', '5y'] if quick else list(SERIES_FIXTURES)
+
+    for fixture in fixtures:
+        data = series_fixture(fixture)
+
+        basic_features = StockPredictor("BENCH").create_features(data)
+        results.append(bench("StockPredictor.train_model",
+                             lambda: StockPredictor("BENCH").train_model(basic_features),
+                             repeat, fixture=fixture))
+
+        advanced_features = AdvancedStockPredictor("BENCH").create_advanced_features(data)
+        trained = AdvancedStockPredictor("BENCH")
+
+        def train_advanced():
+            predictor = AdvancedStockPredictor("BENCH")
+            predictor.train_models(advanced_features)
+            return predictor
+
+        results.append(bench("AdvancedStockPredictor.train_models", train_advanced,
+                             max(1, repeat // 2), warmup=0, fixture=fixture))
+
+        trained.train_models(advanced_features)
+        results.append(bench("AdvancedStockPredictor.predict_ensemble",
+                             lambda: trained.predict_ensemble(data), repeat, fixture=fixture))
+
+    return results
+
+
+def run_endpoint_benchmarks(repeat: int, quick: bool) -> List[Dict[str, Any]]:
+    """Time each FastAPI endpoint through an in-process client with offline data."""
+    from fastapi.testclient import TestClient
+
+    from data_provider import SyntheticProvider, set_data_provider
+
+    set_data_provider(SyntheticProvider(seed=7))
+
+    import app as app_module
+    import pooled_model
+    from pooled_model import PooledStockPredictor
+
+    # A small pooled model so /stock/predict exercises its fast path
+    pooled = PooledStockPredictor()
+    pooled.train(panel_fixture('panel_50x5y'))
+    pooled_model._pooled_predictor = pooled
+    pooled_model._pooled_loaded = True
+
+    client = TestClient(app_module.app)
+
+    import model_store
+
+    store_dir = os.path.join(tempfile.mkdtemp(prefix="stoky-bench-store-"), 'store')
+
+    def no_cached_prediction():
+        app_module._prediction_cache.clear()
+
+    def cold():
+        # Nothing cached in memory and nothing published: every sample trains
+        no_cached_prediction()
+        shutil.rmtree(store_dir, ignore_errors=True)
+        model_store._store = model_store.ModelStore(store_dir)
+
+    # Model endpoints are timed from scratch ("cold"), with the fitted models
+    # already in the model store ("store hit") and as response cache hits ("cached")
+    setups = {'cold': cold, 'store hit': no_cached_prediction}
+    endpoints = [
+        ('/health', repeat, None),
+        ('/stock/info/AAPL', repeat, None),
+        ('/stock/history/AAPL?period=1y', repeat, None),
+        ('/stock/history/AAPL?period=10y', repeat, None),
+        ('/stock/predict/AAPL', repeat, 'cold'),
+        ('/stock/predict/AAPL', repeat, 'cached'),
+        ('/stock/predict/AAPL?refine=true', repeat, 'cold'),
+        ('/stock/predict/AAPL?refine=true', repeat, 'store hit'),
+        ('/stock/predict/AAPL?refine=true', repeat, 'cached'),
+        ('/stock/model-info/AAPL', repeat, 'cold'),
+        ('/stock/model-info/AAPL', repeat, 'store hit'),
+        ('/stock/predict-advanced/AAPL?period=3y', max(1, repeat // 2), 'cold'),
+        ('/stock/predict-advanced/AAPL?period=3y', max(1, repeat // 2), 'store hit'),
+        ('/stock/predict-advanced/AAPL?period=3y', max(1, repeat // 2), 'cached'),
+        ('/stock/model-info-advanced/AAPL?period=3y', max(1, repeat // 2), 'cold'),
+        ('/stock/model-info-advanced/AAPL?period=3y', max(1, repeat // 2), 'store hit'),
+    ]
+    if quick:
+        endpoints = [e for e in endpoints if 'advanced' not in e[0]]
+
+    results = []
+    for path, n, variant in endpoints:
+        def call(path=path):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text}")
+
+        name = f"GET {path} ({variant})" if variant else f"GET {path}"
+        results.append(bench(name, call, n, setup=setups.get(variant), fixture='synthetic_30y',
+                             endpoint=path.split('?')[0]))
+
+    return results
+
+
+def collect_metadata() -> Dict[str, Any]:
+    """Describe the environment so runs can be compared fairly."""
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'scikit_learn': sklearn.__version__,
+    }
+
+
+def compare(current: List[Dict[str, Any]], baseline_path: str):
+    """Print the median ratio of every benchmark present in both runs."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(result):
+        return (result['name'], result.get('fixture'))
+
+    previous = {key(r): r for r in baseline['results']}
+    print(f"\nComparison against {baseline_path} (ratio > 1 means slower now):")
+    for result in current:
+        old = previous.get(key(result))
+        if old:
+            ratio = result['median_ms'] / old['median_ms']
+            flag = "  <-- slower" if ratio > 1.1 else ""
+            print(f"  {result['name']:<50} {result.get('fixture', ''):<14} {ratio:6.2f}x{flag}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="STOKY offline benchmark suite")
+    parser.add_argument("--suite", choices=SUITES, action="append",
+                        help="Suite to run (repeatable, default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per benchmark")
+    parser.add_argument("--quick", action="store_true", help="Skip the slowest fixtures")
+    parser.add_argument("--output", default="bench_output.json", help="JSON results file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    # Keep the endpoint suite away from any pooled model on disk
+    os.environ.setdefault("MODEL_CACHE_DIR", tempfile.mkdtemp(prefix="stoky-bench-"))
+
+    runners = {
+        'features': run_feature_benchmarks,
+        'training': run_training_benchmarks,
+        'endpoints': run_endpoint_benchmarks,
+    }
+
+    results = []
+    for suite in args.suite or SUITES:
+        print(f"[{suite}]")
+        results.extend(dict(r, suite=suite) for r in runners[suite](args.repeat, args.quick))
+
+    with open(args.output, "w") as f:
+        json.dump({'metadata': collect_metadata(), 'results': results}, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Cold-start benchmark for one uvicorn worker.
+
+Spawns ``uvicorn app:app`` (offline, ``DATA_SOURCE=synthetic``) several times
+and measures, per run:
+
+- time from process spawn to the first 200 from ``/health``
+- RSS of the worker at that point
+- latency of the first ``/stock/info`` request and RSS after it
+- RSS once the background preload has finished (``PRELOAD_MODULES=true``)
+
+Usage:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --env PRELOAD_MODULES=false
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from benchmarks.loadtest import free_port
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB (Linux only, None elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def get(url: str, timeout: float = 30.0) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except Exception:
+        return 0
+
+
+def measure_once(extra_env: Dict[str, str], settle: float) -> Dict[str, Optional[float]]:
+    """Start one worker, wait for /health, then probe /stock/info."""
+    port = free_port()
+    env = dict(os.environ, DATA_SOURCE='synthetic', **extra_env)
+    base_url = f"http://127.0.0.1:{port}"
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1',
+         '--port', str(port), '--workers', '1', '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while get(f"{base_url}/health", timeout=1.0) != 200:
+            if process.poll() is not None:
+                raise RuntimeError("API process exited during startup")
+            if time.perf_counter() - started > 120:
+                raise RuntimeError("API did not become healthy within 120s")
+            time.sleep(0.01)
+        healthy_s = time.perf_counter() - started
+        healthy_rss = rss_mb(process.pid)
+
+        info_start = time.perf_counter()
+        status = get(f"{base_url}/stock/info/AAPL")
+        first_info_s = time.perf_counter() - info_start
+        if status != 200:
+            raise RuntimeError(f"/stock/info returned {status}")
+        info_rss = rss_mb(process.pid)
+
+        time.sleep(settle)
+        settled_rss = rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    return {
+        'time_to_healthy_s': healthy_s,
+        'rss_at_healthy_mb': healthy_rss,
+        'first_info_s': first_info_s,
+        'rss_after_info_mb': info_rss,
+        'rss_settled_mb': settled_rss,
+    }
+
+
+def summarise(runs: List[Dict[str, Optional[float]]]) -> Dict[str, Optional[float]]:
+    """Median of each measurement across runs."""
+    summary = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs if run[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure API cold start time and memory")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="Seconds to wait after the first request before the final RSS sample")
+    parser.add_argument("--env", nargs="*", default=[], help="Extra KEY=VALUE settings for the API process")
+    parser.add_argument("--output", default="startup_output.json", help="JSON results file")
+    args = parser.parse_args(argv)
+
+    extra_env = dict(e.split('=', 1) for e in args.env)
+    runs = []
+    for i in range(args.runs):
+        run = measure_once(extra_env, args.settle)
+        runs.append(run)
+        print(f"run {i + 1}: healthy in {run['time_to_healthy_s']:.2f}s "
+              f"(RSS {run['rss_at_healthy_mb'] or 0:.0f} MB), first /stock/info {run['first_info_s']:.2f}s, "
+              f"settled RSS {run['rss_settled_mb'] or 0:.0f} MB")
+
+    summary = summarise(runs)
+    print(f"\nmedian over {args.runs} runs:")
+    for key, value in summary.items():
+        print(f"  {key:<22} {value:.3f}" if value is not None else f"  {key:<22} n/a")
+
+    with open(args.output, "w") as f:
+        json.dump({'env': extra_env, 'runs': runs, 'median': summary}, f, indent=2)
+    print(f"Wrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Deterministic synthetic OHLCV data for offline benchmarks.
+"""
+
+import pandas as pd
+
+from data_provider import generate_ohlcv
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Fixed end date so fixtures do not drift with the calendar
+FIXTURE_END = "2024-12-31"
+
+
+def make_ohlcv(n_bars: int, seed: int = 0, start_price: float = 100.0) -> pd.DataFrame:
+    """
+    Generate a daily OHLCV frame from a seeded geometric Brownian motion.
+
+    Args:
+        n_bars (int): Number of business-day bars
+        seed (int): Random seed, the same seed always yields the same frame
+        start_price (float): First close
+
+    Returns:
+        pd.DataFrame: Frame shaped like ``yf.Ticker(...).history()``
+    """
+    return generate_ohlcv(n_bars, seed=seed, start_price=start_price, end=FIXTURE_END)
+
+
+def make_universe(n_symbols: int, n_bars: int, seed: int = 0) -> dict:
+    """
+    Generate one synthetic frame per symbol.
+
+    Returns:
+        dict: Mapping of ``SYN0000``-style symbols to OHLCV frames
+    """
+    return {
+        f"SYN{i:04d}": make_ohlcv(n_bars, seed=seed + i, start_price=20.0 + 5 * i)
+        for i in range(n_symbols)
+    }
@@ -0,0 +1,197 @@
+"""
+Consistent-hash symbol sharding across API nodes.
+
+Behind a load balancer every node would otherwise fetch, train and cache
+every symbol. In cluster mode each symbol has one owner node, so its bar
+store, prediction caches and published models stay hot in one place.
+
+``CLUSTER_CONFIG`` names a static JSON file, the same on every node::
+
+    {"secret": "...",
+     "nodes": [{"id": "api-1", "url": "http://10.0.0.11:8000"},
+               {"id": "api-2", "url": "http://10.0.0.12:8000"}]}
+
+and ``CLUSTER_NODE_ID`` says which entry is this node. Every node builds the
+same ``HashRing`` from the file (``vnodes`` points per node, default
+``CLUSTER_VNODES``), so they agree on owners without a coordinator. Adding a
+node to N-1 moves about 1/N of the symbols. Membership changes by editing the
+file and restarting.
+
+A request for a ``{symbol}`` route owned by another node is either forwarded
+to the owner and its response relayed (``CLUSTER_ROUTING=forward``), or
+answered with a ``307`` to the owner's URL (``redirect``). Forwarded
+requests carry ``X-Cluster-Forwarded-By`` and are always served where they
+land, so nodes with different configs during a rollout cannot loop. The header
+is only honoured if it names a node in the file and, when the file sets a
+``secret``, comes with ``X-Cluster-Signature``, an HMAC of the forwarding node
+and the request line; otherwise the request is routed like any other. If the
+owner cannot be reached, the request is served locally. Requests spanning many symbols
+(quotes, screens, portfolios) are served by whichever node receives them.
+"""
+
+import bisect
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_CONFIG = os.getenv("CLUSTER_CONFIG", "")
+CLUSTER_NODE_ID = os.getenv("CLUSTER_NODE_ID", socket.gethostname())
+CLUSTER_ROUTING = os.getenv("CLUSTER_ROUTING", "forward").lower()
+CLUSTER_VNODES = int(os.getenv("CLUSTER_VNODES", "128"))
+CLUSTER_FORWARD_TIMEOUT = float(os.getenv("CLUSTER_FORWARD_TIMEOUT", "60"))
+CLUSTER_FORWARD_POOL = int(os.getenv("CLUSTER_FORWARD_POOL", "32"))
+
+FORWARDED_HEADER = "X-Cluster-Forwarded-By"
+SIGNATURE_HEADER = "X-Cluster-Signature"
+SERVED_BY_HEADER = "X-Served-By"
+
+# Response headers relayed from the owner (hop-by-hop and length headers are not)
+RELAYED_HEADERS = ("content-type", "retry-after", "x-stale-data", "x-served-by")
+# Request headers not sent on to the owner
+DROPPED_HEADERS = ("host", "content-length", "connection", "accept-encoding",
+                   FORWARDED_HEADER.lower(), SIGNATURE_HEADER.lower())
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to node ids, ``vnodes`` points per node."""
+
+    def __init__(self, nodes: List[str], vnodes: int = CLUSTER_VNODES):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        """The node owning ``key``: the first point clockwise of its hash."""
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+class Cluster:
+    """This node's view of the cluster: the ring, peer URLs and the forwarding session."""
+
+    def __init__(self, node_id: str, nodes: Dict[str, str], routing: str = CLUSTER_ROUTING,
+                 vnodes: int = CLUSTER_VNODES, secret: Optional[str] = None):
+        """
+        Args:
+            node_id (str): Id of this node
+            nodes (Dict[str, str]): Base URL per node id, this node included
+            routing (str): 'forward' or 'redirect'
+            vnodes (int): Ring points per node
+            secret (str, optional): Shared key signing forwarded requests
+
+        Raises:
+            ValueError: If this node is not listed or the routing is unknown
+        """
+        if node_id not in nodes:
+            raise ValueError(f"Node {node_id!r} is not in the cluster config ({', '.join(nodes)})")
+        if routing not in ("forward", "redirect"):
+            raise ValueError(f"Unknown CLUSTER_ROUTING: {routing!r} (expected forward or redirect)")
+        self.node_id = node_id
+        self.nodes = {node: url.rstrip('/') for node, url in nodes.items()}
+        self.routing = routing
+        self.ring = HashRing(sorted(nodes), vnodes)
+        self.secret = secret
+        self._session = None
+
+    @classmethod
+    def from_file(cls, path: str, node_id: str = CLUSTER_NODE_ID) -> "Cluster":
+        """
+        Load the cluster config at ``path``.
+
+        Raises:
+            ValueError: If the file is malformed or does not list ``node_id``
+        """
+        with open(path) as f:
+            config = json.load(f)
+        try:
+            nodes = {entry['id']: entry['url'] for entry in config['nodes']}
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed cluster config {path}: {e}")
+        # Every node must build the same ring, so the file (not the env) decides vnodes
+        return cls(node_id, nodes, vnodes=int(config.get('vnodes', CLUSTER_VNODES)), secret=config.get('secret'))
+
+    def owner(self, symbol: str) -> str:
+        """Id of the node owning ``symbol``."""
+        return self.ring.owner(symbol.upper().strip())
+
+    def url(self, node: str, path: str, query: str = "") -> str:
+        """``path`` (and ``query``) on ``node``."""
+        return f"{self.nodes[node]}{path}{'?' + query if query else ''}"
+
+    def _signature(self, node: str, method: str, path: str, query: str) -> str:
+        message = f"{node}\n{method}\n{path}?{query}".encode()
+        return hmac.new(self.secret.encode(), message, hashlib.sha256).hexdigest()
+
+    def is_forwarded(self, headers, method: str, path: str, query: str) -> bool:
+        """
+        True if the request was forwarded by a peer: ``X-Cluster-Forwarded-By``
+        names a node of the cluster and, with a ``secret``, the signature matches.
+        """
+        node = headers.get(FORWARDED_HEADER)
+        if node is None or node not in self.nodes:
+            return False
+        if not self.secret:
+            return True
+        signature = headers.get(SIGNATURE_HEADER, "")
+        return hmac.compare_digest(signature, self._signature(node, method, path, query))
+
+    @property
+    def session(self):
+        """``requests.Session`` for forwarding, created on first use."""
+        if self._session is None:
+            from upstream import http_session
+
+            self._session = http_session(CLUSTER_FORWARD_POOL)
+        return self._session
+
+    def forward(self, node: str, method: str, path: str, query: str, headers: Dict[str, str], body: bytes):
+        """
+        Send a request on to ``node`` (blocking; call through ``run_io``).
+
+        Returns:
+            requests.Response: The owner's response
+
+        Raises:
+            requests.RequestException: If the owner cannot be reached
+        """
+        headers = {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS}
+        headers[FORWARDED_HEADER] = self.node_id
+        if self.secret:
+            headers[SIGNATURE_HEADER] = self._signature(self.node_id, method, path, query)
+        return self.session.request(method, self.url(node, path, query), headers=headers, data=body or None,
+                                    timeout=CLUSTER_FORWARD_TIMEOUT, allow_redirects=False)
+
+
+_cluster: Optional[Cluster] = None
+_cluster_loaded = False
+_cluster_lock = threading.Lock()
+
+
+def get_cluster() -> Optional[Cluster]:
+    """The process-wide cluster from ``CLUSTER_CONFIG``, or None when running as a single node."""
+    global _cluster, _cluster_loaded
+    if not _cluster_loaded:
+        with _cluster_lock:
+            if not _cluster_loaded:
+                if CLUSTER_CONFIG:
+                    _cluster = Cluster.from_file(CLUSTER_CONFIG)
+                    logger.info("Cluster mode: node %s of %d (%s)", _cluster.node_id,
+                                len(_cluster.nodes), _cluster.routing)
+                    if not _cluster.secret:
+                        logger.warning("Cluster config has no secret: any client naming a node in "
+                                       "%s can skip owner routing", FORWARDED_HEADER)
+                _cluster_loaded = True
+    return _cluster
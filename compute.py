@@ -0,0 +1,55 @@
+"""
+Thread pools for blocking work triggered by API requests.
+
+The endpoints are ``async``, so anything blocking must be handed off or it
+stalls every other request on the worker:
+
+- ``run_io`` for upstream fetches (Starlette's shared thread pool)
+- ``run_compute`` for CPU-heavy feature building, training and inference, on a
+  small bounded pool (``COMPUTE_WORKERS``) so a burst of training requests
+  cannot oversubscribe the CPU. Its queue depth is exported as a metric.
+"""
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import POOL_QUEUE_DEPTH
+from profiling import profiled_thread
+
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_compute_pool = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="stoky-compute")
+
+
+def _call(fn: Callable, *args, **kwargs) -> Any:
+    with profiled_thread():
+        return fn(*args, **kwargs)
+
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking I/O call without blocking the event loop."""
+    return await run_in_threadpool(_call, fn, *args, **kwargs)
+
+
+async def run_compute(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run CPU-bound work on the bounded compute pool.
+
+    The caller's context variables (endpoint label, request timings, profiler)
+    are carried into the worker thread.
+    """
+    context = contextvars.copy_context()
+    call = partial(context.run, _call, fn, *args, **kwargs)
+
+    def task():
+        POOL_QUEUE_DEPTH.dec()
+        return call()
+
+    POOL_QUEUE_DEPTH.inc()
+    return await asyncio.get_running_loop().run_in_executor(_compute_pool, task)
@@ -0,0 +1,529 @@
+"""
+Market-data providers.
+
+Every fetch path (the API endpoints and both predictors) goes through a
+``DataProvider`` so the upstream can be swapped without touching callers:
+
+- ``yfinance``  - live Yahoo Finance data (default)
+- ``yahoo_http`` - Yahoo's chart/quoteSummary JSON API at ``YAHOO_BASE_URL``
+  (the real host, or a local stand-in for load tests)
+- ``local``     - a directory of ``<SYMBOL>.parquet`` / ``<SYMBOL>.csv`` files
+- ``synthetic`` - seeded geometric-Brownian-motion bars, fully offline
+
+The backend is chosen with the ``DATA_SOURCE`` environment variable
+(``DATA_DIR`` for the local backend, ``SYNTHETIC_SEED`` for the synthetic one).
+Daily history from the remote backends is served through the memory-mapped
+bar store (``bar_store.py``) unless ``BAR_STORE_ENABLED`` is off, intraday
+history (``1m``/``5m``/``15m``/``1h``) through the bounded ring buffers in
+``intraday.py``, and their upstream calls go through the rate budget and
+retry policy in ``upstream.py``.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from metrics import record_upstream_error, stage_timer
+
+logger = logging.getLogger(__name__)
+
+BAR_STORE_ENABLED = os.getenv("BAR_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Intraday intervals: bar length, and the periods the upstream serves for each
+# (Yahoo keeps 1m bars for 7 days, 5m/15m for 60 days and 1h for 730 days)
+INTRADAY_INTERVALS = {
+    '1m': pd.Timedelta(minutes=1),
+    '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15),
+    '1h': pd.Timedelta(hours=1),
+}
+INTRADAY_PERIODS = {
+    '1m': ['1d', '5d'],
+    '5m': ['1d', '5d', '1mo'],
+    '15m': ['1d', '5d', '1mo'],
+    '1h': ['1d', '5d', '1mo', '3mo', '6mo', '1y'],
+}
+
+_PERIOD_PATTERN = re.compile(r'^(\d+)(d|wk|mo|y)$')
+
+
+def period_days(period: str) -> float:
+    """Approximate calendar days covered by a yfinance period string."""
+    if period == 'max':
+        return float('inf')
+    if period == 'ytd':
+        return 366
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    return count * {'d': 1.5, 'wk': 7, 'mo': 31, 'y': 366}[unit]
+
+
+def is_intraday(interval: str) -> bool:
+    """True for the intraday intervals (``'1m'``, ``'5m'``, ``'15m'``, ``'1h'``)."""
+    return interval in INTRADAY_INTERVALS
+
+
+def validate_interval(interval: str, period: str):
+    """
+    Check that ``period`` of ``interval`` bars can be served.
+
+    Raises:
+        ValueError: For an unknown interval, or a period longer than the
+            upstream keeps for an intraday interval
+    """
+    if interval == '1d':
+        return
+    if not is_intraday(interval):
+        raise ValueError(f"Unsupported interval: {interval}. Must be one of: 1d, {', '.join(INTRADAY_INTERVALS)}")
+    if period not in INTRADAY_PERIODS[interval]:
+        raise ValueError(f"Period {period} is not available for {interval} bars. "
+                         f"Must be one of: {', '.join(INTRADAY_PERIODS[interval])}")
+
+
+def slice_period(data: pd.DataFrame, period: str, interval: str = "1d") -> pd.DataFrame:
+    """
+    Return the tail of a frame of bars that a yfinance ``period`` string covers.
+
+    Day periods count sessions (``'2d'`` is the last two sessions, which for
+    daily bars is the last two bars), longer periods count calendar time back
+    from the last bar.
+
+    Args:
+        data (pd.DataFrame): Bars sorted by time
+        period (str): yfinance period ('5d', '1mo', '1y', 'ytd', 'max', ...)
+        interval (str): Bar interval of ``data``
+
+    Returns:
+        pd.DataFrame: The matching rows
+    """
+    if data.empty or period == 'max':
+        return data
+
+    # Positional slices keep the result a view of ``data`` (no copy)
+    last = data.index[-1]
+    if period == 'ytd':
+        return data.iloc[data.index.searchsorted(last.replace(month=1, day=1).normalize()):]
+
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        if not is_intraday(interval):
+            return data.iloc[-count:]
+        sessions = data.index.normalize()
+        return data.iloc[sessions.searchsorted(sessions.unique()[-count:][0]):]
+
+    offset = {
+        'wk': pd.DateOffset(weeks=count),
+        'mo': pd.DateOffset(months=count),
+        'y': pd.DateOffset(years=count),
+    }[unit]
+    return data.iloc[data.index.searchsorted(last - offset, side='right'):]
+
+
+def generate_ohlcv(n_bars: int, seed: int = 0, start_price: float = 100.0,
+                   end: Optional[str] = None) -> pd.DataFrame:
+    """
+    Generate daily OHLCV bars from a seeded geometric Brownian motion.
+
+    Args:
+        n_bars (int): Number of business-day bars
+        seed (int): Random seed, the same seed always yields the same bars
+        start_price (float): First close
+        end (str): Date of the last bar (defaults to today)
+
+    Returns:
+        pd.DataFrame: Frame shaped like ``yf.Ticker(...).history()``
+    """
+    rng = np.random.default_rng(seed)
+    drift = rng.uniform(-0.0002, 0.0006)
+    vol = rng.uniform(0.01, 0.03)
+
+    log_returns = drift - 0.5 * vol ** 2 + vol * rng.standard_normal(n_bars)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = close * np.exp(vol * 0.3 * rng.standard_normal(n_bars))
+    spread = np.abs(vol * rng.standard_normal(n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.lognormal(mean=15, sigma=0.4, size=n_bars).round()
+
+    end = end or pd.Timestamp.today().normalize()
+    index = pd.bdate_range(end=end, periods=n_bars, name="Date")
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
+
+
+def generate_intraday_ohlcv(n_sessions: int, interval: str, seed: int = 0, start_price: float = 100.0,
+                            end: Optional[str] = None) -> pd.DataFrame:
+    """
+    Generate intraday bars for ``n_sessions`` US sessions (09:30-16:00 New York).
+
+    Args:
+        n_sessions (int): Number of business-day sessions
+        interval (str): Bar interval ('1m', '5m', '15m', '1h')
+        seed (int): Random seed, the same seed always yields the same bars
+        start_price (float): First close
+        end (str): Date of the last session (defaults to today)
+
+    Returns:
+        pd.DataFrame: Bars indexed by exchange-local timestamps
+    """
+    step = INTRADAY_INTERVALS[interval]
+    offsets = pd.timedelta_range(start='9h30min', end='15h59min', freq=step)
+    sessions = pd.bdate_range(end=end or pd.Timestamp.today().normalize(), periods=n_sessions)
+    index = pd.DatetimeIndex((sessions.values[:, None] + offsets.values[None, :]).ravel(), name="Date")
+
+    bars = generate_ohlcv(len(index), seed=seed, start_price=start_price)
+    # Scale the daily-sized moves down to the bar length
+    scale = np.sqrt(step / pd.Timedelta(hours=6.5))
+    close = start_price * np.exp(np.log(bars['Close'].to_numpy() / start_price) * scale)
+    ratio = close / bars['Close'].to_numpy()
+    bars[['Open', 'High', 'Low', 'Close']] = bars[['Open', 'High', 'Low', 'Close']].to_numpy() * ratio[:, None]
+    bars['Volume'] = (bars['Volume'] * scale ** 2).round()
+    bars.index = index.tz_localize('America/New_York')
+    return bars
+
+
+class DataProvider(ABC):
+    """
+    Source of price history, quotes and fundamentals for a symbol.
+    """
+
+    name = "base"
+    # Fetches over the network (worth fronting with the bar store)
+    remote = False
+
+    @abstractmethod
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        """
+        Fetch OHLCV bars.
+
+        Args:
+            symbol (str): Stock symbol
+            period (str): yfinance-style period ('5d', '1mo', '1y', 'max', ...)
+            interval (str): Bar interval
+
+        Returns:
+            pd.DataFrame: Bars indexed by date, empty if the symbol is unknown
+        """
+
+    def quote(self, symbol: str) -> Optional[Dict[str, float]]:
+        """
+        Latest price, previous close and volume.
+
+        Returns:
+            Dict[str, float]: Quote fields, or None if there is no data
+        """
+        hist = self.history(symbol, period="5d")
+        if hist.empty:
+            return None
+
+        price = float(hist['Close'].iloc[-1])
+        return {
+            'price': price,
+            'previous_close': float(hist['Close'].iloc[-2]) if len(hist) > 1 else price,
+            'volume': int(hist['Volume'].iloc[-1]),
+        }
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        """
+        Company metadata in the ``yf.Ticker.info`` shape (longName, marketCap, ...).
+
+        Returns:
+            Dict[str, Any]: Known fields, possibly empty
+        """
+        return {}
+
+
+class YFinanceProvider(DataProvider):
+    """
+    Live data from Yahoo Finance through yfinance.
+
+    yfinance keeps one pooled HTTP session for the process; calls are
+    rate-limited and retried by the ``yfinance`` upstream governor.
+    """
+
+    name = "yfinance"
+    remote = True
+
+    def __init__(self):
+        from upstream import get_governor
+        self.governor = get_governor(self.name)
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        import yfinance as yf
+        # yfinance raises YFRateLimitError even when it swallows other errors
+        return self.governor.call('history', lambda: yf.Ticker(symbol).history(period=period, interval=interval))
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        import yfinance as yf
+        return self.governor.call('fundamentals', lambda: yf.Ticker(symbol).info) or {}
+
+
+class YahooHTTPProvider(DataProvider):
+    """
+    Yahoo Finance JSON API (``/v8/finance/chart`` and ``/v10/finance/quoteSummary``)
+    over a pooled HTTP session, rate-limited and retried by the ``yahoo_http``
+    upstream governor.
+
+    Pointing ``base_url`` at ``benchmarks/fake_upstream.py`` gives a local,
+    Yahoo-shaped upstream with controllable latency and error rates.
+    """
+
+    name = "yahoo_http"
+    remote = True
+
+    def __init__(self, base_url: str = "https://query1.finance.yahoo.com", timeout: float = 30.0):
+        from upstream import get_governor, http_session
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.governor = get_governor(self.name)
+        self.session = http_session(self.governor.max_concurrency)
+
+    def _fetch(self, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+        return response.json()
+
+    def _get(self, operation: str, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        return self.governor.call(operation, self._fetch, path, params)
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        payload = self._get('history', f"/v8/finance/chart/{symbol.upper()}",
+                            {'range': period, 'interval': interval})
+        results = (payload.get('chart') or {}).get('result') or []
+        if not results or not results[0].get('timestamp'):
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        result = results[0]
+        quote = result['indicators']['quote'][0]
+        index = pd.to_datetime(result['timestamp'], unit='s', utc=True)
+        timezone = (result.get('meta') or {}).get('exchangeTimezoneName')
+        if timezone:
+            index = index.tz_convert(timezone)
+
+        data = pd.DataFrame({
+            'Open': quote['open'],
+            'High': quote['high'],
+            'Low': quote['low'],
+            'Close': quote['close'],
+            'Volume': quote['volume'],
+        }, index=index.rename('Date'), dtype=float)
+        return data.dropna(subset=['Close'])
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        payload = self._get('fundamentals', f"/v10/finance/quoteSummary/{symbol.upper()}",
+                            {'modules': 'price,summaryDetail'})
+        results = (payload.get('quoteSummary') or {}).get('result') or []
+        if not results:
+            return {}
+
+        price = results[0].get('price', {})
+        detail = results[0].get('summaryDetail', {})
+
+        def raw(section, key):
+            value = section.get(key)
+            return value.get('raw') if isinstance(value, dict) else value
+
+        return {
+            'longName': price.get('longName'),
+            'marketCap': raw(price, 'marketCap'),
+            'trailingPE': raw(detail, 'trailingPE'),
+            'dividendYield': raw(detail, 'dividendYield'),
+        }
+
+
+class LocalFileProvider(DataProvider):
+    """
+    Daily bars read from ``<directory>/<SYMBOL>.parquet`` or ``<SYMBOL>.csv``.
+
+    CSV files need a ``Date`` column plus Open/High/Low/Close/Volume. Optional
+    fundamentals are read from ``<directory>/fundamentals.json`` keyed by symbol.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._fundamentals: Optional[Dict[str, Any]] = None
+
+    def _read(self, symbol: str) -> pd.DataFrame:
+        parquet_path = os.path.join(self.directory, f"{symbol}.parquet")
+        csv_path = os.path.join(self.directory, f"{symbol}.csv")
+
+        if os.path.exists(parquet_path):
+            data = pd.read_parquet(parquet_path)
+        elif os.path.exists(csv_path):
+            data = pd.read_csv(csv_path, index_col='Date', parse_dates=True)
+        else:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        return data.sort_index()
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        if interval != "1d":
+            raise ValueError(f"{self.name} provider only stores daily bars")
+        return slice_period(self._read(symbol.upper()), period)
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        if self._fundamentals is None:
+            path = os.path.join(self.directory, "fundamentals.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    self._fundamentals = json.load(f)
+            else:
+                self._fundamentals = {}
+        return self._fundamentals.get(symbol.upper(), {})
+
+
+class SyntheticProvider(DataProvider):
+    """
+    Offline geometric-Brownian-motion bars, deterministic per (seed, symbol).
+    """
+
+    name = "synthetic"
+
+    def __init__(self, seed: int = 0, years: int = 30):
+        self.seed = seed
+        self.n_bars = years * 252
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _frame(self, symbol: str) -> pd.DataFrame:
+        frame = self._frames.get(symbol)
+        if frame is None:
+            symbol_seed = zlib.crc32(symbol.encode())
+            frame = generate_ohlcv(self.n_bars, seed=self.seed + symbol_seed,
+                                   start_price=10.0 + symbol_seed % 490)
+            with self._lock:
+                frame = self._frames.setdefault(symbol, frame)
+        return frame
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        symbol = symbol.upper()
+        if is_intraday(interval):
+            validate_interval(interval, period)
+            n_sessions = 1 if period == '1d' else 5 if period == '5d' else (
+                int(np.ceil(period_days(period) * 5 / 7))
+            )
+            # Continue from the previous daily close, so the two intervals agree roughly
+            daily = self._frame(symbol)
+            return generate_intraday_ohlcv(n_sessions, interval, seed=self.seed + zlib.crc32(f"{symbol}/{interval}".encode()),
+                                           start_price=float(daily['Close'].iloc[-n_sessions - 1]))
+        if interval != "1d":
+            raise ValueError(f"Unsupported interval: {interval}")
+        return slice_period(self._frame(symbol), period).copy()
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        symbol = symbol.upper()
+        close = float(self._frame(symbol)['Close'].iloc[-1])
+        return {
+            'longName': f"{symbol} Synthetic Corp",
+            'marketCap': int(close * 1e9),
+            'trailingPE': 20.0,
+            'dividendYield': 0.01,
+        }
+
+
+class InstrumentedProvider(DataProvider):
+    """
+    Wraps another provider to time every call as the ``fetch`` stage and
+    count upstream errors.
+    """
+
+    def __init__(self, inner: DataProvider):
+        self.inner = inner
+        self.name = inner.name
+        self.remote = inner.remote
+
+    def _call(self, operation: str, *args, **kwargs):
+        with stage_timer('fetch'):
+            try:
+                return getattr(self.inner, operation)(*args, **kwargs)
+            except Exception:
+                record_upstream_error(self.name, operation)
+                raise
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        return self._call('history', symbol, period=period, interval=interval)
+
+    def quote(self, symbol: str) -> Optional[Dict[str, float]]:
+        return self._call('quote', symbol)
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        return self._call('fundamentals', symbol)
+
+
+_provider: Optional[DataProvider] = None
+_provider_lock = threading.Lock()
+
+
+def create_data_provider(source: Optional[str] = None) -> DataProvider:
+    """
+    Build the provider named by ``source`` or the ``DATA_SOURCE`` setting.
+
+    Raises:
+        ValueError: If the source name is unknown
+    """
+    source = (source or os.getenv("DATA_SOURCE", "yfinance")).lower()
+
+    if source == "yfinance":
+        return YFinanceProvider()
+    if source == "yahoo_http":
+        return YahooHTTPProvider(
+            base_url=os.getenv("YAHOO_BASE_URL", "https://query1.finance.yahoo.com"),
+            timeout=float(os.getenv("REQUEST_TIMEOUT", "30"))
+        )
+    if source == "local":
+        return LocalFileProvider(os.getenv("DATA_DIR", "./data"))
+    if source == "synthetic":
+        return SyntheticProvider(seed=int(os.getenv("SYNTHETIC_SEED", "0")))
+
+    raise ValueError(f"Unknown DATA_SOURCE: {source}")
+
+
+def get_data_provider() -> DataProvider:
+    """Return the process-wide provider, creating it from config on first use."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                provider = create_data_provider()
+                if provider.remote and BAR_STORE_ENABLED:
+                    from bar_store import BarStoreProvider
+                    provider = BarStoreProvider(provider)
+                from intraday import IntradayProvider
+                _provider = InstrumentedProvider(IntradayProvider(provider))
+                logger.info("Using %s market-data provider", _provider.name)
+    return _provider
+
+
+def set_data_provider(provider: DataProvider):
+    """Replace the process-wide provider (benchmarks, load tests, offline runs)."""
+    global _provider
+    with _provider_lock:
+        _provider = InstrumentedProvider(provider)
@@ -0,0 +1,235 @@
+"""
+Importance-driven feature pruning for ``AdvancedStockPredictor``.
+
+``create_advanced_features`` produces about 70 columns, many of them
+redundant: ``RSI`` and ``RSI_14`` are the same series, and the short moving
+averages, EMAs and close lags all track the price level. ``select_features``
+looks for the smallest subset whose cross-validated score stays within
+``FEATURE_SET_TOLERANCE`` (R² points) of the full set:
+
+1. score all columns with fresh ensemble members over a time series CV, and
+   rank them by the members' mean feature importance
+2. walk the ranking and drop constant columns and columns correlated above
+   ``FEATURE_SET_MAX_CORRELATION`` with a more important column already kept
+3. halve the ranked list while the score stays within tolerance, then bisect
+   between the last size that passed and the first that failed
+
+Selection runs offline, from this module's CLI (e.g. a nightly job), never on
+a request. The chosen columns are saved per symbol (and bar interval) as JSON
+under ``FEATURE_SET_DIR`` and ignored once older than
+``FEATURE_SET_MAX_AGE_DAYS``. Training and prediction then ask
+``create_advanced_features`` for just those columns, so both the feature
+build and every later fit get cheaper; symbols without a current set use
+every column. Selection uses the whole history, so walk-forward backtests
+keep training on every column.
+
+Usage:
+    python -m feature_selection AAPL MSFT --period 3y
+    python -m feature_selection AAPL MSFT --stale-only   # only symbols without a current set
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FEATURE_SELECTION_ENABLED = os.getenv("FEATURE_SELECTION_ENABLED", "true").lower() in ("1", "true", "yes")
+FEATURE_SET_DIR = os.getenv("FEATURE_SET_DIR", os.path.join(os.getenv("MODEL_CACHE_DIR", "./models"), "features"))
+FEATURE_SET_TOLERANCE = float(os.getenv("FEATURE_SET_TOLERANCE", "0.005"))
+FEATURE_SET_MIN_FEATURES = int(os.getenv("FEATURE_SET_MIN_FEATURES", "8"))
+FEATURE_SET_MAX_CORRELATION = float(os.getenv("FEATURE_SET_MAX_CORRELATION", "0.999"))
+FEATURE_SET_MAX_AGE_DAYS = float(os.getenv("FEATURE_SET_MAX_AGE_DAYS", "30"))
+FEATURE_SET_CV_SPLITS = int(os.getenv("FEATURE_SET_CV_SPLITS", "3"))
+
+_SYMBOL_PATTERN = re.compile(r'[^\w.^=-]+')
+
+
+class FeatureSet(NamedTuple):
+    """Feature columns chosen for one symbol, most important first."""
+    symbol: str
+    columns: List[str]
+    score: float
+    baseline_score: float
+    candidates: int
+    selected_at: float
+    interval: str = "1d"
+
+
+def _path(symbol: str, interval: str = "1d") -> str:
+    suffix = f".{interval}" if interval != "1d" else ""
+    return os.path.join(FEATURE_SET_DIR, f"{_SYMBOL_PATTERN.sub('_', symbol.upper())}{suffix}.json")
+
+
+def load_feature_set(symbol: str, interval: str = "1d",
+                     max_age_days: float = FEATURE_SET_MAX_AGE_DAYS) -> Optional[FeatureSet]:
+    """
+    The persisted feature set for ``symbol`` on ``interval`` bars.
+
+    Args:
+        symbol (str): Stock symbol
+        interval (str): Bar interval the set was selected on
+        max_age_days (float): Ignore sets selected longer ago than this
+
+    Returns:
+        FeatureSet: The saved set, or None if there is none or it is too old
+    """
+    try:
+        with open(_path(symbol, interval)) as f:
+            feature_set = FeatureSet(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+    if time.time() - feature_set.selected_at > max_age_days * 86400:
+        return None
+    return feature_set
+
+
+def save_feature_set(feature_set: FeatureSet):
+    """Atomically write ``feature_set``, replacing any earlier one for the symbol and interval."""
+    path = _path(feature_set.symbol, feature_set.interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w") as f:
+        json.dump(feature_set._asdict(), f)
+    os.replace(tmp_path, path)
+
+
+def _drop_redundant(features: pd.DataFrame, ranked: List[str], max_correlation: float) -> List[str]:
+    """``ranked`` without constant columns and near-duplicates of a more important column."""
+    X = features[ranked].to_numpy(dtype=np.float64)
+    std = X.std(axis=0)
+    varying = std > 0
+    standardized = np.zeros_like(X)
+    standardized[:, varying] = (X[:, varying] - X[:, varying].mean(axis=0)) / std[varying]
+    correlation = np.abs(standardized.T @ standardized) / len(X)
+
+    kept: List[int] = []
+    for i in np.flatnonzero(varying):
+        if not kept or correlation[i, kept].max() < max_correlation:
+            kept.append(i)
+    return [ranked[i] for i in kept]
+
+
+def select_features(predictor, features: pd.DataFrame, tolerance: float = FEATURE_SET_TOLERANCE,
+                    min_features: int = FEATURE_SET_MIN_FEATURES,
+                    max_correlation: float = FEATURE_SET_MAX_CORRELATION,
+                    cv_splits: int = FEATURE_SET_CV_SPLITS) -> FeatureSet:
+    """
+    Find the smallest feature subset that scores within ``tolerance`` of all columns.
+
+    Args:
+        predictor (AdvancedStockPredictor): Predictor whose ensemble scores the subsets
+        features (pd.DataFrame): Output of ``create_advanced_features`` (with ``Target``)
+        tolerance (float): R² points the subset may lose against the full set
+        min_features (int): Never prune below this many columns
+        max_correlation (float): Absolute correlation above which a less
+            important column counts as a duplicate
+        cv_splits (int): Time series CV folds per evaluation
+
+    Returns:
+        FeatureSet: The chosen columns, most important first. All columns if
+            no pruned set stays within tolerance.
+
+    Raises:
+        ValueError: If there are too few rows for the CV
+    """
+    start = time.perf_counter()
+    columns = [c for c in features.columns if c not in predictor.NON_FEATURE_COLUMNS]
+    baseline, importance = predictor.cross_validate(features, columns, cv_splits)
+    ranked = sorted(columns, key=importance.get, reverse=True)
+    ranked = _drop_redundant(features, ranked, max_correlation)
+    threshold = baseline - tolerance
+
+    scores: Dict[int, float] = {}
+
+    def passes(size: int) -> bool:
+        if size not in scores:
+            scores[size] = predictor.cross_validate(features, ranked[:size], cv_splits)[0]
+        return scores[size] >= threshold
+
+    if not passes(len(ranked)):
+        logger.info("Keeping all %d features for %s: the de-duplicated set scores %.4f vs %.4f",
+                    len(columns), predictor.symbol, scores[len(ranked)], baseline)
+        return FeatureSet(predictor.symbol, ranked + [c for c in columns if c not in ranked],
+                          baseline, baseline, len(columns), time.time(), predictor.interval)
+
+    # Halve while within tolerance, then bisect between the last pass and the first failure
+    passing, failing = len(ranked), None
+    while passing > min_features and failing is None:
+        size = max(min_features, passing // 2)
+        if passes(size):
+            passing = size
+        else:
+            failing = size
+    while failing is not None and passing - failing > 1:
+        size = (passing + failing) // 2
+        if passes(size):
+            passing = size
+        else:
+            failing = size
+
+    logger.info("Selected %d of %d features for %s (CV R² %.4f vs %.4f, %d evaluations, %.1fs)",
+                passing, len(columns), predictor.symbol, scores[passing], baseline,
+                len(scores) + 1, time.perf_counter() - start)
+    return FeatureSet(predictor.symbol, ranked[:passing], scores[passing], baseline,
+                      len(columns), time.time(), predictor.interval)
+
+
+def get_feature_columns(predictor) -> Optional[List[str]]:
+    """
+    Feature columns to train ``predictor`` on: its saved feature set, if current.
+
+    Selection itself only runs offline (``python -m feature_selection``), since
+    it costs several full trainings; a symbol without a current set trains
+    on every column.
+
+    Args:
+        predictor (AdvancedStockPredictor): Predictor for the symbol
+
+    Returns:
+        List[str]: The selected columns, or None to use all of them (selection
+            disabled, or no current set for the symbol)
+    """
+    if not FEATURE_SELECTION_ENABLED:
+        return None
+    feature_set = load_feature_set(predictor.symbol, predictor.interval)
+    return feature_set.columns if feature_set is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Select and save the feature set of each symbol")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--period", default="3y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--tolerance", type=float, default=FEATURE_SET_TOLERANCE)
+    parser.add_argument("--stale-only", action="store_true",
+                        help="Skip symbols whose feature set is younger than FEATURE_SET_MAX_AGE_DAYS")
+    args = parser.parse_args()
+
+    from advanced_model import AdvancedStockPredictor
+
+    for symbol in args.symbols:
+        predictor = AdvancedStockPredictor(symbol, interval=args.interval)
+        if args.stale_only and load_feature_set(predictor.symbol, predictor.interval) is not None:
+            print(f"{predictor.symbol}: feature set is current")
+            continue
+        data = predictor.fetch_stock_data(args.period)
+        features = predictor.create_advanced_features(data) if data is not None else None
+        if features is None or features.empty:
+            print(f"{predictor.symbol}: no data")
+            continue
+        feature_set = select_features(predictor, features, tolerance=args.tolerance)
+        save_feature_set(feature_set)
+        print(json.dumps(feature_set._asdict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
 'use client';
 
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
+import axios from 'axios';
 import { Search, X } from 'lucide-react';
 
+const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+
+interface SymbolMatch {
+  symbol: string;
+  name: string;
+  exchange: string;
+  currency: string;
+}
+
 interface StockSearchProps {
   onSearch: (symbol: string) => void;
   isLoading?: boolean;
@@ -12,6 +22,37 @@ interface StockSearchProps {
 export default function StockSearch({ onSearch, isLoading = false, currentSymbol }: StockSearchProps) {
   const [symbol, setSymbol] = useState(currentSymbol || '');
   const [error, setError] = useState('');
+  const [suggestions, setSuggestions] = useState<SymbolMatch[]>([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
+
+  // Autocomplete from /stock/search, debounced while typing
+  useEffect(() => {
+    const query = symbol.trim();
+    if (!query) {
+      setSuggestions([]);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get<{ results: SymbolMatch[] }>(`${API_URL}/stock/search`, {
+          params: { q: query, limit: 8 },
+          signal: controller.signal,
+        });
+        setSuggestions(response.data.results);
+      } catch (err) {
+        if (!axios.isCancel(err)) {
+          setSuggestions([]);
+        }
+      }
+    }, 150);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [symbol]);
 
   const popularStocks = [
     'AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 
@@ -40,9 +81,17 @@ export default function StockSearch({ onSearch, isLoading = false, currentSymbol
     }
     
     setError('');
+    setShowSuggestions(false);
     onSearch(trimmedSymbol);
   };
 
+  const handleSuggestionClick = (match: SymbolMatch) => {
+    setSymbol(match.symbol);
+    setError('');
+    setShowSuggestions(false);
+    onSearch(match.symbol);
+  };
+
   const handlePopularStockClick = (stockSymbol: string) => {
     setSymbol(stockSymbol);
     setError('');
@@ -52,6 +101,7 @@ export default function StockSearch({ onSearch, isLoading = false, currentSymbol
   const clearSearch = () => {
     setSymbol('');
     setError('');
+    setSuggestions([]);
   };
 
   return (
@@ -69,8 +119,12 @@ export default function StockSearch({ onSearch, isLoading = false, currentSymbol
             value={symbol}
             onChange={(e) => {
               setSymbol(e.target.value.toUpperCase());
+              setShowSuggestions(true);
               if (error) setError('');
             }}
+            onFocus={() => setShowSuggestions(true)}
+            onBlur={() => setTimeout(() => setShowSuggestions(false), 150)}
+            autoComplete="off"
             placeholder="Enter stock symbol (e.g., AAPL, GOOGL)"
             className={`block w-full pl-10 pr-10 py-3 border rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500 ${
               error 
@@ -78,7 +132,7 @@ export default function StockSearch({ onSearch, isLoading = false, currentSymbol
                 : 'border-gray-300 bg-white'
             }`}
             disabled={isLoading}
-            maxLength={10}
+            maxLength={32}
           />
           {symbol && (
             <button
@@ -89,6 +143,26 @@ export default function StockSearch({ onSearch, isLoading = false, currentSymbol
               <X className="h-5 w-5 text-gray-400 hover:text-gray-600" />
             </button>
           )}
+          {showSuggestions && suggestions.length > 0 && (
+            <ul className="absolute z-10 mt-1 w-full bg-white border border-gray-200 rounded-lg shadow-lg max-h-72 overflow-y-auto">
+              {suggestions.map((match) => (
+                <li key={match.symbol}>
+                  <button
+                    type="button"
+                    onMouseDown={(e) => e.preventDefault()}
+                    onClick={() => handleSuggestionClick(match)}
+                    className="w-full px-4 py-2 text-left hover:bg-blue-50 flex items-center justify-between"
+                  >
+                    <span>
+                      <span className="font-medium text-gray-900">{match.symbol}</span>
+                      <span className="ml-2 text-sm text-gray-600">{match.name}</span>
+                    </span>
+                    <span className="text-xs text-gray-400">{match.exchange} · {match.currency}</span>
+                  </button>
+                </li>
+              ))}
+            </ul>
+          )}
         </div>
         
         {error && (
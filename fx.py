@@ -0,0 +1,159 @@
+"""
+Currency conversion for prices quoted on different exchanges.
+
+``RateTable`` is an N x N matrix of conversion rates between the trading
+currencies of the exchanges in ``symbol_directory.EXCHANGES``, built from one
+USD rate per currency (Yahoo's ``<CCY>=X`` pairs). Converting a batch of
+prices is one fancy-indexed multiply: the factor for each row is
+``matrix[from, to]`` times the exchange's price scale (London quotes are in
+pence).
+
+The table is cached stale-while-revalidate (``FX_SOFT_TTL``/``FX_HARD_TTL``)
+and refreshed through the market-data provider. Offline providers
+(``synthetic``, ``local``) use the approximate ``REFERENCE_USD_RATES``.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_provider import DataProvider, get_data_provider
+from swr_cache import SWRCache
+from symbol_directory import EXCHANGES, exchange_for
+
+logger = logging.getLogger(__name__)
+
+FX_SOFT_TTL = float(os.getenv("FX_SOFT_TTL", "3600"))
+FX_HARD_TTL = float(os.getenv("FX_HARD_TTL", "86400"))
+
+CURRENCIES: Tuple[str, ...] = tuple(sorted({exchange.currency for exchange in EXCHANGES.values()}))
+
+# Units of each currency per USD, used when the provider has no FX data
+REFERENCE_USD_RATES: Dict[str, float] = {
+    'USD': 1.0, 'EUR': 0.92, 'GBP': 0.78, 'JPY': 150.0, 'CAD': 1.37, 'AUD': 1.52,
+    'CHF': 0.88, 'HKD': 7.8, 'CNY': 7.2, 'KRW': 1350.0, 'INR': 83.5, 'MXN': 18.0,
+    'BRL': 5.4,
+}
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+class RateTable(NamedTuple):
+    """Conversion matrix: ``matrix[i, j]`` converts currency ``i`` to ``j``."""
+    currencies: Tuple[str, ...]
+    index: Dict[str, int]
+    matrix: np.ndarray
+    as_of: float
+    source: str
+
+    @classmethod
+    def from_usd_rates(cls, usd_rates: Dict[str, float], source: str) -> "RateTable":
+        """
+        Build the matrix from units of each currency per USD. Currencies
+        without a rate get NaN rows and columns.
+        """
+        per_usd = np.array([usd_rates.get(c, np.nan) for c in CURRENCIES], dtype=np.float64)
+        matrix = per_usd[None, :] / per_usd[:, None]
+        return cls(CURRENCIES, {c: i for i, c in enumerate(CURRENCIES)}, matrix, time.time(), source)
+
+    def _position(self, currency: str) -> int:
+        try:
+            return self.index[currency.upper()]
+        except KeyError:
+            raise ValueError(f"Unsupported currency: {currency}. Supported: {', '.join(self.currencies)}")
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        """
+        Units of ``to_currency`` per unit of ``from_currency``.
+
+        Raises:
+            ValueError: If either currency is unknown or has no rate
+        """
+        value = float(self.matrix[self._position(from_currency), self._position(to_currency)])
+        if np.isnan(value):
+            raise ValueError(f"No exchange rate available for {from_currency} to {to_currency}")
+        return value
+
+    def symbol_factors(self, symbols: Sequence[str], to_currency: str) -> np.ndarray:
+        """
+        Multipliers taking each symbol's quoted prices to ``to_currency``
+        (exchange rate times the exchange's price scale).
+
+        Raises:
+            ValueError: If a rate is missing
+        """
+        exchanges = [exchange_for(symbol) for symbol in symbols]
+        rows = np.array([self._position(e.currency) for e in exchanges], dtype=np.intp)
+        scales = np.array([e.price_scale for e in exchanges], dtype=np.float64)
+        factors = self.matrix[rows, self._position(to_currency)] * scales
+        if np.isnan(factors).any():
+            missing = sorted({e.currency for e, f in zip(exchanges, factors) if np.isnan(f)})
+            raise ValueError(f"No exchange rate available for {', '.join(missing)} to {to_currency}")
+        return factors
+
+    def convert_prices(self, prices, symbols: Sequence[str], to_currency: str) -> np.ndarray:
+        """
+        Convert one price per symbol (or a prices x symbols matrix) in a
+        single vectorised multiply.
+        """
+        return np.asarray(prices, dtype=np.float64) * self.symbol_factors(symbols, to_currency)
+
+    def convert_frame(self, frame: pd.DataFrame, symbol: str, to_currency: str) -> pd.DataFrame:
+        """Copy of an OHLCV frame with its price columns in ``to_currency`` (volume unchanged)."""
+        factor = self.symbol_factors([symbol], to_currency)[0]
+        converted = frame.copy()
+        columns = [c for c in PRICE_COLUMNS if c in converted.columns]
+        converted[columns] = converted[columns].to_numpy(dtype=np.float64) * factor
+        return converted
+
+
+def _fetch_usd_rates(provider: DataProvider) -> Dict[str, float]:
+    """
+    Latest units per USD for every currency from the provider's ``<CCY>=X`` quotes.
+
+    Raises:
+        Exception: The first upstream error if no rate could be fetched
+    """
+    codes = [c for c in CURRENCIES if c != 'USD']
+    errors = []
+
+    def latest(code: str) -> Optional[float]:
+        try:
+            quote = provider.quote(f"{code}=X")
+        except Exception as e:
+            errors.append(e)
+            return None
+        return quote['price'] if quote else None
+
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="stoky-fx") as pool:
+        prices = list(pool.map(latest, codes))
+
+    rates = {code: price for code, price in zip(codes, prices) if price}
+    if not rates and errors:
+        raise errors[0]
+    missing = sorted(set(codes) - set(rates))
+    if missing:
+        logger.warning("No FX rate for %s", ", ".join(missing))
+    rates['USD'] = 1.0
+    return rates
+
+
+def load_rate_table(provider: Optional[DataProvider] = None) -> RateTable:
+    """Build a fresh table from the provider, or from reference rates offline."""
+    provider = provider or get_data_provider()
+    if not provider.remote:
+        return RateTable.from_usd_rates(REFERENCE_USD_RATES, 'reference')
+    return RateTable.from_usd_rates(_fetch_usd_rates(provider), provider.name)
+
+
+_rate_cache = SWRCache('fx', FX_SOFT_TTL, FX_HARD_TTL, max_entries=1)
+
+
+def get_rate_table() -> RateTable:
+    """The cached rate table (may block on the first load)."""
+    return _rate_cache.get('usd', load_rate_table)
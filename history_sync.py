@@ -0,0 +1,115 @@
+"""
+Delta sync of price history for clients that keep a local copy.
+
+``/stock/history`` returns a ``cursor`` with every response. A client that
+sends it back as ``since=<cursor>`` gets only the bars from the cursor's last
+bar onwards. That bar is resent because it may have been an unfinished session
+when the client got it. Clients replace bars by date.
+
+A cursor also fingerprints the settled bar before its last one, i.e. that
+bar's date and close as served. If that bar is gone or its close has changed,
+earlier history was revised upstream, e.g. adjusted for a split or dividend.
+The whole period is then returned with ``revised`` set, and the client
+replaces its copy.
+
+``since`` may also be a plain date (``2024-01-31``) or timestamp, which returns
+the bars strictly after it. No revision check is possible in that case.
+
+Cursors are opaque to clients: URL-safe base64 of a small JSON list.
+"""
+
+import base64
+import json
+import math
+import re
+from typing import Optional, Tuple
+
+import pandas as pd
+
+_DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?$')
+_CURSOR_VERSION = 1
+
+
+def _utc_nanos(timestamp: pd.Timestamp) -> int:
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return int(timestamp.as_unit('ns').value)
+
+
+def _from_utc_nanos(nanos: int, index: pd.DatetimeIndex) -> pd.Timestamp:
+    timestamp = pd.Timestamp(nanos, unit='ns')
+    if index.tz is not None:
+        timestamp = timestamp.tz_localize('UTC').tz_convert(index.tz)
+    return timestamp
+
+
+def make_cursor(hist: pd.DataFrame) -> Optional[str]:
+    """
+    Cursor for a client holding ``hist``: its last bar, plus the date and close of the bar before.
+
+    Args:
+        hist (pd.DataFrame): Bars as served, before any currency conversion
+
+    Returns:
+        str: Opaque cursor, or None if ``hist`` is empty
+    """
+    if hist.empty:
+        return None
+    payload = [_CURSOR_VERSION, _utc_nanos(hist.index[-1])]
+    if len(hist) > 1:
+        payload += [_utc_nanos(hist.index[-2]), float(hist['Close'].iloc[-2])]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _parse_cursor(cursor: str) -> list:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError(f"Invalid since value: {cursor!r} (expected a date or a cursor)")
+    # bool is an int subclass and JSON allows NaN: neither can come from make_cursor
+    if (not isinstance(payload, list) or len(payload) not in (2, 4) or payload[0] != _CURSOR_VERSION
+            or not all(isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+                       for value in payload)
+            or not all(isinstance(value, int) for value in payload[1:3])):
+        raise ValueError("Unsupported history cursor; request the full history for a new one")
+    return payload
+
+
+def bars_since(hist: pd.DataFrame, since: str) -> Tuple[pd.DataFrame, bool]:
+    """
+    The bars of ``hist`` a client that synced up to ``since`` is missing.
+
+    Args:
+        hist (pd.DataFrame): Current bars for the requested period
+        since (str): A cursor from an earlier response, or a date/timestamp
+
+    Returns:
+        Tuple[pd.DataFrame, bool]: The bars to send, and whether earlier bars
+            were revised (in which case all of ``hist`` is sent)
+
+    Raises:
+        ValueError: If ``since`` is neither a date nor a valid cursor
+    """
+    if hist.empty:
+        return hist, False
+    index = hist.index
+
+    if _DATE_PATTERN.match(since):
+        timestamp = pd.Timestamp(since)
+        if index.tz is not None:
+            timestamp = timestamp.tz_localize(index.tz)
+        if len(since) == 10:
+            # A bare date means after that whole day
+            return hist.iloc[index.searchsorted(timestamp + pd.Timedelta(days=1)):], False
+        return hist.iloc[index.searchsorted(timestamp, side='right'):], False
+
+    payload = _parse_cursor(since)
+    last = _from_utc_nanos(payload[1], index)
+    if len(payload) == 4:
+        anchor = _from_utc_nanos(payload[2], index)
+        position = index.searchsorted(anchor)
+        if (position == len(index) or index[position] != anchor
+                or not math.isclose(float(hist['Close'].iloc[position]), payload[3], rel_tol=1e-9)):
+            return hist, True
+    return hist.iloc[index.searchsorted(last):], False
@@ -0,0 +1,376 @@
+"""
+Kernels for the path-dependent technical indicators.
+
+The stochastic oscillator, Williams %R, ADX, OBV/VPT and the candlestick
+patterns each take a handful of pandas operations and temporary Series per
+indicator. Here each is one function over ``bars x symbols`` float arrays
+(1-D arrays are treated as a single symbol), with two implementations:
+
+- a JIT-compiled single pass per symbol when ``numba`` is installed and
+  ``INDICATOR_JIT`` is on (the default)
+- a pure NumPy fallback built from the vectorised rolling helpers below, which
+  the screener also uses for its other indicators
+
+Both follow pandas ``rolling(window)`` semantics (NaN until the window is
+full, NaN while it holds a NaN), and cells before a symbol's first bar are
+NaN, so a right-aligned panel column gives the same values as that symbol's
+own frame. ``benchmarks/bench_indicator_kernels.py`` checks both against the
+original pandas implementations.
+"""
+
+import logging
+import os
+from typing import Callable, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import numba
+except ImportError:  # optional: the NumPy kernels are used instead
+    numba = None
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_JIT = os.getenv("INDICATOR_JIT", "true").lower() in ("1", "true", "yes")
+
+JIT_ENABLED = numba is not None and INDICATOR_JIT
+
+
+# Vectorised NumPy helpers: every array is bars x symbols, time runs down axis 0
+
+def shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    out[periods:] = x[:-periods]
+    return out
+
+
+def pct_change(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    return x / shift(x, periods) - 1
+
+
+def before_first_bar(values: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """NaN out the cells before each symbol's first non-NaN ``reference`` value."""
+    started = np.maximum.accumulate(~np.isnan(reference), axis=0)
+    return np.where(started, values, np.nan)
+
+
+def _window_sums(x: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum and count of non-NaN values over each trailing window (rows ``window-1:``)."""
+    valid = ~np.isnan(x)
+    zero = np.zeros((1, x.shape[1]))
+    sums = np.concatenate([zero, np.cumsum(np.where(valid, x, 0.0), axis=0)])
+    counts = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    return sums[window:] - sums[:-window], counts[window:] - counts[:-window]
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """``rolling(window).mean()``: NaN unless the whole window has values."""
+    out = np.full(x.shape, np.nan)
+    if window <= len(x):
+        total, count = _window_sums(x, window)
+        out[window - 1:] = np.where(count == window, total / window, np.nan)
+    return out
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """``rolling(window).std()`` (ddof=1), from sums of squares around each symbol's last value."""
+    out = np.full(x.shape, np.nan)
+    if 1 < window <= len(x):
+        # Centring keeps the sum-of-squares difference well conditioned
+        centred = x - np.nan_to_num(x[-1])
+        total, count = _window_sums(centred, window)
+        squares, _ = _window_sums(centred * centred, window)
+        variance = np.maximum((squares - total * total / window) / (window - 1), 0.0)
+        out[window - 1:] = np.where(count == window, np.sqrt(variance), np.nan)
+    return out
+
+
+def rolling_extreme(x: np.ndarray, window: int, reducer: Callable = np.max) -> np.ndarray:
+    """``rolling(window).max()`` / ``.min()`` over a sliding-window view."""
+    out = np.full(x.shape, np.nan)
+    if window <= len(x):
+        out[window - 1:] = reducer(sliding_window_view(x, window, axis=0), axis=-1)
+    return out
+
+
+def ewm_mean(x: np.ndarray, span: int) -> np.ndarray:
+    """``ewm(span=span).mean()`` (adjusted weights), one row update for all symbols."""
+    decay = 1 - 2 / (span + 1)
+    numerator = np.zeros(x.shape[1])
+    denominator = np.zeros(x.shape[1])
+    out = np.empty(x.shape)
+    for t, row in enumerate(x):
+        valid = ~np.isnan(row)
+        numerator = decay * numerator + np.where(valid, row, 0.0)
+        denominator = decay * denominator + valid
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[t] = np.where(denominator > 0, numerator / denominator, np.nan)
+    return out
+
+
+# NumPy implementations
+
+def _np_stochastic(high, low, close, k_period, d_period):
+    lowest = rolling_extreme(low, k_period, np.min)
+    k = 100 * (close - lowest) / (rolling_extreme(high, k_period) - lowest)
+    return k, rolling_mean(k, d_period)
+
+
+def _np_williams_r(high, low, close, period):
+    highest = rolling_extreme(high, period)
+    return -100 * (highest - close) / (highest - rolling_extreme(low, period, np.min))
+
+
+def _np_adx(high, low, close, period):
+    previous_close = shift(close)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous_close), np.abs(low - previous_close)))
+    up = high - shift(high)
+    down = shift(low) - low
+    plus = before_first_bar(np.where(up > down, np.maximum(up, 0), 0.0), high)
+    minus = before_first_bar(np.where(down > up, np.maximum(down, 0), 0.0), high)
+    average_range = rolling_mean(true_range, period)
+    di_plus = 100 * rolling_mean(plus, period) / average_range
+    di_minus = 100 * rolling_mean(minus, period) / average_range
+    adx = rolling_mean(100 * np.abs(di_plus - di_minus) / (di_plus + di_minus), period)
+    return di_plus, di_minus, adx
+
+
+def _np_obv_vpt(close, volume):
+    obv_steps = np.nan_to_num(np.sign(close - shift(close)) * volume)
+    vpt_steps = np.nan_to_num(volume * pct_change(close), posinf=0.0, neginf=0.0)
+    return (before_first_bar(np.cumsum(obv_steps, axis=0), close),
+            before_first_bar(np.cumsum(vpt_steps, axis=0), close))
+
+
+def _np_candle_patterns(open_, high, low, close):
+    body = np.abs(close - open_)
+    lower_shadow = np.minimum(open_, close) - low
+    upper_shadow = high - np.maximum(open_, close)
+    flags = (
+        open_ > shift(high),
+        open_ < shift(low),
+        body < (high - low) * 0.1,
+        (lower_shadow > 2 * body) & (upper_shadow < body),
+    )
+    return tuple(before_first_bar(np.where(flag, 1.0, 0.0), close) for flag in flags)
+
+
+# JIT implementations: one pass per symbol with running window state
+
+if JIT_ENABLED:
+    _jit = numba.njit(cache=True, nogil=True, error_model='numpy')
+
+    @_jit
+    def _first_bar(x):
+        for t in range(len(x)):
+            if not np.isnan(x[t]):
+                return t
+        return len(x)
+
+    @_jit
+    def _jit_window_mean(x, window, out):
+        """Rolling mean of one column into ``out`` (running sum and NaN count)."""
+        total = 0.0
+        nans = 0
+        for t in range(len(x)):
+            value = x[t]
+            if np.isnan(value):
+                nans += 1
+            else:
+                total += value
+            if t >= window:
+                old = x[t - window]
+                if np.isnan(old):
+                    nans -= 1
+                else:
+                    total -= old
+            out[t] = total / window if t >= window - 1 and nans == 0 else np.nan
+
+    @_jit
+    def _jit_extremes(high, low, window, t):
+        """Highest high and lowest low of the window ending at ``t`` (NaN if any is missing)."""
+        highest = -np.inf
+        lowest = np.inf
+        for i in range(t - window + 1, t + 1):
+            if np.isnan(high[i]) or np.isnan(low[i]):
+                return np.nan, np.nan
+            highest = max(highest, high[i])
+            lowest = min(lowest, low[i])
+        return highest, lowest
+
+    @_jit
+    def _jit_stochastic(high, low, close, k_period, d_period):
+        bars, symbols = close.shape
+        k = np.full((symbols, bars), np.nan).T
+        d = np.full((symbols, bars), np.nan).T
+        for j in range(symbols):
+            for t in range(k_period - 1, bars):
+                highest, lowest = _jit_extremes(high[:, j], low[:, j], k_period, t)
+                k[t, j] = 100 * (close[t, j] - lowest) / (highest - lowest)
+            _jit_window_mean(k[:, j], d_period, d[:, j])
+        return k, d
+
+    @_jit
+    def _jit_williams_r(high, low, close, period):
+        bars, symbols = close.shape
+        out = np.full((symbols, bars), np.nan).T
+        for j in range(symbols):
+            for t in range(period - 1, bars):
+                highest, lowest = _jit_extremes(high[:, j], low[:, j], period, t)
+                out[t, j] = -100 * (highest - close[t, j]) / (highest - lowest)
+        return out
+
+    @_jit
+    def _jit_adx(high, low, close, period):
+        bars, symbols = close.shape
+        true_range = np.full(bars, np.nan)
+        plus = np.full(bars, np.nan)
+        minus = np.full(bars, np.nan)
+        average_range = np.empty(bars)
+        dx = np.empty(bars)
+        di_plus = np.full((symbols, bars), np.nan).T
+        di_minus = np.full((symbols, bars), np.nan).T
+        adx = np.full((symbols, bars), np.nan).T
+        for j in range(symbols):
+            start = _first_bar(high[:, j])
+            true_range[:] = np.nan
+            plus[:] = np.nan
+            minus[:] = np.nan
+            for t in range(start, bars):
+                if t == start:
+                    plus[t] = 0.0
+                    minus[t] = 0.0
+                    continue
+                # NaN in any operand propagates, as with np.maximum
+                true_range[t] = max(high[t, j] - low[t, j],
+                                    abs(high[t, j] - close[t - 1, j]),
+                                    abs(low[t, j] - close[t - 1, j]))
+                for value in (high[t, j], low[t, j], close[t - 1, j]):
+                    if np.isnan(value):
+                        true_range[t] = np.nan
+                up = high[t, j] - high[t - 1, j]
+                down = low[t - 1, j] - low[t, j]
+                plus[t] = max(up, 0.0) if up > down else 0.0
+                minus[t] = max(down, 0.0) if down > up else 0.0
+            _jit_window_mean(true_range, period, average_range)
+            _jit_window_mean(plus, period, di_plus[:, j])
+            _jit_window_mean(minus, period, di_minus[:, j])
+            for t in range(bars):
+                di_plus[t, j] = 100 * di_plus[t, j] / average_range[t]
+                di_minus[t, j] = 100 * di_minus[t, j] / average_range[t]
+                dx[t] = 100 * abs(di_plus[t, j] - di_minus[t, j]) / (di_plus[t, j] + di_minus[t, j])
+            _jit_window_mean(dx, period, adx[:, j])
+        return di_plus, di_minus, adx
+
+    @_jit
+    def _jit_obv_vpt(close, volume):
+        bars, symbols = close.shape
+        obv = np.full((symbols, bars), np.nan).T
+        vpt = np.full((symbols, bars), np.nan).T
+        for j in range(symbols):
+            start = _first_bar(close[:, j])
+            obv_total = 0.0
+            vpt_total = 0.0
+            for t in range(start, bars):
+                if t > start:
+                    step = np.sign(close[t, j] - close[t - 1, j]) * volume[t, j]
+                    if np.isfinite(step):
+                        obv_total += step
+                    step = volume[t, j] * (close[t, j] / close[t - 1, j] - 1)
+                    if np.isfinite(step):
+                        vpt_total += step
+                obv[t, j] = obv_total
+                vpt[t, j] = vpt_total
+        return obv, vpt
+
+    @_jit
+    def _jit_candle_patterns(open_, high, low, close):
+        bars, symbols = close.shape
+        gap_up = np.full((symbols, bars), np.nan).T
+        gap_down = np.full((symbols, bars), np.nan).T
+        doji = np.full((symbols, bars), np.nan).T
+        hammer = np.full((symbols, bars), np.nan).T
+        for j in range(symbols):
+            for t in range(_first_bar(close[:, j]), bars):
+                o, h, l, c = open_[t, j], high[t, j], low[t, j], close[t, j]
+                body = abs(c - o)
+                lower_shadow = min(o, c) - l
+                upper_shadow = h - max(o, c)
+                gap_up[t, j] = 1.0 if t > 0 and o > high[t - 1, j] else 0.0
+                gap_down[t, j] = 1.0 if t > 0 and o < low[t - 1, j] else 0.0
+                doji[t, j] = 1.0 if body < (h - l) * 0.1 else 0.0
+                hammer[t, j] = 1.0 if lower_shadow > 2 * body and upper_shadow < body else 0.0
+        return gap_up, gap_down, doji, hammer
+
+
+def _columns(arrays: Tuple[np.ndarray, ...], column_major: bool) -> Tuple[bool, Tuple[np.ndarray, ...]]:
+    """
+    Float64 2-D versions of the inputs, and whether they were 1-D. The JIT
+    loops run down one symbol at a time, so they get each symbol's bars
+    contiguous (column-major); the NumPy kernels work row-wise.
+    """
+    one_d = np.ndim(arrays[0]) == 1
+    layout = np.asfortranarray if column_major else np.ascontiguousarray
+    return one_d, tuple(layout(np.asarray(a, dtype=np.float64).reshape(len(a), -1)) for a in arrays)
+
+
+def _dispatch(name: str, arrays: Tuple[np.ndarray, ...], *params, jit=None):
+    """Run the JIT kernel when enabled (unless ``jit`` says otherwise), else the NumPy one."""
+    use_jit = JIT_ENABLED if jit is None else (jit and JIT_ENABLED)
+    one_d, columns = _columns(arrays, column_major=use_jit)
+    kernel = globals()[f"_jit_{name}" if use_jit else f"_np_{name}"]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = kernel(*columns, *params)
+    if isinstance(result, tuple):
+        return tuple(r[:, 0] if one_d else r for r in result)
+    return result[:, 0] if one_d else result
+
+
+def stochastic(high, low, close, k_period: int = 14, d_period: int = 3, jit=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stochastic oscillator.
+
+    Args:
+        high, low, close: Bars (1-D) or bars x symbols (2-D)
+        k_period (int): %K lookback
+        d_period (int): %D smoothing window
+        jit (bool): Prefer (True) or skip (False) the JIT kernel; None uses it when available
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: %K and %D, shaped like the inputs
+    """
+    return _dispatch('stochastic', (high, low, close), k_period, d_period, jit=jit)
+
+
+def williams_r(high, low, close, period: int = 14, jit=None) -> np.ndarray:
+    """Williams %R, shaped like the inputs."""
+    return _dispatch('williams_r', (high, low, close), period, jit=jit)
+
+
+def adx(high, low, close, period: int = 14, jit=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """+DI, -DI and ADX, each shaped like the inputs."""
+    return _dispatch('adx', (high, low, close), period, jit=jit)
+
+
+def obv_vpt(close, volume, jit=None) -> Tuple[np.ndarray, np.ndarray]:
+    """On-balance volume and volume-price trend, accumulated from each symbol's first bar."""
+    return _dispatch('obv_vpt', (close, volume), jit=jit)
+
+
+def candle_patterns(open_, high, low, close, jit=None) -> Tuple[np.ndarray, ...]:
+    """Gap up, gap down, doji and hammer flags (1.0 / 0.0), each shaped like the inputs."""
+    return _dispatch('candle_patterns', (open_, high, low, close), jit=jit)
+
+
+def warm_up():
+    """Compile (or load from the on-disk cache) every JIT kernel ahead of the first request."""
+    if not JIT_ENABLED:
+        return
+    bars = np.linspace(10.0, 11.0, 40)
+    stochastic(bars + 1, bars - 1, bars)
+    williams_r(bars + 1, bars - 1, bars)
+    adx(bars + 1, bars - 1, bars)
+    obv_vpt(bars, bars)
+    candle_patterns(bars, bars + 1, bars - 1, bars)
+    logger.info("Compiled JIT indicator kernels")
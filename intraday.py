@@ -0,0 +1,221 @@
+"""
+Bounded in-memory storage of intraday bars.
+
+Intraday history (``1m``, ``5m``, ``15m``, ``1h``) is kept per (symbol,
+interval) in a ``BarRingBuffer``: a timestamp array and a ``capacity x 5``
+OHLCV array allocated once, written round-robin. Once full, each new bar
+overwrites the oldest one, so a buffer never grows past
+``INTRADAY_BUFFER_BARS`` however long the server runs. At most
+``INTRADAY_MAX_BUFFERS`` buffers are kept, least recently used first out, so
+the whole store is bounded by ``max_buffers x capacity x 48`` bytes (about
+120 MB at the defaults).
+
+``IntradayProvider`` fronts the configured provider:
+
+- The first request for a (symbol, interval) backfills the longest period the
+  upstream serves for that interval.
+- Later requests are served from the buffer. Once the last sync is older
+  than ``INTRADAY_REFRESH`` seconds (or one bar, if shorter), only the
+  sessions since the last bar are fetched. They replace the buffer's bars
+  from their first timestamp on, which also updates the still-forming bar.
+- If the upstream is unavailable, the buffered bars are served and flagged
+  stale.
+
+Daily requests pass straight through to the wrapped provider (and its bar
+store).
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_provider import (INTRADAY_INTERVALS, INTRADAY_PERIODS, OHLCV_COLUMNS, DataProvider, is_intraday,
+                           period_days, slice_period, validate_interval)
+from metrics import record_cache, record_stale, set_intraday_bars
+from swr_cache import mark_stale
+
+logger = logging.getLogger(__name__)
+
+INTRADAY_BUFFER_BARS = int(os.getenv("INTRADAY_BUFFER_BARS", "5000"))
+INTRADAY_MAX_BUFFERS = int(os.getenv("INTRADAY_MAX_BUFFERS", "512"))
+INTRADAY_REFRESH = float(os.getenv("INTRADAY_REFRESH", "60"))
+
+
+class BarRingBuffer:
+    """
+    Fixed-capacity, time-ordered OHLCV bars; the oldest bars are evicted first.
+    """
+
+    def __init__(self, capacity: int = INTRADAY_BUFFER_BARS):
+        self.capacity = capacity
+        self.times = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty((capacity, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self.start = 0
+        self.size = 0
+        self.tz: Optional[str] = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _positions(self, first: int, count: int) -> np.ndarray:
+        """Slots of the ``count`` bars starting at logical position ``first``."""
+        return (self.start + first + np.arange(count)) % self.capacity
+
+    @property
+    def last_time(self) -> Optional[pd.Timestamp]:
+        if not self.size:
+            return None
+        return pd.Timestamp(int(self.times[(self.start + self.size - 1) % self.capacity]), tz='UTC').tz_convert(self.tz)
+
+    def merge(self, bars: pd.DataFrame) -> int:
+        """
+        Write ``bars`` (sorted, tz-aware) over the buffer from their first
+        timestamp on, evicting the oldest bars past capacity.
+
+        Returns:
+            int: Bars written
+        """
+        if bars.index.tz is None and len(bars):
+            raise ValueError("Intraday bars need a time zone")
+        values = np.column_stack([bars[field].to_numpy(dtype=np.float64) for field in OHLCV_COLUMNS])
+        valid = ~np.isnan(values[:, OHLCV_COLUMNS.index('Close')])
+        if not valid.any():
+            return 0
+        self.tz = str(bars.index.tz)
+        times = bars.index.as_unit('ns').asi8[valid]
+        values = values[valid]
+
+        if len(times) >= self.capacity:
+            times, values = times[-self.capacity:], values[-self.capacity:]
+            self.start, self.size = 0, 0
+        else:
+            # Keep the buffered bars before the first incoming one
+            buffered = self.times[self._positions(0, self.size)]
+            self.size = int(np.searchsorted(buffered, times[0]))
+
+        slots = self._positions(self.size, len(times))
+        self.times[slots] = times
+        self.values[slots] = values
+        self.size += len(times)
+        if self.size > self.capacity:
+            self.start = (self.start + self.size - self.capacity) % self.capacity
+            self.size = self.capacity
+        return len(times)
+
+    def frame(self) -> pd.DataFrame:
+        """A copy of the buffered bars, oldest first, indexed by exchange-local time."""
+        slots = self._positions(0, self.size)
+        index = pd.DatetimeIndex(self.times[slots].astype('datetime64[ns]'), name="Date")
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame(self.values[slots], index=index, columns=OHLCV_COLUMNS)
+
+
+class _Entry:
+    __slots__ = ('buffer', 'synced_at', 'lock')
+
+    def __init__(self, capacity: int):
+        self.buffer = BarRingBuffer(capacity)
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+
+class IntradayProvider(DataProvider):
+    """
+    Serves intraday history from per-symbol ring buffers, filled from ``inner``.
+    """
+
+    def __init__(self, inner: DataProvider, capacity: int = INTRADAY_BUFFER_BARS,
+                 max_buffers: int = INTRADAY_MAX_BUFFERS, refresh_seconds: float = INTRADAY_REFRESH):
+        self.inner = inner
+        self.name = inner.name
+        self.remote = inner.remote
+        self.capacity = capacity
+        self.max_buffers = max_buffers
+        self.refresh_seconds = refresh_seconds
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, symbol: str, interval: str) -> _Entry:
+        key = (symbol, interval)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            entry = self._entries[key] = _Entry(self.capacity)
+            while len(self._entries) > self.max_buffers:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _fetch(self, symbol: str, interval: str, buffer: BarRingBuffer) -> pd.DataFrame:
+        """Backfill the longest period the upstream keeps, or just the sessions since the last bar."""
+        periods = INTRADAY_PERIODS[interval]
+        last = buffer.last_time
+        if last is not None:
+            gap_days = (pd.Timestamp.now(tz=last.tz) - last).days + 1
+            covering = [p for p in periods if period_days(p) >= gap_days]
+            if covering:
+                return self.inner.history(symbol, period=covering[0], interval=interval)
+        return self.inner.history(symbol, period=periods[-1], interval=interval)
+
+    def _sync(self, symbol: str, interval: str, entry: _Entry) -> bool:
+        """
+        Refresh the buffer if its newest bar is due an update (caller holds the entry lock).
+
+        Returns:
+            bool: False if there are no bars for the symbol
+        """
+        buffer = entry.buffer
+        max_age = min(self.refresh_seconds, INTRADAY_INTERVALS[interval].total_seconds())
+        fresh = len(buffer) and time.time() - entry.synced_at < max_age
+        record_cache('intraday', bool(fresh))
+        if fresh:
+            return True
+        try:
+            bars = self._fetch(symbol, interval, buffer)
+        except OSError as e:
+            if not len(buffer):
+                raise
+            logger.warning("Serving stale %s bars for %s: %s", interval, symbol, e)
+            record_stale('intraday')
+            mark_stale('intraday')
+            return True
+
+        before = len(buffer)
+        buffer.merge(bars)
+        entry.synced_at = time.time()
+        if len(buffer) != before:
+            set_intraday_bars(interval, self.buffered_bars(interval))
+        return len(buffer) > 0
+
+    def buffered_bars(self, interval: str) -> int:
+        """Bars currently held across all buffers of ``interval``."""
+        with self._lock:
+            entries = [e for (_, i), e in self._entries.items() if i == interval]
+        return sum(len(e.buffer) for e in entries)
+
+    def history(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        if not is_intraday(interval):
+            return self.inner.history(symbol, period=period, interval=interval)
+
+        validate_interval(interval, period)
+        symbol = symbol.upper()
+        entry = self._entry(symbol, interval)
+        with entry.lock:
+            if not self._sync(symbol, interval, entry):
+                return pd.DataFrame(columns=OHLCV_COLUMNS)
+            bars = entry.buffer.frame()
+        return slice_period(bars, period, interval)
+
+    def quote(self, symbol: str) -> Optional[Dict[str, float]]:
+        return self.inner.quote(symbol)
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        return self.inner.fundamentals(symbol)
@@ -0,0 +1,241 @@
+"""
+Prometheus metrics for the Stock Advisor API.
+
+Stage timings are labelled with the endpoint that triggered them. The label is
+carried in a context variable set by the request middleware, so code deep in
+the predictors can record a stage without knowing which endpoint called it.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Endpoint route template ("/stock/predict/{symbol}") of the current request
+current_endpoint: ContextVar[str] = ContextVar('current_endpoint', default='offline')
+
+# Per-request stage totals in seconds, reported in the Server-Timing header
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_timings', default=None)
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    'stoky_stage_duration_seconds',
+    'Time spent in each request stage (queue, fetch, throttle, features, training, inference, serialization)',
+    ['stage', 'endpoint'],
+    buckets=STAGE_BUCKETS,
+)
+MODEL_TRAINING_SECONDS = Histogram(
+    'stoky_model_training_duration_seconds',
+    'Training time per model (ensemble member)',
+    ['model', 'endpoint'],
+    buckets=STAGE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    'stoky_request_duration_seconds',
+    'End-to-end request latency',
+    ['endpoint', 'method', 'status'],
+    buckets=STAGE_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'stoky_cache_requests_total',
+    'Cache lookups by cache name and result (hit/miss)',
+    ['cache', 'result'],
+)
+UPSTREAM_ERRORS = Counter(
+    'stoky_upstream_errors_total',
+    'Failed calls to the market-data upstream',
+    ['provider', 'operation'],
+)
+UPSTREAM_THROTTLED = Counter(
+    'stoky_upstream_throttled_total',
+    'Upstream calls delayed by the local rate budget or throttled (429) by the upstream',
+    ['provider', 'source'],
+)
+UPSTREAM_RETRIES = Counter(
+    'stoky_upstream_retries_total',
+    'Upstream calls retried after a transient failure',
+    ['provider', 'operation', 'reason'],
+)
+UPSTREAM_REJECTED = Counter(
+    'stoky_upstream_rejected_total',
+    'Upstream calls refused without trying because the circuit breaker is open',
+    ['provider'],
+)
+UPSTREAM_CIRCUIT_OPEN = Gauge(
+    'stoky_upstream_circuit_open',
+    'Whether the upstream circuit breaker is open (1) or closed (0)',
+    ['provider'],
+)
+STALE_SERVED = Counter(
+    'stoky_stale_served_total',
+    'Cached values served past their hard TTL because the upstream was unavailable',
+    ['cache'],
+)
+CACHE_REFRESHES = Counter(
+    'stoky_cache_refreshes_total',
+    'Background refreshes of stale-while-revalidate caches by result (ok/error)',
+    ['cache', 'result'],
+)
+TRAINING_RUNS = Counter(
+    'stoky_training_runs_total',
+    'Model training runs',
+    ['model', 'endpoint'],
+)
+IN_FLIGHT = Gauge(
+    'stoky_requests_in_flight',
+    'Requests currently being handled',
+    ['endpoint'],
+)
+INTRADAY_BARS = Gauge(
+    'stoky_intraday_buffered_bars',
+    'Intraday bars held in the ring buffers',
+    ['interval'],
+)
+CLUSTER_REQUESTS = Counter(
+    'stoky_cluster_requests_total',
+    'Symbol requests by cluster routing decision (local/forwarded/redirected/fallback, or received from a peer)',
+    ['decision'],
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    'stoky_admission_queue_seconds',
+    'Time requests waited for an admission slot, by cost class',
+    ['cost_class'],
+    buckets=STAGE_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    'stoky_admission_rejected_total',
+    'Requests refused by admission control by cost class and reason (queue_full/deadline/disconnected)',
+    ['cost_class', 'reason'],
+)
+ADMISSION_ACTIVE = Gauge(
+    'stoky_admission_active',
+    'Requests holding an admission slot, by cost class',
+    ['cost_class'],
+)
+ADMISSION_WAITING = Gauge(
+    'stoky_admission_waiting',
+    'Requests queued for an admission slot, by cost class',
+    ['cost_class'],
+)
+POOL_QUEUE_DEPTH = Gauge(
+    'stoky_compute_pool_queue_depth',
+    'Tasks waiting for a compute pool thread',
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record ``seconds`` spent in ``stage`` for the current endpoint."""
+    STAGE_SECONDS.labels(stage, current_endpoint.get()).observe(seconds)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Record the duration of the enclosed block as ``stage`` of the current endpoint."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def timed_stage(stage: str) -> Callable:
+    """Decorator form of ``stage_timer``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_model_training(model: str, seconds: float):
+    """Record one training run of ``model`` and how long it took."""
+    endpoint = current_endpoint.get()
+    MODEL_TRAINING_SECONDS.labels(model, endpoint).observe(seconds)
+    TRAINING_RUNS.labels(model, endpoint).inc()
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a lookup in the named cache."""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_upstream_error(provider: str, operation: str):
+    """Count a failed upstream call."""
+    UPSTREAM_ERRORS.labels(provider, operation).inc()
+
+
+def record_upstream_throttled(provider: str, source: str):
+    """Count a call held back by the local budget ('budget') or a 429 ('upstream')."""
+    UPSTREAM_THROTTLED.labels(provider, source).inc()
+
+
+def record_upstream_retry(provider: str, operation: str, reason: str):
+    """Count a retried upstream call."""
+    UPSTREAM_RETRIES.labels(provider, operation, reason).inc()
+
+
+def record_upstream_rejected(provider: str):
+    """Count a call refused by an open circuit breaker."""
+    UPSTREAM_REJECTED.labels(provider).inc()
+
+
+def set_circuit_open(provider: str, is_open: bool):
+    """Publish the circuit breaker state of ``provider``."""
+    UPSTREAM_CIRCUIT_OPEN.labels(provider).set(1 if is_open else 0)
+
+
+def set_intraday_bars(interval: str, bars: int):
+    """Publish how many ``interval`` bars the ring buffers hold."""
+    INTRADAY_BARS.labels(interval).set(bars)
+
+
+def record_cluster_request(decision: str):
+    """Count a symbol request routed by the cluster middleware."""
+    CLUSTER_REQUESTS.labels(decision).inc()
+
+
+def record_admission_queue(cost_class: str, seconds: float):
+    """Record how long a request waited for a ``cost_class`` admission slot."""
+    ADMISSION_QUEUE_SECONDS.labels(cost_class).observe(seconds)
+
+
+def record_admission_rejected(cost_class: str, reason: str):
+    """Count a request refused by admission control."""
+    ADMISSION_REJECTED.labels(cost_class, reason).inc()
+
+
+def set_admission_load(cost_class: str, active: int, waiting: int):
+    """Publish the slots in use and the queue length of ``cost_class``."""
+    ADMISSION_ACTIVE.labels(cost_class).set(active)
+    ADMISSION_WAITING.labels(cost_class).set(waiting)
+
+
+def record_stale(cache: str):
+    """Count a stale value served from the named cache."""
+    STALE_SERVED.labels(cache).inc()
+
+
+def record_refresh(cache: str, ok: bool):
+    """Count a background refresh of the named cache."""
+    CACHE_REFRESHES.labels(cache, 'ok' if ok else 'error').inc()
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    """Format stage totals as a ``Server-Timing`` header value (milliseconds)."""
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Return the Prometheus text exposition and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
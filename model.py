@@ -2,12 +2,17 @@ import pandas as pd
 import numpy as np
 from typing import Optional, List, Dict, Any
 import logging
+import time
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-import yfinance as yf
 from datetime import datetime, timedelta
 
+from data_provider import INTRADAY_INTERVALS, INTRADAY_PERIODS, DataProvider, get_data_provider, is_intraday
+from metrics import observe_model_training, stage_timer, timed_stage
+from model_store import FlatTreeEnsemble, ModelStore, get_model_store
+from model_tuning import model_params
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,37 +25,55 @@ class StockPredictor:
     trains a Random Forest model, and makes price predictions.
     """
     
-    def __init__(self, symbol: str):
+    # Raw and target columns that are never used as model inputs
+    NON_FEATURE_COLUMNS = ['Target', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+    
+    # Estimator settings, used where ``model_tuning`` has saved no tuned config for the symbol
+    ESTIMATORS = {'random_forest': RandomForestRegressor}
+    DEFAULT_PARAMS = {
+        'random_forest': {'n_estimators': 100, 'random_state': 42, 'max_depth': 10, 'min_samples_split': 5},
+    }
+    
+    def __init__(self, symbol: str, provider: Optional[DataProvider] = None, interval: str = "1d"):
         """
         Initialize the StockPredictor with a stock symbol.
         
         Args:
             symbol (str): Stock symbol (e.g., 'AAPL', 'GOOGL')
+            provider (DataProvider, optional): Market-data source, defaults to
+                the configured provider
+            interval (str): Bar interval to train on and predict ('1d', or
+                intraday '1m', '5m', '15m', '1h'); ``Target`` is the next bar's close
         """
         self.symbol = symbol.upper()
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            random_state=42,
-            max_depth=10,
-            min_samples_split=5
-        )
+        self.provider = provider or get_data_provider()
+        self.interval = interval
+        self.model = self._new_model()
         self.is_trained = False
         self.feature_columns = []
         
+    def _new_model(self) -> RandomForestRegressor:
+        params = model_params(self.symbol, 'basic', self.interval, self.DEFAULT_PARAMS)
+        return RandomForestRegressor(**params['random_forest'])
+    
     def fetch_stock_data(self, period: str = "2y") -> Optional[pd.DataFrame]:
         """
-        Fetch historical stock data using yfinance.
+        Fetch historical stock data from the market-data provider.
         
         Args:
             period (str): Time period for data ('1y', '2y', '5y', etc.)
             
         Returns:
             pd.DataFrame: Historical stock data or None if error
+            
+        Raises:
+            OSError: If the upstream is unavailable (``UpstreamUnavailable``,
+                connection errors, timeouts), so callers can answer 503 or
+                serve a cached result stale
         """
         try:
             logger.info(f"Fetching data for {self.symbol} with period {period}")
-            ticker = yf.Ticker(self.symbol)
-            data = ticker.history(period=period)
+            data = self.provider.history(self.symbol, period=period, interval=self.interval)
             
             if data.empty:
                 logger.error(f"No data found for symbol {self.symbol}")
@@ -59,6 +82,8 @@ class StockPredictor:
             logger.info(f"Successfully fetched {len(data)} records for {self.symbol}")
             return data
             
+        except OSError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching data for {self.symbol}: {str(e)}")
             return None
@@ -113,12 +138,15 @@ class StockPredictor:
             'histogram': histogram
         }
     
-    def create_features(self, data: pd.DataFrame) -> pd.DataFrame:
+    @timed_stage('features')
+    def create_features(self, data: pd.DataFrame, include_target: bool = True) -> pd.DataFrame:
         """
         Create technical indicator features for machine learning.
         
         Args:
             data (pd.DataFrame): Raw stock data
+            include_target (bool): Add the next-day ``Target`` column. Disable it
+                to keep the most recent bar, which has no target yet.
             
         Returns:
             pd.DataFrame: Data with technical indicator features
@@ -163,8 +191,9 @@ class StockPredictor:
             # Volatility
             df['Volatility'] = df['Close'].rolling(window=20).std()
             
-            # Target variable (next day's closing price)
-            df['Target'] = df['Close'].shift(-1)
+            # Target variable (next bar's closing price)
+            if include_target:
+                df['Target'] = df['Close'].shift(-1)
             
             # Remove rows with NaN values
             df_clean = df.dropna()
@@ -180,12 +209,15 @@ class StockPredictor:
             logger.error(f"Error creating features: {str(e)}")
             return None
     
-    def train_model(self, data: pd.DataFrame) -> bool:
+    @timed_stage('training')
+    def train_model(self, data: pd.DataFrame, holdout: float = 0.2) -> bool:
         """
         Train the Random Forest model with the provided data.
         
         Args:
             data (pd.DataFrame): Data with features and target
+            holdout (float): Fraction of the most recent rows kept out of
+                training for evaluation. 0 fits on every row.
             
         Returns:
             bool: True if training successful, False otherwise
@@ -193,21 +225,33 @@ class StockPredictor:
         try:
             logger.info(f"Training model for {self.symbol}")
             
+            # Published (memory-mapped) models are read-only; start from a fresh estimator
+            if isinstance(self.model, FlatTreeEnsemble):
+                self.model = self._new_model()
+            
             # Define feature columns (exclude target and non-feature columns)
-            exclude_columns = ['Target', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
-            self.feature_columns = [col for col in data.columns if col not in exclude_columns]
+            self.feature_columns = [col for col in data.columns if col not in self.NON_FEATURE_COLUMNS]
             
             # Prepare features and target
             X = data[self.feature_columns]
             y = data['Target']
             
+            if not holdout:
+                start = time.perf_counter()
+                self.model.fit(X, y)
+                observe_model_training('random_forest', time.perf_counter() - start)
+                self.is_trained = True
+                return True
+            
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, shuffle=False
+                X, y, test_size=holdout, random_state=42, shuffle=False
             )
             
             # Train model
+            start = time.perf_counter()
             self.model.fit(X_train, y_train)
+            observe_model_training('random_forest', time.perf_counter() - start)
             
             # Evaluate model
             y_pred = self.model.predict(X_test)
@@ -224,12 +268,31 @@ class StockPredictor:
             logger.error(f"Error training model: {str(e)}")
             return False
     
-    def predict_price(self, days_ahead: int = 1) -> Optional[Dict[str, Any]]:
+    def predict_batch(self, features: pd.DataFrame) -> np.ndarray:
+        """
+        Predict the next-day close for every row of a feature frame in one
+        ``predict`` call.
+        
+        Args:
+            features (pd.DataFrame): Output of ``create_features``
+            
+        Returns:
+            np.ndarray: Predicted next-day closes, one per row
+        """
+        if not self.is_trained:
+            raise ValueError("Model not trained. Call train_model() first.")
+        
+        with stage_timer('inference'):
+            return self.model.predict(features[self.feature_columns].fillna(0))
+    
+    def predict_price(self, days_ahead: int = 1, data: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
         """
         Predict future stock prices.
         
         Args:
-            days_ahead (int): Number of days to predict ahead
+            days_ahead (int): Number of days (bars, for intraday intervals) to predict ahead
+            data (pd.DataFrame): Recent history to predict from, e.g. the frame
+                the model was just trained on. Fetched when not given.
             
         Returns:
             Dict[str, Any]: Prediction results or None if error
@@ -239,8 +302,9 @@ class StockPredictor:
                 logger.error("Model not trained. Call train_model() first.")
                 return None
             
-            # Fetch latest data
-            latest_data = self.fetch_stock_data(period="6mo")
+            # Fetch latest data unless the caller already has it
+            latest_data = data if data is not None else self.fetch_stock_data(
+                period=INTRADAY_PERIODS[self.interval][-1] if is_intraday(self.interval) else "6mo")
             if latest_data is None:
                 return None
             
@@ -253,7 +317,8 @@ class StockPredictor:
             latest_features = featured_data[self.feature_columns].iloc[-1:].fillna(0)
             
             # Make prediction
-            predicted_price = self.model.predict(latest_features)[0]
+            with stage_timer('inference'):
+                predicted_price = self.model.predict(latest_features)[0]
             current_price = latest_data['Close'].iloc[-1]
             
             # Calculate prediction confidence (simplified)
@@ -264,17 +329,77 @@ class StockPredictor:
                 'current_price': float(current_price),
                 'predicted_price': float(predicted_price),
                 'price_change_pct': float(price_change_pct),
-                'prediction_date': (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d'),
-                'model_confidence': 'medium'  # This could be enhanced with proper confidence intervals
+                'prediction_date': self._prediction_date(days_ahead),
+                'model_confidence': 'medium',  # This could be enhanced with proper confidence intervals
+                'interval': self.interval
             }
             
             logger.info(f"Prediction for {self.symbol}: ${predicted_price:.2f} ({price_change_pct:+.2f}%)")
             return prediction_result
             
+        except OSError:
+            raise
         except Exception as e:
             logger.error(f"Error making prediction: {str(e)}")
             return None
     
+    def _prediction_date(self, bars_ahead: int) -> str:
+        if is_intraday(self.interval):
+            return (datetime.now() + INTRADAY_INTERVALS[self.interval] * bars_ahead).strftime('%Y-%m-%d %H:%M')
+        return (datetime.now() + timedelta(days=bars_ahead)).strftime('%Y-%m-%d')
+    
+    def _store_key(self, period: str) -> str:
+        suffix = f"-{self.interval}" if self.interval != "1d" else ""
+        return f"basic-{self.symbol}-{period}{suffix}"
+    
+    def publish(self, data_end: str, period: str, store: Optional[ModelStore] = None) -> bool:
+        """
+        Publish the fitted model to the shared model store and switch to the
+        memory-mapped copy, so other workers can serve it without retraining.
+        
+        Args:
+            data_end (str): Timestamp of the last bar the model was trained on
+            period (str): Training data period
+            store (ModelStore, optional): Defaults to the process-wide store
+            
+        Returns:
+            bool: True if the model was published
+        """
+        store = store or get_model_store()
+        if store is None or not self.is_trained:
+            return False
+        
+        try:
+            store.publish(self._store_key(period), {'random_forest': self.model},
+                          meta={'data_end': data_end, 'feature_columns': self.feature_columns})
+            return self.load_published(data_end, period, store)
+        except OSError as e:
+            logger.warning(f"Could not publish model for {self.symbol}: {str(e)}")
+            return False
+    
+    def load_published(self, data_end: str, period: str, store: Optional[ModelStore] = None) -> bool:
+        """
+        Use a model another worker published for the same data, if any.
+        
+        Args:
+            data_end (str): Timestamp of the latest bar; older models are ignored
+            period (str): Training data period
+            store (ModelStore, optional): Defaults to the process-wide store
+            
+        Returns:
+            bool: True if a published model was loaded
+        """
+        store = store or get_model_store()
+        stored = store.load(self._store_key(period)) if store is not None else None
+        if stored is None or stored.meta.get('data_end') != data_end:
+            return False
+        
+        self.model = stored.models['random_forest']
+        self.feature_columns = stored.meta['feature_columns']
+        self.is_trained = True
+        logger.info(f"Using published model for {self.symbol} ({stored.version})")
+        return True
+    
     def get_model_info(self) -> Dict[str, Any]:
         """
         Get information about the trained model.
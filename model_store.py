@@ -0,0 +1,297 @@
+"""
+Memory-mapped model store shared by every worker on a machine.
+
+Fitted tree ensembles (random forest, extra trees, gradient boosting) are
+flattened into a handful of numpy arrays - child indices, split features,
+thresholds and leaf values for all trees back to back - and written once as
+``.npy`` files. Workers map them read-only with ``np.load(mmap_mode='r')``, so
+every process on the box shares the same page-cache copy instead of holding
+its own unpickled estimators, and predict with a vectorised tree walk.
+
+Layout under ``MODEL_STORE_DIR``::
+
+    <key>/CURRENT                      {"version": "..."} of the live version
+    <key>/<version>/meta.json          member settings and caller metadata
+    <key>/<version>/<member>.<array>.npy
+    <key>/<version>/extras.joblib      small objects such as fitted scalers
+
+A version directory is complete before ``CURRENT`` is atomically replaced to
+point at it, so readers never see a half-written model. Put the store on
+``/dev/shm`` to keep it in RAM.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+import joblib
+import numpy as np
+
+from metrics import record_cache
+from utils import MappedLRU
+
+logger = logging.getLogger(__name__)
+
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", os.path.join(os.getenv("MODEL_CACHE_DIR", "./models"), "store"))
+MODEL_STORE_ENABLED = os.getenv("MODEL_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Model arrays kept mapped (6 per ensemble member); each holds a file descriptor
+MODEL_STORE_MAX_MAPPED_FILES = int(os.getenv("MODEL_STORE_MAX_MAPPED_FILES", "384"))
+
+_KEY_PATTERN = re.compile(r'[^\w.-]+')
+
+
+class FlatTreeEnsemble:
+    """
+    A fitted tree ensemble as flat arrays, with a numpy ``predict``.
+
+    Exposes ``n_estimators`` and ``feature_importances_`` so it can stand in
+    for the sklearn estimator it was built from at prediction time.
+    """
+
+    ARRAYS = ('roots', 'left', 'right', 'feature', 'threshold', 'value')
+
+    def __init__(self, arrays: Dict[str, np.ndarray], aggregate: str, bias: float, scale: float,
+                 max_depth: int, feature_importances: np.ndarray):
+        self.roots = arrays['roots']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.aggregate = aggregate
+        self.bias = bias
+        self.scale = scale
+        self.max_depth = max_depth
+        self.feature_importances_ = feature_importances
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def supports(cls, estimator) -> bool:
+        """True for the regressors this class can flatten."""
+        return type(estimator).__name__ in ('RandomForestRegressor', 'ExtraTreesRegressor',
+                                            'GradientBoostingRegressor')
+
+    @classmethod
+    def from_estimator(cls, estimator) -> "FlatTreeEnsemble":
+        """
+        Flatten a fitted ``RandomForestRegressor``, ``ExtraTreesRegressor`` or
+        ``GradientBoostingRegressor``.
+
+        Raises:
+            ValueError: For other estimators or unsupported settings
+        """
+        if not cls.supports(estimator):
+            raise ValueError(f"Cannot flatten {type(estimator).__name__}")
+
+        if type(estimator).__name__ == 'GradientBoostingRegressor':
+            init = estimator.init_
+            if not hasattr(init, 'constant_'):
+                raise ValueError("Only the default (mean) init estimator is supported")
+            trees = [stage[0] for stage in estimator.estimators_]
+            aggregate, bias, scale = 'sum', float(np.ravel(init.constant_)[0]), float(estimator.learning_rate)
+        else:
+            trees = list(estimator.estimators_)
+            aggregate, bias, scale = 'mean', 0.0, 1.0
+
+        roots, lefts, rights, features, thresholds, values = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            t = tree.tree_
+            roots.append(offset)
+            lefts.append(np.where(t.children_left >= 0, t.children_left + offset, -1))
+            rights.append(np.where(t.children_right >= 0, t.children_right + offset, -1))
+            features.append(t.feature)
+            thresholds.append(t.threshold)
+            values.append(t.value.reshape(t.node_count, -1)[:, 0])
+            offset += t.node_count
+
+        arrays = {
+            'roots': np.asarray(roots, dtype=np.int32),
+            'left': np.concatenate(lefts).astype(np.int32),
+            'right': np.concatenate(rights).astype(np.int32),
+            'feature': np.concatenate(features).astype(np.int32),
+            'threshold': np.concatenate(thresholds).astype(np.float64),
+            'value': np.concatenate(values).astype(np.float64),
+        }
+        max_depth = max(tree.tree_.max_depth for tree in trees)
+        return cls(arrays, aggregate, bias, scale, max_depth,
+                   np.asarray(estimator.feature_importances_, dtype=np.float64))
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict like the source estimator: walk every tree for every row at
+        once, one level per step.
+        """
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            is_leaf = left < 0
+            if is_leaf.all():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(is_leaf, node, np.where(go_left, left, self.right[node]))
+
+        leaf_values = self.value[node]
+        if self.aggregate == 'sum':
+            return self.bias + self.scale * leaf_values.sum(axis=1)
+        return leaf_values.mean(axis=1)
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            'aggregate': self.aggregate,
+            'bias': self.bias,
+            'scale': self.scale,
+            'max_depth': self.max_depth,
+            'feature_importances': self.feature_importances_.tolist(),
+        }
+
+
+class StoredModel(NamedTuple):
+    """One published version: flat members, caller metadata and extras."""
+    version: str
+    models: Dict[str, FlatTreeEnsemble]
+    meta: Dict[str, Any]
+    extras: Dict[str, Any]
+
+
+class ModelStore:
+    """
+    Publish fitted ensembles once and map them read-only in any worker.
+    """
+
+    def __init__(self, directory: str = MODEL_STORE_DIR, keep_versions: int = 2,
+                 max_mapped_files: int = MODEL_STORE_MAX_MAPPED_FILES):
+        self.directory = directory
+        self.keep_versions = keep_versions
+        self._loaded = MappedLRU(max_mapped_files)
+
+    def _key_dir(self, key: str) -> str:
+        return os.path.join(self.directory, _KEY_PATTERN.sub('_', key))
+
+    def publish(self, key: str, models: Dict[str, Any], meta: Optional[Dict[str, Any]] = None,
+                extras: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Flatten and write ``models`` under ``key`` and make it the live version.
+
+        Args:
+            key (str): Model identity, e.g. ``advanced-AAPL-3y``
+            models (Dict[str, Any]): Fitted estimators (or already flat ensembles) by member name
+            meta (Dict[str, Any], optional): JSON-serialisable metadata
+            extras (Dict[str, Any], optional): Small picklable objects (scalers)
+
+        Returns:
+            str: The published version id
+        """
+        key_dir = self._key_dir(key)
+        version = f"{time.time_ns()}-{os.getpid()}"
+        version_dir = os.path.join(key_dir, version)
+        os.makedirs(version_dir)
+
+        settings = {}
+        for name, model in models.items():
+            flat = model if isinstance(model, FlatTreeEnsemble) else FlatTreeEnsemble.from_estimator(model)
+            for array in FlatTreeEnsemble.ARRAYS:
+                np.save(os.path.join(version_dir, f"{name}.{array}.npy"), getattr(flat, array))
+            settings[name] = flat.settings()
+
+        with open(os.path.join(version_dir, "meta.json"), "w") as f:
+            json.dump({'members': settings, 'meta': meta or {}}, f)
+        joblib.dump(extras or {}, os.path.join(version_dir, "extras.joblib"))
+
+        pointer = os.path.join(key_dir, "CURRENT")
+        tmp_pointer = f"{pointer}.tmp-{version}"
+        with open(tmp_pointer, "w") as f:
+            json.dump({'version': version}, f)
+        os.replace(tmp_pointer, pointer)
+
+        self._prune(key_dir, version)
+        logger.info("Published %s version %s", key, version)
+        return version
+
+    def _prune(self, key_dir: str, current: str):
+        """Delete old versions. Workers that still map them keep valid mappings."""
+        versions = sorted(
+            (name for name in os.listdir(key_dir) if os.path.isdir(os.path.join(key_dir, name))),
+            key=lambda name: int(name.split('-')[0]),
+        )
+        for name in versions[:-self.keep_versions]:
+            if name != current:
+                shutil.rmtree(os.path.join(key_dir, name), ignore_errors=True)
+
+    def current_version(self, key: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self._key_dir(key), "CURRENT")) as f:
+                return json.load(f)['version']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def load(self, key: str) -> Optional[StoredModel]:
+        """
+        Return the live version of ``key``, memory-mapped, or None if nothing
+        has been published. Mappings are reused until a newer version appears
+        or, among the least recently used, ``MODEL_STORE_MAX_MAPPED_FILES`` is
+        exceeded.
+        """
+        version = self.current_version(key)
+        if version is None:
+            record_cache('model_store', False)
+            return None
+
+        cached = self._loaded.get(key)
+        if cached is not None and cached.version == version:
+            record_cache('model_store', True)
+            return cached
+
+        version_dir = os.path.join(self._key_dir(key), version)
+        try:
+            with open(os.path.join(version_dir, "meta.json")) as f:
+                payload = json.load(f)
+            models = {}
+            for name, settings in payload['members'].items():
+                arrays = {
+                    array: np.load(os.path.join(version_dir, f"{name}.{array}.npy"), mmap_mode='r')
+                    for array in FlatTreeEnsemble.ARRAYS
+                }
+                models[name] = FlatTreeEnsemble(
+                    arrays, settings['aggregate'], settings['bias'], settings['scale'],
+                    settings['max_depth'], np.asarray(settings['feature_importances']),
+                )
+            extras = joblib.load(os.path.join(version_dir, "extras.joblib"))
+        except (OSError, ValueError, KeyError) as e:
+            # Pruned or replaced between reading CURRENT and mapping it
+            logger.warning("Could not map %s version %s: %s", key, version, e)
+            record_cache('model_store', False)
+            return None
+
+        stored = StoredModel(version, models, payload['meta'], extras)
+        self._loaded.put(key, stored, len(models) * len(FlatTreeEnsemble.ARRAYS))
+        record_cache('model_store', False)
+        return stored
+
+
+_store: Optional[ModelStore] = None
+_store_lock = threading.Lock()
+
+
+def get_model_store() -> Optional[ModelStore]:
+    """Return the process-wide store, or None when ``MODEL_STORE_ENABLED`` is off."""
+    global _store
+    if not MODEL_STORE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ModelStore()
+    return _store
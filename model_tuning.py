@@ -0,0 +1,310 @@
+"""
+Offline hyperparameter tuning for the per-symbol predictors.
+
+The estimator settings of ``StockPredictor`` and ``AdvancedStockPredictor``
+were shrunk by hand to save CPU. ``tune_member`` looks instead for the
+cheapest settings of each ensemble member whose cross-validated score is
+within ``MODEL_TUNING_TOLERANCE`` (R² points) of the hand-set defaults. It
+runs successive halving over a small grid:
+
+1. score every candidate with a ``TimeSeriesSplit`` CV on the most recent
+   slice of the history (at least ``30 x (splits + 1)`` bars)
+2. keep ``1 / MODEL_TUNING_ETA`` of them: the cheapest (by measured fit time)
+   of those within tolerance of the round's best score, topped up by score
+3. multiply the slice by ``MODEL_TUNING_ETA`` and repeat until the last
+   round, which uses the full history and also scores the defaults
+
+A symbol cluster (``--cluster``) is tuned once, scoring each candidate on
+every member symbol's own history, and its config is saved for each symbol.
+
+Configs are saved per symbol, predictor kind (``basic``/``advanced``) and bar
+interval as JSON under ``MODEL_CONFIG_DIR``. Online training merges them over
+the defaults via ``model_params`` and ignores them after
+``MODEL_CONFIG_MAX_AGE_DAYS``; without one the defaults are used.
+
+Usage:
+    python -m model_tuning AAPL MSFT --kind advanced --period 3y
+    python -m model_tuning JPM BAC C WFC --kind basic --cluster banks
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.metrics import r2_score
+from sklearn.model_selection import TimeSeriesSplit
+
+logger = logging.getLogger(__name__)
+
+MODEL_CONFIG_ENABLED = os.getenv("MODEL_CONFIG_ENABLED", "true").lower() in ("1", "true", "yes")
+MODEL_CONFIG_DIR = os.getenv("MODEL_CONFIG_DIR", os.path.join(os.getenv("MODEL_CACHE_DIR", "./models"), "configs"))
+MODEL_CONFIG_MAX_AGE_DAYS = float(os.getenv("MODEL_CONFIG_MAX_AGE_DAYS", "90"))
+MODEL_TUNING_TOLERANCE = float(os.getenv("MODEL_TUNING_TOLERANCE", "0.005"))
+MODEL_TUNING_ETA = int(os.getenv("MODEL_TUNING_ETA", "3"))
+MODEL_TUNING_CV_SPLITS = int(os.getenv("MODEL_TUNING_CV_SPLITS", "3"))
+
+# Grids searched per ensemble member; other settings keep their defaults
+SEARCH_SPACES: Dict[str, Dict[str, List[Any]]] = {
+    'random_forest': {
+        'n_estimators': [10, 25, 50, 100],
+        'max_depth': [4, 6, 8, 10],
+        'min_samples_leaf': [1, 2, 5],
+    },
+    'extra_trees': {
+        'n_estimators': [10, 25, 50, 100],
+        'max_depth': [4, 6, 8, 10],
+        'min_samples_leaf': [1, 2, 5],
+    },
+    'gradient_boosting': {
+        'n_estimators': [25, 50, 100],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [2, 3, 4, 6],
+    },
+}
+
+_SYMBOL_PATTERN = re.compile(r'[^\w.^=-]+')
+
+
+class ModelConfig(NamedTuple):
+    """Tuned estimator settings of one predictor kind for one symbol."""
+    symbol: str
+    kind: str
+    params: Dict[str, Dict[str, Any]]
+    scores: Dict[str, float]
+    baseline_scores: Dict[str, float]
+    fit_seconds: Dict[str, float]
+    baseline_fit_seconds: Dict[str, float]
+    tuned_at: float
+    interval: str = "1d"
+    cluster: Optional[str] = None
+
+
+class Candidate(NamedTuple):
+    """One evaluated setting: CV score and mean fit seconds per fold."""
+    params: Dict[str, Any]
+    score: float
+    seconds: float
+
+
+def _path(symbol: str, kind: str, interval: str = "1d") -> str:
+    suffix = f".{interval}" if interval != "1d" else ""
+    return os.path.join(MODEL_CONFIG_DIR, f"{_SYMBOL_PATTERN.sub('_', symbol.upper())}{suffix}.{kind}.json")
+
+
+def load_model_config(symbol: str, kind: str, interval: str = "1d",
+                      max_age_days: float = MODEL_CONFIG_MAX_AGE_DAYS) -> Optional[ModelConfig]:
+    """
+    The persisted config of ``kind`` predictors for ``symbol`` on ``interval`` bars.
+
+    Args:
+        symbol (str): Stock symbol
+        kind (str): 'basic' (``StockPredictor``) or 'advanced' (``AdvancedStockPredictor``)
+        interval (str): Bar interval the config was tuned on
+        max_age_days (float): Ignore configs tuned longer ago than this
+
+    Returns:
+        ModelConfig: The saved config, or None if there is none or it is too old
+    """
+    try:
+        with open(_path(symbol, kind, interval)) as f:
+            config = ModelConfig(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+    if time.time() - config.tuned_at > max_age_days * 86400:
+        return None
+    return config
+
+
+def save_model_config(config: ModelConfig):
+    """Atomically write ``config``, replacing any earlier one for the symbol, kind and interval."""
+    path = _path(config.symbol, config.kind, config.interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w") as f:
+        json.dump(config._asdict(), f)
+    os.replace(tmp_path, path)
+
+
+def model_params(symbol: str, kind: str, interval: str,
+                 defaults: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Estimator settings per ensemble member: ``defaults`` with the symbol's
+    tuned settings, if any, merged over them.
+
+    Args:
+        symbol (str): Stock symbol
+        kind (str): 'basic' or 'advanced'
+        interval (str): Bar interval
+        defaults (Dict[str, Dict[str, Any]]): The predictor's ``DEFAULT_PARAMS``
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Keyword arguments per member
+    """
+    config = load_model_config(symbol, kind, interval) if MODEL_CONFIG_ENABLED else None
+    if config is None:
+        return defaults
+    return {name: {**params, **config.params.get(name, {})} for name, params in defaults.items()}
+
+
+def _evaluate(estimator, params: Dict[str, Any], datasets: Sequence[Tuple[np.ndarray, np.ndarray]],
+              rows: float, cv_splits: int) -> Candidate:
+    """CV score of ``estimator(**params)`` on the last ``rows`` (a fraction) of each dataset."""
+    min_rows = 30 * (cv_splits + 1)
+    scores, seconds, fits = [], 0.0, 0
+    for X, y in datasets:
+        n = min(len(X), max(min_rows, int(len(X) * rows)))
+        X, y = X[-n:], y[-n:]
+        for train_idx, val_idx in TimeSeriesSplit(n_splits=cv_splits).split(X):
+            model = estimator(**params)
+            start = time.perf_counter()
+            model.fit(X[train_idx], y[train_idx])
+            seconds += time.perf_counter() - start
+            fits += 1
+            scores.append(r2_score(y[val_idx], model.predict(X[val_idx])))
+    return Candidate(params, float(np.mean(scores)), seconds / fits)
+
+
+def _keep(results: List[Candidate], count: int, tolerance: float) -> List[Candidate]:
+    """The cheapest ``count`` candidates within ``tolerance`` of the best, topped up by score."""
+    by_score = sorted(results, key=lambda c: c.score, reverse=True)
+    threshold = by_score[0].score - tolerance
+    kept = sorted((c for c in by_score if c.score >= threshold), key=lambda c: c.seconds)[:count]
+    kept += [c for c in by_score if c not in kept][:count - len(kept)]
+    return kept
+
+
+def tune_member(estimator, defaults: Dict[str, Any], space: Dict[str, List[Any]],
+                datasets: Sequence[Tuple[np.ndarray, np.ndarray]], tolerance: float = MODEL_TUNING_TOLERANCE,
+                eta: int = MODEL_TUNING_ETA, cv_splits: int = MODEL_TUNING_CV_SPLITS) -> Tuple[Candidate, Candidate]:
+    """
+    Successive halving for the cheapest settings of one ensemble member that
+    score within ``tolerance`` of ``defaults``.
+
+    Args:
+        estimator: Estimator class
+        defaults (Dict[str, Any]): Hand-set keyword arguments (the baseline)
+        space (Dict[str, List[Any]]): Values to search per argument
+        datasets (Sequence[Tuple[np.ndarray, np.ndarray]]): (X, y) per symbol, oldest row first
+        tolerance (float): R² points the tuned settings may lose against the defaults
+        eta (int): Candidates kept per round is ``1 / eta``; the history used grows ``eta`` times
+        cv_splits (int): Time series CV folds per evaluation
+
+    Returns:
+        Tuple[Candidate, Candidate]: The chosen settings (the defaults if no
+            candidate is within tolerance) and the defaults, both scored on the
+            full history
+    """
+    candidates = [{**defaults, **dict(zip(space, values))} for values in itertools.product(*space.values())]
+    counts = [len(candidates)]
+    while counts[-1] > eta:
+        counts.append(math.ceil(counts[-1] / eta))
+
+    survivors = candidates
+    for i, count in enumerate(counts):
+        rows = float(eta) ** (i - len(counts) + 1)
+        results = [_evaluate(estimator, params, datasets, rows, cv_splits) for params in survivors]
+        if i < len(counts) - 1:
+            survivors = [c.params for c in _keep(results, counts[i + 1], tolerance)]
+
+    baseline = _evaluate(estimator, defaults, datasets, 1.0, cv_splits)
+    passing = [c for c in results if c.score >= baseline.score - tolerance]
+    best = min(passing, key=lambda c: c.seconds) if passing else baseline
+    return best, baseline
+
+
+def _tuning_data(kind: str, symbol: str, period: str, interval: str) -> Optional[Tuple[Any, np.ndarray, np.ndarray]]:
+    """(predictor, X, y) of ``symbol``, on the columns its predictor trains on."""
+    if kind == 'basic':
+        from model import StockPredictor
+
+        predictor = StockPredictor(symbol, interval=interval)
+        data = predictor.fetch_stock_data(period)
+        features = predictor.create_features(data) if data is not None else None
+    else:
+        from advanced_model import AdvancedStockPredictor
+        from feature_selection import get_feature_columns
+
+        predictor = AdvancedStockPredictor(symbol, interval=interval)
+        data = predictor.fetch_stock_data(period)
+        features = None
+        if data is not None:
+            features = predictor.create_advanced_features(data, columns=get_feature_columns(predictor))
+    if features is None or features.empty:
+        return None
+    columns = [c for c in features.columns if c not in predictor.NON_FEATURE_COLUMNS]
+    return predictor, features[columns].fillna(0).to_numpy(dtype=np.float64), features['Target'].to_numpy(dtype=np.float64)
+
+
+def tune_symbols(symbols: List[str], kind: str, period: str = "3y", interval: str = "1d",
+                 cluster: Optional[str] = None, tolerance: float = MODEL_TUNING_TOLERANCE) -> List[ModelConfig]:
+    """
+    Tune ``kind`` predictors once over ``symbols`` and save the config for each.
+
+    Args:
+        symbols (List[str]): Symbols tuned together (one, unless a cluster)
+        kind (str): 'basic' or 'advanced'
+        period (str): History to tune on
+        interval (str): Bar interval
+        cluster (str): Name recorded with a shared config
+        tolerance (float): R² points a member may lose against its defaults
+
+    Returns:
+        List[ModelConfig]: The saved configs, one per symbol with data
+    """
+    loaded = [_tuning_data(kind, symbol, period, interval) for symbol in symbols]
+    loaded = [entry for entry in loaded if entry is not None]
+    if not loaded:
+        return []
+    predictor = loaded[0][0]
+    datasets = [(X, y) for _, X, y in loaded]
+
+    params, scores, baseline_scores, seconds, baseline_seconds = {}, {}, {}, {}, {}
+    for name, estimator in predictor.ESTIMATORS.items():
+        start = time.perf_counter()
+        best, baseline = tune_member(estimator, predictor.DEFAULT_PARAMS[name], SEARCH_SPACES[name],
+                                     datasets, tolerance=tolerance)
+        params[name] = {arg: best.params[arg] for arg in SEARCH_SPACES[name]}
+        scores[name], baseline_scores[name] = best.score, baseline.score
+        seconds[name], baseline_seconds[name] = best.seconds, baseline.seconds
+        logger.info("Tuned %s for %s: %s (CV R² %.4f vs %.4f, fit %.3fs vs %.3fs, %.1fs)",
+                    name, cluster or predictor.symbol, params[name], best.score, baseline.score,
+                    best.seconds, baseline.seconds, time.perf_counter() - start)
+
+    configs = []
+    for symbol_predictor, _, _ in loaded:
+        config = ModelConfig(symbol_predictor.symbol, kind, params, scores, baseline_scores, seconds,
+                             baseline_seconds, time.time(), interval, cluster)
+        save_model_config(config)
+        configs.append(config)
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune and save the estimator settings of each symbol")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--kind", choices=["basic", "advanced"], default="advanced")
+    parser.add_argument("--period", default="3y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--cluster", help="Tune the symbols together and save one shared config")
+    parser.add_argument("--tolerance", type=float, default=MODEL_TUNING_TOLERANCE)
+    args = parser.parse_args()
+
+    groups = [args.symbols] if args.cluster else [[symbol] for symbol in args.symbols]
+    for symbols in groups:
+        configs = tune_symbols(symbols, args.kind, args.period, args.interval, args.cluster, args.tolerance)
+        if not configs:
+            print(f"{', '.join(symbols)}: no data")
+            continue
+        print(json.dumps(configs[0]._asdict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
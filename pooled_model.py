@@ -0,0 +1,365 @@
+"""
+Pooled cross-sectional model shared by every stock symbol.
+
+Instead of training a model per request, one model is trained offline over a
+universe of symbols using scale-free features (returns, ratios and normalised
+indicators), so rows from a $5 stock and a $500 stock live on the same scale.
+The fitted model is saved to disk and loaded once per worker; serving a
+prediction then only needs a data fetch and a single feature row.
+
+Train offline with:
+    python pooled_model.py --symbols AAPL MSFT GOOGL AMZN --period 5y
+"""
+
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesRegressor
+from sklearn.metrics import mean_absolute_error
+
+from advanced_model import AdvancedStockPredictor
+from data_provider import DataProvider
+from metrics import stage_timer
+from model_store import ModelStore, get_model_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join(os.getenv("MODEL_CACHE_DIR", "./models"), "pooled_model.joblib")
+STORE_KEY = "pooled"
+
+# Columns from create_advanced_features that do not depend on the price level
+SCALE_FREE_FEATURES = [
+    'Price_Change', 'Price_Change_2d', 'Price_Change_5d',
+    'High_Low_Ratio', 'Open_Close_Ratio',
+    'Price_SMA_5_Ratio', 'Price_SMA_10_Ratio', 'Price_SMA_20_Ratio',
+    'Price_SMA_50_Ratio', 'Price_SMA_100_Ratio', 'Price_SMA_200_Ratio',
+    'BB_Position', 'RSI', 'RSI_21', 'Stoch_K', 'Stoch_D', 'Williams_R',
+    'ATR_Ratio', 'DI_Plus', 'DI_Minus', 'ADX', 'Volume_Ratio',
+    'Gap_Up', 'Gap_Down', 'Doji', 'Hammer', 'Day_of_Week', 'Month',
+]
+
+# Price-denominated columns that become scale-free once divided by Close
+NORMALISED_FEATURES = {
+    'MACD_Norm': 'MACD',
+    'MACD_Histogram_Norm': 'MACD_Histogram',
+    'BB_Width_Norm': 'BB_Width',
+    'Volatility_20_Norm': 'Close_Rolling_Std_20',
+}
+
+POOLED_FEATURES = SCALE_FREE_FEATURES + list(NORMALISED_FEATURES)
+
+
+def build_pooled_features(symbol: str, data: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Build the scale-free feature frame for one symbol.
+
+    Args:
+        symbol (str): Stock symbol
+        data (pd.DataFrame): Raw OHLCV data
+
+    Returns:
+        pd.DataFrame: Pooled feature columns plus ``Close``, including the most
+        recent bar, or None if there is not enough history
+    """
+    features = AdvancedStockPredictor(symbol).create_advanced_features(
+        data, include_target=False, columns=SCALE_FREE_FEATURES + list(NORMALISED_FEATURES.values())
+    )
+    if features is None or features.empty:
+        return None
+
+    for name, column in NORMALISED_FEATURES.items():
+        features[name] = features[column] / features['Close']
+
+    return features[POOLED_FEATURES + ['Close']].replace([np.inf, -np.inf], np.nan).dropna()
+
+
+class PooledStockPredictor:
+    """
+    A single model trained over many symbols that predicts next-day returns.
+    """
+
+    def __init__(self):
+        """Initialize an untrained pooled predictor."""
+        self.model = ExtraTreesRegressor(
+            n_estimators=100,
+            max_depth=10,
+            min_samples_leaf=20,
+            random_state=42,
+            n_jobs=2
+        )
+        self.feature_columns = list(POOLED_FEATURES)
+        self.symbols: List[str] = []
+        self.trained_at: Optional[str] = None
+        self.metrics: Dict[str, float] = {}
+        self.is_trained = False
+
+    def build_training_set(self, frames: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Stack per-symbol feature rows into one training set.
+
+        Args:
+            frames (Dict[str, pd.DataFrame]): Raw OHLCV data keyed by symbol
+
+        Returns:
+            Tuple[pd.DataFrame, pd.Series]: Features and next-day return target
+        """
+        X_parts, y_parts = [], []
+        for symbol, data in frames.items():
+            features = build_pooled_features(symbol, data)
+            if features is None or len(features) < 2:
+                logger.warning("Skipping %s: not enough history for pooled features", symbol)
+                continue
+
+            if getattr(features.index, 'tz', None) is not None:
+                # Exchanges report in different time zones; align on the trading date
+                features.index = features.index.tz_localize(None)
+
+            target = features['Close'].shift(-1) / features['Close'] - 1
+            valid = target.notna()
+            X_parts.append(features.loc[valid, self.feature_columns])
+            y_parts.append(target[valid])
+            self.symbols.append(symbol)
+
+        if not X_parts:
+            raise ValueError("No symbol produced usable training rows")
+
+        return pd.concat(X_parts), pd.concat(y_parts)
+
+    def train(self, frames: Dict[str, pd.DataFrame]) -> bool:
+        """
+        Train the pooled model on data from many symbols.
+
+        The last 20% of dates are held out for evaluation before the final fit
+        on everything, so the reported error is out-of-sample in time.
+
+        Args:
+            frames (Dict[str, pd.DataFrame]): Raw OHLCV data keyed by symbol
+
+        Returns:
+            bool: True if training successful, False otherwise
+        """
+        try:
+            self.symbols = []
+            X, y = self.build_training_set(frames)
+            logger.info("Training pooled model on %d rows from %d symbols", len(X), len(self.symbols))
+
+            cutoff = X.index.sort_values()[int(len(X) * 0.8)]
+            train_mask = X.index < cutoff
+            self.model.fit(X[train_mask], y[train_mask])
+            holdout_pred = self.model.predict(X[~train_mask])
+            self.metrics = {
+                'holdout_mae': float(mean_absolute_error(y[~train_mask], holdout_pred)),
+                'holdout_hit_rate': float(np.mean(np.sign(holdout_pred) == np.sign(y[~train_mask]))),
+                'training_rows': int(len(X)),
+            }
+
+            self.model.fit(X, y)
+            # Single-row inference is faster without the thread pool
+            self.model.set_params(n_jobs=1)
+
+            self.trained_at = datetime.now().isoformat()
+            self.is_trained = True
+            logger.info("Pooled model trained. Holdout MAE: %.5f, hit rate: %.3f",
+                        self.metrics['holdout_mae'], self.metrics['holdout_hit_rate'])
+            return True
+
+        except (ValueError, MemoryError) as e:
+            logger.error("Error training pooled model: %s", e)
+            return False
+
+    def predict_from_data(self, symbol: str, data: pd.DataFrame, days_ahead: int = 1) -> Optional[Dict[str, Any]]:
+        """
+        Predict the next close for any symbol from its recent OHLCV data.
+
+        Args:
+            symbol (str): Stock symbol
+            data (pd.DataFrame): Recent OHLCV data (at least ~200 bars)
+            days_ahead (int): Prediction horizon used for the reported date
+
+        Returns:
+            Dict[str, Any]: Prediction in the ``PredictionResponse`` shape or None
+        """
+        if not self.is_trained:
+            logger.error("Pooled model not trained")
+            return None
+
+        features = build_pooled_features(symbol, data)
+        if features is None or features.empty:
+            return None
+
+        latest = features[self.feature_columns].iloc[-1:]
+        with stage_timer('inference'):
+            predicted_return = float(self.model.predict(latest)[0])
+        current_price = float(data['Close'].iloc[-1])
+        predicted_price = current_price * (1 + predicted_return)
+
+        return {
+            'symbol': symbol.upper(),
+            'current_price': current_price,
+            'predicted_price': predicted_price,
+            'price_change_pct': predicted_return * 100,
+            'prediction_date': (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d'),
+            'model_confidence': 'medium',
+            'model_type': 'pooled',
+        }
+
+    def save(self, path: str = DEFAULT_MODEL_PATH) -> str:
+        """
+        Save the fitted model and its metadata to disk.
+
+        Args:
+            path (str): Destination file
+
+        Returns:
+            str: The path written
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        joblib.dump({'model': self.model, **self._metadata()}, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info("Saved pooled model to %s", path)
+        return path
+
+    def _metadata(self) -> Dict[str, Any]:
+        return {
+            'feature_columns': self.feature_columns,
+            'symbols': self.symbols,
+            'trained_at': self.trained_at,
+            'metrics': self.metrics,
+        }
+
+    def publish(self, store: Optional[ModelStore] = None) -> bool:
+        """
+        Publish the fitted model to the shared model store, where every worker
+        maps the same copy instead of unpickling its own.
+
+        Returns:
+            bool: True if the model was published
+        """
+        store = store or get_model_store()
+        if store is None or not self.is_trained:
+            return False
+        store.publish(STORE_KEY, {'extra_trees': self.model}, meta=self._metadata())
+        return True
+
+    @classmethod
+    def load_published(cls, store: Optional[ModelStore] = None) -> Optional["PooledStockPredictor"]:
+        """Map the published pooled model, or return None if there is none."""
+        store = store or get_model_store()
+        stored = store.load(STORE_KEY) if store is not None else None
+        if stored is None:
+            return None
+
+        predictor = cls()
+        predictor.model = stored.models['extra_trees']
+        predictor.feature_columns = stored.meta['feature_columns']
+        predictor.symbols = stored.meta['symbols']
+        predictor.trained_at = stored.meta['trained_at']
+        predictor.metrics = stored.meta['metrics']
+        predictor.is_trained = True
+        return predictor
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "PooledStockPredictor":
+        """Load a pooled model previously written by ``save``."""
+        payload = joblib.load(path)
+        predictor = cls()
+        predictor.model = payload['model']
+        predictor.feature_columns = payload['feature_columns']
+        predictor.symbols = payload['symbols']
+        predictor.trained_at = payload['trained_at']
+        predictor.metrics = payload['metrics']
+        predictor.is_trained = True
+        return predictor
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the pooled model."""
+        if not self.is_trained:
+            return {'error': 'Model not trained'}
+
+        return {
+            'model_type': 'Pooled Extra Trees Regressor',
+            'trained_at': self.trained_at,
+            'symbol_count': len(self.symbols),
+            'feature_count': len(self.feature_columns),
+            'metrics': self.metrics,
+        }
+
+
+_pooled_predictor: Optional[PooledStockPredictor] = None
+_pooled_loaded = False
+_pooled_lock = threading.Lock()
+
+
+def get_pooled_predictor(path: str = DEFAULT_MODEL_PATH) -> Optional[PooledStockPredictor]:
+    """
+    Return the worker-wide pooled predictor, loading it on first use.
+
+    Prefers the memory-mapped copy in the shared model store, so workers on
+    one machine share a single copy, and falls back to the joblib file.
+
+    Returns:
+        PooledStockPredictor: The loaded model, or None if no model file exists
+    """
+    global _pooled_predictor, _pooled_loaded
+    if _pooled_loaded:
+        return _pooled_predictor
+
+    with _pooled_lock:
+        if not _pooled_loaded:
+            _pooled_predictor = PooledStockPredictor.load_published()
+            if _pooled_predictor is not None:
+                logger.info("Mapped pooled model from the model store")
+            elif os.path.exists(path):
+                try:
+                    _pooled_predictor = PooledStockPredictor.load(path)
+                    logger.info("Loaded pooled model from %s", path)
+                except Exception as e:
+                    logger.error("Failed to load pooled model from %s: %s", path, e)
+            else:
+                logger.info("No pooled model at %s, falling back to per-symbol models", path)
+            _pooled_loaded = True
+
+    return _pooled_predictor
+
+
+def fetch_universe(symbols: Iterable[str], period: str,
+                   provider: Optional[DataProvider] = None) -> Dict[str, pd.DataFrame]:
+    """Fetch raw OHLCV data for every symbol in the training universe."""
+    frames = {}
+    for symbol in symbols:
+        try:
+            data = AdvancedStockPredictor(symbol, provider=provider).fetch_stock_data(period)
+        except OSError as e:
+            logger.warning("Skipping %s, its data could not be fetched: %s", symbol, e)
+            continue
+        if data is not None:
+            frames[symbol.upper()] = data
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the pooled cross-sectional model offline")
+    parser.add_argument("--symbols", nargs="+", required=True, help="Training universe")
+    parser.add_argument("--period", default="5y", help="History period per symbol")
+    parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="Where to save the model")
+    args = parser.parse_args()
+
+    predictor = PooledStockPredictor()
+    if not predictor.train(fetch_universe(args.symbols, args.period)):
+        raise SystemExit("Pooled model training failed")
+    predictor.save(args.output)
+    predictor.publish()
+
+
+if __name__ == "__main__":
+    main()
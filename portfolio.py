@@ -0,0 +1,262 @@
+"""
+Portfolio analytics over an aligned date x symbol price panel.
+
+``load_panel`` fetches every holding's daily closes (from the bar store for
+the remote providers) on a small thread pool and scatters them into one
+``dates x symbols`` float matrix on the union of trading days. Gaps from
+differing exchange holidays are forward-filled, and the panel starts on the
+first date every symbol has a price. Prices are converted to one currency at
+the current rate table (a constant-rate conversion, not historical FX).
+
+``portfolio_statistics`` then works on that matrix alone: the value history is
+``panel @ shares``, the covariance is one ``Xᵀ X`` over demeaned returns, and
+betas, volatilities and drawdowns are column-wise reductions. A 500-symbol,
+10-year panel is a 2,500 x 500 matrix, which takes milliseconds.
+
+Usage:
+    python -m portfolio AAPL=10 MSFT=5 PETR4.SA=100 --period 5y
+"""
+
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_provider import DataProvider, get_data_provider
+from fx import get_rate_table
+
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_BENCHMARK = os.getenv("PORTFOLIO_BENCHMARK", "^GSPC")
+PORTFOLIO_FETCH_WORKERS = int(os.getenv("PORTFOLIO_FETCH_WORKERS", "8"))
+
+TRADING_DAYS = 252
+
+
+class PricePanel(NamedTuple):
+    """Forward-filled closes, ``prices[t, j]`` is ``symbols[j]`` on ``dates[t]``."""
+    dates: np.ndarray
+    symbols: List[str]
+    prices: np.ndarray
+    benchmark: Optional[np.ndarray]
+    currency: str
+    missing: List[str]
+
+
+def _daily_dates(index: pd.DatetimeIndex) -> np.ndarray:
+    """Exchange-local calendar dates, comparable across time zones."""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]')
+
+
+def _closes(provider: DataProvider, symbol: str, period: str) -> Optional[pd.Series]:
+    hist = provider.history(symbol, period=period)
+    if hist is None or hist.empty:
+        return None
+    return hist['Close']
+
+
+def _align(series: List[pd.Series], dates: np.ndarray) -> np.ndarray:
+    """Scatter each series onto ``dates`` (NaN where it has no bar), then forward-fill."""
+    panel = np.full((len(dates), len(series)), np.nan)
+    for j, closes in enumerate(series):
+        panel[np.searchsorted(dates, _daily_dates(closes.index)), j] = closes.to_numpy(dtype=np.float64)
+
+    # Forward-fill: each cell takes the latest row at or above it that has a value
+    rows = np.where(np.isnan(panel), 0, np.arange(len(dates))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return panel[rows, np.arange(len(series))]
+
+
+def load_panel(symbols: List[str], period: str = "1y", currency: str = "USD",
+               benchmark: Optional[str] = PORTFOLIO_BENCHMARK,
+               provider: Optional[DataProvider] = None) -> PricePanel:
+    """
+    Fetch and align the daily closes of ``symbols`` (and the benchmark).
+
+    Args:
+        symbols (List[str]): Upper-cased, de-duplicated symbols
+        period (str): History window ('1y', '5y', '10y', ...)
+        currency (str): Currency to convert every price to
+        benchmark (str): Index to compute betas against, or None
+        provider (DataProvider): Data source (defaults to the configured one)
+
+    Returns:
+        PricePanel: Aligned closes; symbols without data are listed in ``missing``
+
+    Raises:
+        LookupError: If none of the symbols has data
+        ValueError: If the currency is unsupported
+    """
+    provider = provider or get_data_provider()
+    to_fetch = symbols + ([benchmark] if benchmark and benchmark not in symbols else [])
+    with ThreadPoolExecutor(max_workers=max(1, PORTFOLIO_FETCH_WORKERS), thread_name_prefix="stoky-portfolio") as pool:
+        fetched = dict(zip(to_fetch, pool.map(lambda s: _closes(provider, s, period), to_fetch)))
+
+    found = [s for s in symbols if fetched[s] is not None]
+    missing = [s for s in symbols if fetched[s] is None]
+    if not found:
+        raise LookupError(f"No price history for any of: {', '.join(symbols)}")
+    benchmark_closes = fetched.get(benchmark) if benchmark else None
+    if benchmark and benchmark_closes is None:
+        logger.warning("No history for benchmark %s, skipping betas", benchmark)
+
+    series = [fetched[s] for s in found]
+    dates = np.unique(np.concatenate([_daily_dates(closes.index) for closes in series]))
+    prices = _align(series, dates) * get_rate_table().symbol_factors(found, currency)
+
+    # Start where every holding has a price
+    start = int(np.argmax(~np.isnan(prices).any(axis=1)))
+    dates, prices = dates[start:], prices[start:]
+
+    aligned_benchmark = None
+    if benchmark_closes is not None:
+        # Align on the union of dates so a benchmark holiday fills from the bar before it
+        benchmark_dates = np.union1d(dates, _daily_dates(benchmark_closes.index))
+        aligned_benchmark = _align([benchmark_closes], benchmark_dates)[:, 0]
+        aligned_benchmark = aligned_benchmark[np.searchsorted(benchmark_dates, dates)]
+        if np.isnan(aligned_benchmark).any():
+            # The benchmark history starts later than the holdings'
+            aligned_benchmark = None
+
+    return PricePanel(dates, found, prices, aligned_benchmark, currency, missing)
+
+
+def _json_float(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def _json_floats(values: np.ndarray) -> list:
+    """``values`` as (nested) lists with non-finite entries as None."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def _max_drawdown(values: np.ndarray, dates: np.ndarray) -> Dict[str, Any]:
+    peaks = np.maximum.accumulate(values)
+    drawdowns = values / peaks - 1
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(values[:trough + 1]))
+    return {
+        'max_drawdown': _json_float(drawdowns[trough]),
+        'peak_date': str(dates[peak]),
+        'trough_date': str(dates[trough]),
+    }
+
+
+def portfolio_statistics(panel: PricePanel, shares: np.ndarray,
+                         include_matrices: bool = True) -> Dict[str, Any]:
+    """
+    Value history and risk statistics for holding ``shares`` of each panel symbol.
+
+    Volatilities and the covariance are annualised from daily simple returns.
+    Statistics that come out non-finite (e.g. an annualised return of a
+    portfolio whose value changed sign) are reported as None.
+
+    Args:
+        panel (PricePanel): Aligned prices from ``load_panel``
+        shares (np.ndarray): Units held, in ``panel.symbols`` order
+        include_matrices (bool): Include the correlation and covariance matrices
+
+    Returns:
+        Dict[str, Any]: Statistics ready for ``PortfolioAnalysisResponse``
+
+    Raises:
+        ValueError: If the panel has fewer than three dates, or the portfolio
+            is worth zero or a non-finite amount on any of them
+    """
+    prices, dates = panel.prices, panel.dates
+    if len(dates) < 3:
+        raise ValueError("Not enough overlapping history to analyze the portfolio")
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        values = prices @ shares
+    if not np.isfinite(values).all() or (values == 0).any():
+        raise ValueError("Portfolio value is zero or out of range; check the share counts")
+    returns = prices[1:] / prices[:-1] - 1
+    portfolio_returns = values[1:] / values[:-1] - 1
+    n = len(returns)
+
+    demeaned = returns - returns.mean(axis=0)
+    covariance = demeaned.T @ demeaned / (n - 1) * TRADING_DAYS
+    volatilities = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(volatilities, volatilities)
+    correlation = np.nan_to_num(correlation)
+
+    years = n / TRADING_DAYS
+    with np.errstate(over='ignore', invalid='ignore'):
+        annualized_return = (values[-1] / values[0]) ** (1 / years) - 1
+    result: Dict[str, Any] = {
+        'start_date': str(dates[0]),
+        'end_date': str(dates[-1]),
+        'total_value': float(values[-1]),
+        'weights': dict(zip(panel.symbols, _json_floats(shares * prices[-1] / values[-1]))),
+        'value_history': [{'date': d, 'value': v} for d, v in zip(dates.astype(str).tolist(), values.tolist())],
+        'total_return': _json_float(values[-1] / values[0] - 1),
+        'annualized_return': _json_float(annualized_return),
+        'volatility': _json_float(portfolio_returns.std(ddof=1) * np.sqrt(TRADING_DAYS)),
+        'symbol_volatility': dict(zip(panel.symbols, _json_floats(volatilities))),
+        'beta': None,
+        'symbol_betas': None,
+        **_max_drawdown(values, dates),
+    }
+
+    if panel.benchmark is not None:
+        benchmark_returns = panel.benchmark[1:] / panel.benchmark[:-1] - 1
+        benchmark_demeaned = benchmark_returns - benchmark_returns.mean()
+        variance = benchmark_demeaned @ benchmark_demeaned
+        if variance > 0:
+            betas = demeaned.T @ benchmark_demeaned / variance
+            portfolio_demeaned = portfolio_returns - portfolio_returns.mean()
+            result['beta'] = _json_float(portfolio_demeaned @ benchmark_demeaned / variance)
+            result['symbol_betas'] = dict(zip(panel.symbols, _json_floats(betas)))
+
+    if include_matrices:
+        result['correlation'] = correlation.tolist()
+        result['covariance'] = _json_floats(covariance)
+    return result
+
+
+def analyze_portfolio(holdings: Dict[str, float], period: str = "1y", currency: str = "USD",
+                      benchmark: Optional[str] = PORTFOLIO_BENCHMARK, include_matrices: bool = True,
+                      provider: Optional[DataProvider] = None) -> Dict[str, Any]:
+    """Load the panel for ``holdings`` (symbol -> shares) and compute its statistics."""
+    holdings = {symbol.upper().strip(): float(units) for symbol, units in holdings.items()}
+    panel = load_panel(list(holdings), period, currency, benchmark, provider)
+    shares = np.array([holdings[s] for s in panel.symbols])
+    return {
+        'symbols': panel.symbols,
+        'currency': panel.currency,
+        'benchmark': benchmark if panel.benchmark is not None else None,
+        'missing': panel.missing,
+        **portfolio_statistics(panel, shares, include_matrices),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a portfolio of SYMBOL=SHARES holdings")
+    parser.add_argument("holdings", nargs="+", help="Holdings as SYMBOL=SHARES")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--currency", default="USD")
+    parser.add_argument("--benchmark", default=PORTFOLIO_BENCHMARK)
+    args = parser.parse_args()
+
+    holdings = {}
+    for holding in args.holdings:
+        symbol, _, units = holding.partition('=')
+        holdings[symbol] = float(units or 1)
+    result = analyze_portfolio(holdings, args.period, args.currency.upper(), args.benchmark or None,
+                               include_matrices=False)
+    result.pop('value_history')
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+On-demand sampling profiler for single API requests.
+
+An operator can ask for one request to be profiled (``?profile=1`` or the
+``X-Profile: 1`` header plus ``X-Operator-Token``). While it runs, a background
+thread samples the stacks of the threads doing that request's work every few
+milliseconds and aggregates them into the folded-stack format understood by
+flamegraph.pl and speedscope. Nothing here runs unless profiling was asked for.
+"""
+
+import hmac
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional, Set
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+OPERATOR_TOKEN = os.getenv("OPERATOR_TOKEN")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+# Profiler of the current request, if it is being profiled
+current_profiler: ContextVar[Optional["SamplingProfiler"]] = ContextVar('current_profiler', default=None)
+
+_PROFILE_ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of a set of threads at a fixed interval.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._threads: Set[int] = set()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def add_thread(self, ident: int):
+        """Include a thread in the samples (the event loop, a pool worker, ...)."""
+        self._threads.add(ident)
+
+    def remove_thread(self, ident: int):
+        self._threads.discard(ident)
+
+    def start(self):
+        self.add_thread(threading.get_ident())
+        self._sampler = threading.Thread(target=self._run, name="stoky-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[self._fold(frame)] += 1
+
+    @staticmethod
+    def _fold(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def folded(self) -> str:
+        """Return samples as ``frame;frame;frame count`` lines."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def save(self, label: str) -> str:
+        """
+        Write the folded stacks to ``PROFILE_DIR``.
+
+        Returns:
+            str: Profile id usable with ``load_profile``
+        """
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe_label = re.sub(r'[^\w.-]+', '_', label).strip('_')
+        profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{safe_label}"
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w") as f:
+            f.write(self.folded())
+        return profile_id
+
+
+@contextmanager
+def profiled_thread():
+    """
+    Sample the calling thread for the active request's profiler while the
+    block runs. Pool threads are shared, so they are only sampled for as long
+    as they work on the profiled request.
+    """
+    profiler = current_profiler.get()
+    if profiler is None:
+        yield
+        return
+
+    ident = threading.get_ident()
+    profiler.add_thread(ident)
+    try:
+        yield
+    finally:
+        profiler.remove_thread(ident)
+
+
+def is_operator(token: Optional[str]) -> bool:
+    """Profiling is only available when ``OPERATOR_TOKEN`` is set and matches."""
+    # Constant-time, and as bytes: compare_digest rejects non-ASCII str
+    return bool(OPERATOR_TOKEN) and hmac.compare_digest((token or "").encode(), OPERATOR_TOKEN.encode())
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    """Return a stored profile's folded stacks, or None if it does not exist."""
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
@@ -0,0 +1,496 @@
+"""
+Technical screener over a symbol universe.
+
+A screen is a condition over the indicator columns of
+``AdvancedStockPredictor.create_advanced_features``, e.g.
+``RSI<30 AND Price_SMA_200_Ratio>1`` (``AND``, ``OR``, ``NOT``, parentheses and
+``< <= > >= = !=`` between indicators and numbers).
+
+Instead of running the per-symbol DataFrame pipeline thousands of times, the
+universe's bars are loaded once into ``bars x symbols`` matrices, one per
+OHLCV field. Columns are right-aligned by bar, so row ``-1`` is every
+symbol's latest bar and each column sees exactly the bar sequence the
+per-symbol pipeline would. Every indicator is then one vectorised pass over
+the whole matrix: rolling means and standard deviations from cumulative
+sums, rolling extremes from a sliding-window view, EWMs as one recursion over
+rows that updates all symbols at once.
+
+The panel is cached stale-while-revalidate (``SCREEN_SOFT_TTL``/
+``SCREEN_HARD_TTL``), the latest value of each indicator is computed once per
+panel, and screen results are cached per condition until the universe's last
+bar changes.
+
+Usage:
+    python -m screener "RSI<30 AND Price_SMA_200_Ratio>1"
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import indicator_kernels as kernels
+from data_provider import OHLCV_COLUMNS, DataProvider, get_data_provider
+from indicator_kernels import before_first_bar, ewm_mean, pct_change, rolling_mean, rolling_std, shift
+from metrics import record_cache
+from swr_cache import SWRCache
+from symbol_directory import get_symbol_directory
+
+logger = logging.getLogger(__name__)
+
+# Symbols to screen: a file of symbols (one per line, or a CSV with a
+# ``symbol`` column); empty screens every symbol in SYMBOL_LIST_PATH
+SCREEN_UNIVERSE = os.getenv("SCREEN_UNIVERSE", "")
+SCREEN_PERIOD = os.getenv("SCREEN_PERIOD", "1y")
+SCREEN_SOFT_TTL = float(os.getenv("SCREEN_SOFT_TTL", "900"))
+SCREEN_HARD_TTL = float(os.getenv("SCREEN_HARD_TTL", "3600"))
+SCREEN_FETCH_WORKERS = int(os.getenv("SCREEN_FETCH_WORKERS", "8"))
+SCREEN_RESULT_CACHE_SIZE = int(os.getenv("SCREEN_RESULT_CACHE_SIZE", "256"))
+
+MAX_WINDOW = 1000
+
+
+def _rsi(f: "IndicatorFrame", period: int) -> np.ndarray:
+    close = f['Close']
+    delta = close - shift(close)
+    gain = before_first_bar(np.where(delta > 0, delta, 0.0), close)
+    loss = before_first_bar(np.where(delta < 0, -delta, 0.0), close)
+    rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+    return 100 - 100 / (1 + rs)
+
+
+def _true_range(f: "IndicatorFrame") -> np.ndarray:
+    previous_close = shift(f['Close'])
+    return np.maximum(f['High'] - f['Low'],
+                      np.maximum(np.abs(f['High'] - previous_close), np.abs(f['Low'] - previous_close)))
+
+
+def _bollinger(f: "IndicatorFrame", band: str, period: int = 20, std_dev: int = 2) -> np.ndarray:
+    middle = rolling_mean(f['Close'], period)
+    width = rolling_std(f['Close'], period) * std_dev
+    if band == 'Middle':
+        return middle
+    if band == 'Upper':
+        return middle + width
+    if band == 'Lower':
+        return middle - width
+    if band == 'Width':
+        return 2 * width
+    return (f['Close'] - (middle - width)) / (2 * width)
+
+
+# Indicator name -> computation, named as in ``create_advanced_features``
+INDICATORS: Dict[str, Callable[["IndicatorFrame"], np.ndarray]] = {
+    **{field: (lambda f, field=field: f.fields[field]) for field in OHLCV_COLUMNS},
+    'Price': lambda f: f['Close'],
+    'Price_Change': lambda f: pct_change(f['Close']),
+    'Price_Change_2d': lambda f: pct_change(f['Close'], 2),
+    'Price_Change_5d': lambda f: pct_change(f['Close'], 5),
+    'High_Low_Ratio': lambda f: f['High'] / f['Low'],
+    'Open_Close_Ratio': lambda f: f['Open'] / f['Close'],
+    'BB_Upper': lambda f: _bollinger(f, 'Upper'),
+    'BB_Lower': lambda f: _bollinger(f, 'Lower'),
+    'BB_Middle': lambda f: _bollinger(f, 'Middle'),
+    'BB_Width': lambda f: _bollinger(f, 'Width'),
+    'BB_Position': lambda f: _bollinger(f, 'Position'),
+    'RSI': lambda f: f['RSI_14'],
+    'MACD': lambda f: f['EMA_12'] - f['EMA_26'],
+    'MACD_Signal': lambda f: ewm_mean(f['MACD'], 9),
+    'MACD_Histogram': lambda f: f['MACD'] - f['MACD_Signal'],
+    'Stoch_K': lambda f: f.kernel('stochastic')[0],
+    'Stoch_D': lambda f: f.kernel('stochastic')[1],
+    'Williams_R': lambda f: kernels.williams_r(f['High'], f['Low'], f['Close']),
+    'ATR': lambda f: rolling_mean(_true_range(f), 14),
+    'ATR_Ratio': lambda f: f['ATR'] / f['Close'],
+    'DI_Plus': lambda f: f.kernel('adx')[0],
+    'DI_Minus': lambda f: f.kernel('adx')[1],
+    'ADX': lambda f: f.kernel('adx')[2],
+    'Volume_Ratio': lambda f: f['Volume'] / f['Volume_SMA_20'],
+    'Gap_Up': lambda f: f.kernel('candle_patterns')[0],
+    'Gap_Down': lambda f: f.kernel('candle_patterns')[1],
+    'Doji': lambda f: f.kernel('candle_patterns')[2],
+    'Hammer': lambda f: f.kernel('candle_patterns')[3],
+}
+
+# Indicators with a window in their name (SMA_50, RSI_21, ...)
+PARAMETRIC_INDICATORS: List[Tuple[re.Pattern, Callable[["IndicatorFrame", int], np.ndarray]]] = [
+    (re.compile(r'^SMA_(\d+)$'), lambda f, n: rolling_mean(f['Close'], n)),
+    (re.compile(r'^SMA_(\d+)_slope$'), lambda f, n: f[f'SMA_{n}'] - shift(f[f'SMA_{n}'])),
+    (re.compile(r'^EMA_(\d+)$'), lambda f, n: ewm_mean(f['Close'], n)),
+    (re.compile(r'^Price_SMA_(\d+)_Ratio$'), lambda f, n: f['Close'] / f[f'SMA_{n}']),
+    (re.compile(r'^RSI_(\d+)$'), _rsi),
+    (re.compile(r'^Volume_SMA_(\d+)$'), lambda f, n: rolling_mean(f['Volume'], n)),
+]
+
+_CANONICAL = {name.upper(): name for name in INDICATORS}
+_PARAMETRIC_CANONICAL = [(re.compile(pattern.pattern, re.IGNORECASE), pattern, fn)
+                         for pattern, fn in PARAMETRIC_INDICATORS]
+
+
+def canonical_indicator(name: str) -> str:
+    """
+    Canonical spelling of an indicator name, matched case-insensitively.
+
+    Raises:
+        ValueError: If the indicator is unknown or its window is out of range
+    """
+    canonical = _CANONICAL.get(name.upper())
+    if canonical is not None:
+        return canonical
+    for insensitive, pattern, _ in _PARAMETRIC_CANONICAL:
+        match = insensitive.match(name)
+        if match:
+            window = int(match.group(1))
+            if not 1 <= window <= MAX_WINDOW:
+                raise ValueError(f"Indicator window must be between 1 and {MAX_WINDOW}: {name}")
+            # Rebuild the name from the pattern's literal parts
+            return pattern.pattern.strip('^$').replace(r'(\d+)', str(window))
+    raise ValueError(f"Unknown indicator: {name}. Supported: {', '.join(sorted(INDICATORS))}, "
+                     f"SMA_<n>, SMA_<n>_slope, EMA_<n>, Price_SMA_<n>_Ratio, RSI_<n>, Volume_SMA_<n>")
+
+
+class IndicatorFrame:
+    """Full-history indicator matrices for one screen, computed on first use."""
+
+    def __init__(self, fields: Dict[str, np.ndarray]):
+        self.fields = fields
+        self._cache: Dict[str, np.ndarray] = {}
+        self._kernels: Dict[str, Tuple[np.ndarray, ...]] = {}
+
+    def kernel(self, name: str) -> Tuple[np.ndarray, ...]:
+        """Outputs of a multi-output ``indicator_kernels`` function, computed once."""
+        outputs = self._kernels.get(name)
+        if outputs is None:
+            prices = {
+                'stochastic': ('High', 'Low', 'Close'),
+                'adx': ('High', 'Low', 'Close'),
+                'candle_patterns': ('Open', 'High', 'Low', 'Close'),
+            }[name]
+            outputs = self._kernels[name] = getattr(kernels, name)(*(self.fields[p] for p in prices))
+        return outputs
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        values = self._cache.get(name)
+        if values is None:
+            fn = INDICATORS.get(name)
+            if fn is not None:
+                values = fn(self)
+            else:
+                for pattern, parametric in PARAMETRIC_INDICATORS:
+                    match = pattern.match(name)
+                    if match:
+                        values = parametric(self, int(match.group(1)))
+                        break
+                else:
+                    raise ValueError(f"Unknown indicator: {name}")
+            self._cache[name] = values
+        return values
+
+
+class ScreenPanel:
+    """
+    OHLCV matrices of a universe, right-aligned by bar, with memoised latest
+    indicator values.
+    """
+
+    def __init__(self, symbols: List[str], fields: Dict[str, np.ndarray], last_dates: List[str]):
+        self.symbols = symbols
+        self.fields = fields
+        self.last_dates = last_dates
+        self.as_of = max(last_dates) if last_dates else None
+        # Identifies the latest bar of every symbol; changes when any new bar arrives
+        digest = hashlib.sha1(','.join(last_dates).encode())
+        digest.update(np.ascontiguousarray(fields['Close'][-1:]).tobytes() if symbols else b'')
+        self.bar_key = digest.hexdigest()
+        self._latest: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def latest(self, names: List[str]) -> Dict[str, np.ndarray]:
+        """Latest-bar values of each indicator, one per symbol."""
+        with self._lock:
+            missing = [name for name in names if name not in self._latest]
+            if missing:
+                frame = IndicatorFrame(self.fields)
+                # Flat windows divide by zero; NaN/inf simply never match
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    for name in missing:
+                        self._latest[name] = frame[name][-1].copy() if self.symbols else np.empty(0)
+            return {name: self._latest[name] for name in names}
+
+
+def _fetch(provider: DataProvider, symbol: str, period: str):
+    try:
+        hist = provider.history(symbol, period=period)
+    except (ValueError, KeyError, ConnectionError, TimeoutError) as e:
+        logger.warning("Skipping %s in screen universe: %s", symbol, e)
+        return None
+    return hist if hist is not None and not hist.empty else None
+
+
+def build_panel(symbols: List[str], period: str = SCREEN_PERIOD,
+                provider: Optional[DataProvider] = None) -> ScreenPanel:
+    """
+    Fetch every symbol's bars and right-align them into per-field matrices.
+
+    Args:
+        symbols (List[str]): Universe to load
+        period (str): History window, long enough for the slowest indicator
+        provider (DataProvider): Data source (defaults to the configured one)
+
+    Returns:
+        ScreenPanel: Symbols with data and their OHLCV matrices
+    """
+    provider = provider or get_data_provider()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, SCREEN_FETCH_WORKERS), thread_name_prefix="stoky-screen") as pool:
+        frames = list(pool.map(lambda s: _fetch(provider, s, period), symbols))
+
+    loaded = [(s, frame) for s, frame in zip(symbols, frames) if frame is not None]
+    bars = max((len(frame) for _, frame in loaded), default=0)
+    fields = {field: np.full((bars, len(loaded)), np.nan) for field in OHLCV_COLUMNS}
+    for j, (_, frame) in enumerate(loaded):
+        for field in OHLCV_COLUMNS:
+            fields[field][bars - len(frame):, j] = frame[field].to_numpy(dtype=np.float64)
+
+    logger.info("Loaded screen panel of %d/%d symbols x %d bars in %.2fs",
+                len(loaded), len(symbols), bars, time.perf_counter() - start)
+    return ScreenPanel([s for s, _ in loaded], fields,
+                       [frame.index[-1].strftime('%Y-%m-%d') for _, frame in loaded])
+
+
+# Condition parsing: OR of ANDs of (NOT) comparisons
+
+_TOKEN = re.compile(r'\s*(?:(?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)|(?P<name>[A-Za-z_][A-Za-z0-9_]*)'
+                    r'|(?P<op><=|>=|==|!=|<|>|=)|(?P<paren>[()]))')
+_COMPARE = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+    '=': np.equal, '==': np.equal, '!=': np.not_equal,
+}
+
+
+class Condition:
+    """
+    A parsed screen condition.
+
+    Attributes:
+        tree: Nested ('and' | 'or', left, right), ('not', operand) and
+            ('cmp', op, left, right) tuples; operands are ('ind', name) or
+            ('num', value)
+        indicators: Canonical names of the indicators it references
+        text: Canonical text, used as the cache key
+    """
+
+    def __init__(self, text: str):
+        self._tokens = self._tokenize(text)
+        self._position = 0
+        self.indicators: List[str] = []
+        self.tree = self._or()
+        if self._position != len(self._tokens):
+            raise ValueError(f"Unexpected '{self._tokens[self._position][1]}' in condition")
+        self.text = self._render(self.tree)
+
+    @staticmethod
+    def _tokenize(text: str) -> List[Tuple[str, str]]:
+        tokens, position = [], 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match or match.end() == position:
+                raise ValueError(f"Cannot parse condition at '{text[position:position + 10]}'")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == 'name' and value.upper() in ('AND', 'OR', 'NOT'):
+                kind, value = 'keyword', value.upper()
+            tokens.append((kind, value))
+            position = match.end()
+        if not tokens:
+            raise ValueError("Condition is empty")
+        return tokens
+
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self._tokens[self._position] if self._position < len(self._tokens) else (None, None)
+
+    def _take(self) -> Tuple[str, str]:
+        if self._position >= len(self._tokens):
+            raise ValueError("Condition ends unexpectedly")
+        token = self._tokens[self._position]
+        self._position += 1
+        return token
+
+    def _or(self):
+        tree = self._and()
+        while self._peek() == ('keyword', 'OR'):
+            self._take()
+            tree = ('or', tree, self._and())
+        return tree
+
+    def _and(self):
+        tree = self._not()
+        while self._peek() == ('keyword', 'AND'):
+            self._take()
+            tree = ('and', tree, self._not())
+        return tree
+
+    def _not(self):
+        if self._peek() == ('keyword', 'NOT'):
+            self._take()
+            return ('not', self._not())
+        if self._peek() == ('paren', '('):
+            self._take()
+            tree = self._or()
+            if self._take() != ('paren', ')'):
+                raise ValueError("Missing ')' in condition")
+            return tree
+        left = self._operand()
+        kind, op = self._take()
+        if kind != 'op':
+            raise ValueError(f"Expected a comparison after {left[1]}, got '{op}'")
+        return ('cmp', op, left, self._operand())
+
+    def _operand(self):
+        kind, value = self._take()
+        if kind == 'number':
+            return ('num', float(value))
+        if kind == 'name':
+            name = canonical_indicator(value)
+            if name not in self.indicators:
+                self.indicators.append(name)
+            return ('ind', name)
+        raise ValueError(f"Expected an indicator or number, got '{value}'")
+
+    def _render(self, tree) -> str:
+        kind = tree[0]
+        if kind in ('and', 'or'):
+            return f"({self._render(tree[1])} {kind.upper()} {self._render(tree[2])})"
+        if kind == 'not':
+            return f"NOT {self._render(tree[1])}"
+        if kind == 'cmp':
+            op = '==' if tree[1] == '=' else tree[1]
+            return f"{self._render(tree[2])}{op}{self._render(tree[3])}"
+        return tree[1] if kind == 'ind' else repr(tree[1])
+
+    def evaluate(self, values: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        """Boolean mask of the symbols matching, given each indicator's latest values."""
+        def operand(node):
+            return values[node[1]] if node[0] == 'ind' else np.full(size, node[1])
+
+        def walk(node) -> Tuple[np.ndarray, np.ndarray]:
+            """The node's mask, and where every operand it references is finite."""
+            kind = node[0]
+            if kind in ('and', 'or'):
+                left, left_valid = walk(node[1])
+                right, right_valid = walk(node[2])
+                return (left & right if kind == 'and' else left | right), left_valid & right_valid
+            if kind == 'not':
+                # Negating a comparison with NaN must not turn it into a match
+                result, valid = walk(node[1])
+                return ~result & valid, valid
+            # Comparisons with NaN (not enough history) are False
+            left, right = operand(node[2]), operand(node[3])
+            with np.errstate(invalid='ignore'):
+                return _COMPARE[node[1]](left, right), np.isfinite(left) & np.isfinite(right)
+
+        return walk(self.tree)[0]
+
+
+def load_universe(path: str = SCREEN_UNIVERSE) -> List[str]:
+    """Symbols listed in ``path``, or every symbol in the symbol directory."""
+    if not path:
+        return get_symbol_directory().symbols()
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    if rows and rows[0] and rows[0][0].strip().lower() == 'symbol':
+        rows = rows[1:]
+    return list(dict.fromkeys(row[0].strip().upper() for row in rows if row and row[0].strip()))
+
+
+_panel_cache = SWRCache('screen_panel', SCREEN_SOFT_TTL, SCREEN_HARD_TTL, max_entries=2)
+_results: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def get_panel(provider: Optional[DataProvider] = None) -> ScreenPanel:
+    """The cached universe panel (built on first use, refreshed in the background)."""
+    return _panel_cache.get((SCREEN_UNIVERSE, SCREEN_PERIOD),
+                            lambda: build_panel(load_universe(), SCREEN_PERIOD, provider))
+
+
+def _json_float(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def screen(condition: str, panel: Optional[ScreenPanel] = None) -> Dict[str, Any]:
+    """
+    Symbols of the universe whose latest bar satisfies ``condition``.
+
+    Args:
+        condition (str): e.g. 'RSI<30 AND Price_SMA_200_Ratio>1'
+        panel (ScreenPanel): Universe to screen (defaults to the cached panel)
+
+    Returns:
+        Dict[str, Any]: The canonical condition, universe size, last bar date
+            and the matches with their indicator values, sorted by symbol
+
+    Raises:
+        ValueError: If the condition cannot be parsed
+    """
+    parsed = Condition(condition)
+    panel = panel or get_panel()
+
+    key = (parsed.text, panel.bar_key)
+    with _results_lock:
+        cached = _results.get(key)
+        if cached is not None:
+            _results.move_to_end(key)
+    record_cache('screen', cached is not None)
+    if cached is not None:
+        return cached
+
+    values = panel.latest(parsed.indicators)
+    mask = parsed.evaluate(values, len(panel.symbols))
+    matches = [
+        {
+            'symbol': panel.symbols[j],
+            'date': panel.last_dates[j],
+            # Indicators only referenced in an unmatched OR branch may be NaN
+            'values': {name: _json_float(values[name][j]) for name in parsed.indicators},
+        }
+        for j in np.flatnonzero(mask)
+    ]
+    result = {
+        'condition': parsed.text,
+        'as_of': panel.as_of,
+        'universe_size': len(panel.symbols),
+        'matches': matches,
+    }
+    with _results_lock:
+        _results[key] = result
+        while len(_results) > SCREEN_RESULT_CACHE_SIZE:
+            _results.popitem(last=False)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen the symbol universe with an indicator condition")
+    parser.add_argument("condition", help="e.g. 'RSI<30 AND Price_SMA_200_Ratio>1'")
+    args = parser.parse_args()
+
+    result = screen(args.condition)
+    print(f"{result['condition']}: {len(result['matches'])} of {result['universe_size']} symbols "
+          f"(as of {result['as_of']})")
+    for match in result['matches']:
+        values = ", ".join(f"{name}={value:.4g}" for name, value in match['values'].items())
+        print(f"  {match['symbol']:<12} {values}")
+
+
+if __name__ == "__main__":
+    main()
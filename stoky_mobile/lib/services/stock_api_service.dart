@@ -88,22 +88,117 @@ class ApiService {
     }
   }
 
+  // Last history response per symbol and period, kept up to date with the
+  // server's `since` cursor so a refresh only downloads the newest bars
+  static final Map<String, Map<String, dynamic>> _historyCache = {};
+
+  // The bars of [bars] (sorted by date) that [period] covers, counted back from
+  // the last bar the way the server slices periods, so merged deltas do not
+  // grow the view past its period
+  static List<Map<String, dynamic>> _trimToPeriod(
+      List<Map<String, dynamic>> bars, String period) {
+    if (bars.isEmpty || period == 'max') return bars;
+    final match = RegExp(r'^(\d+)(d|wk|mo|y)$').firstMatch(period);
+    if (match == null && period != 'ytd') return bars;
+
+    final last = DateTime.parse(bars.last['date'] as String);
+    DateTime start;
+    if (period == 'ytd') {
+      start = DateTime(last.year, 1, 1).subtract(const Duration(microseconds: 1));
+    } else {
+      final count = int.parse(match!.group(1)!);
+      switch (match.group(2)) {
+        case 'd':
+          // Day periods count bars
+          return bars.length > count ? bars.sublist(bars.length - count) : bars;
+        case 'wk':
+          start = last.subtract(Duration(days: 7 * count));
+          break;
+        case 'mo':
+          start = _monthsBefore(last, count);
+          break;
+        default:
+          start = _monthsBefore(last, 12 * count);
+      }
+    }
+    return bars
+        .where((bar) => DateTime.parse(bar['date'] as String).isAfter(start))
+        .toList();
+  }
+
+  // [date] moved back [months] months, clamped to the end of a shorter month
+  // (Mar 31 minus one month is the last day of February, as on the server)
+  static DateTime _monthsBefore(DateTime date, int months) {
+    final firstOfMonth = DateTime(date.year, date.month - months, 1);
+    final daysInMonth = DateTime(firstOfMonth.year, firstOfMonth.month + 1, 0).day;
+    return DateTime(firstOfMonth.year, firstOfMonth.month,
+        date.day < daysInMonth ? date.day : daysInMonth, date.hour, date.minute);
+  }
+
   static Future<Map<String, dynamic>?> getHistoricalData(String symbol,
       {String period = '1mo'}) async {
+    final key = '$symbol|$period';
+    final cached = _historyCache[key];
+    final cursor = cached?['cursor'];
     try {
+      final query = cursor == null
+          ? 'period=$period'
+          : 'period=$period&since=${Uri.encodeQueryComponent(cursor)}';
       final response = await http.get(
-        Uri.parse('$baseUrl/history/$symbol?period=$period'),
+        Uri.parse('$baseUrl/stock/history/$symbol?$query'),
         headers: {'Content-Type': 'application/json'},
       ).timeout(const Duration(seconds: 10));
 
       if (response.statusCode == 200) {
-        return json.decode(response.body);
+        final Map<String, dynamic> data = json.decode(response.body);
+        if (cached != null && cursor != null && data['revised'] != true) {
+          // A delta: new bars replace cached ones from the first returned date on
+          final delta = List<Map<String, dynamic>>.from(data['data']);
+          final first = delta.isEmpty ? null : delta.first['date'] as String;
+          final merged = List<Map<String, dynamic>>.from(cached['data'])
+              .where((bar) => first == null || (bar['date'] as String).compareTo(first) < 0)
+              .toList()
+            ..addAll(delta);
+          final bars = _trimToPeriod(merged, period);
+          data['data'] = bars;
+          data['total_records'] = bars.length;
+        }
+        _historyCache[key] = data;
+        return data;
+      } else if (response.statusCode == 400 && cursor != null) {
+        // Cursor no longer understood by the server: start over
+        _historyCache.remove(key);
+        return getHistoricalData(symbol, period: period);
       } else {
         print('Error fetching historical data: ${response.statusCode}');
-        return null;
+        return cached;
       }
     } catch (e) {
       print('Error fetching historical data: $e');
+      return cached;
+    }
+  }
+
+  // Info, chart history and prediction in one request, derived from a single
+  // server-side fetch. Each section is null unless listed in [sections].
+  static Future<Map<String, dynamic>?> getDashboard(String symbol,
+      {List<String> sections = const ['info', 'history', 'prediction'],
+      String period = '1mo'}) async {
+    try {
+      final response = await http.get(
+        Uri.parse(
+            '$baseUrl/stock/dashboard/$symbol?sections=${sections.join(',')}&period=$period'),
+        headers: {'Content-Type': 'application/json'},
+      ).timeout(const Duration(seconds: 30));
+
+      if (response.statusCode == 200) {
+        return json.decode(response.body);
+      } else {
+        print('Error fetching dashboard: ${response.statusCode}');
+        return null;
+      }
+    } catch (e) {
+      print('Error fetching dashboard: $e');
       return null;
     }
   }
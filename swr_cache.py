@@ -0,0 +1,223 @@
+"""
+Stale-while-revalidate caching for upstream-backed data.
+
+Every cached value has two ages that matter:
+
+- younger than the **soft TTL** it is simply served
+- between the soft and **hard TTL** it is served immediately and refreshed in
+  the background (one refresh per key at a time)
+- past the hard TTL it is refreshed before serving; if that fails because the
+  upstream is unavailable (``OSError``: connection errors, timeouts, an open
+  circuit, throttling) the old value is served anyway and flagged stale
+
+Stale serves are recorded in the ``served_stale`` context variable, which the
+request middleware sets per request so endpoints can report ``stale: true``.
+A value computed from stale inputs stays flagged for as long as it is cached.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Optional, Set, Tuple
+
+from metrics import record_cache, record_refresh, record_stale
+
+logger = logging.getLogger(__name__)
+
+SWR_CACHE_SIZE = int(os.getenv("SWR_CACHE_SIZE", "1024"))
+SWR_REFRESH_WORKERS = int(os.getenv("SWR_REFRESH_WORKERS", "2"))
+
+# Names of the data sources served stale to the current request
+served_stale: ContextVar[Optional[Set[str]]] = ContextVar('served_stale', default=None)
+
+
+def mark_stale(source: str):
+    """Record that ``source`` data past its hard TTL was served to the current request."""
+    stale = served_stale.get()
+    if stale is not None:
+        stale.add(source)
+
+
+def is_stale() -> bool:
+    """True if any data served to the current request was stale."""
+    return bool(served_stale.get())
+
+
+_refresh_pool = ThreadPoolExecutor(max_workers=max(1, SWR_REFRESH_WORKERS), thread_name_prefix="stoky-refresh")
+_refreshing: Set[Hashable] = set()
+_refreshing_lock = threading.Lock()
+
+
+def _claim(key: Hashable) -> bool:
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+        return True
+
+
+def _release(key: Hashable):
+    with _refreshing_lock:
+        _refreshing.discard(key)
+
+
+def refresh_in_background(cache: str, key: Hashable, fn: Callable, *args, **kwargs) -> bool:
+    """
+    Run ``fn`` on the refresh pool unless a refresh of ``key`` in ``cache``
+    is already running. The call gets a fresh context, so its timings and
+    stale marks are not attributed to the request that triggered it.
+
+    Returns:
+        bool: True if a refresh was scheduled
+    """
+    claim = (cache, key)
+    if not _claim(claim):
+        return False
+
+    def run():
+        try:
+            fn(*args, **kwargs)
+            record_refresh(cache, True)
+        except Exception as e:
+            record_refresh(cache, False)
+            logger.warning("Background refresh of %s %s failed: %s", cache, key, e)
+        finally:
+            _release(claim)
+
+    _refresh_pool.submit(contextvars.Context().run, run)
+    return True
+
+
+class SWRCache:
+    """
+    In-memory stale-while-revalidate cache with a sync and an async loader API.
+
+    ``None`` results are not cached. Loader errors other than upstream
+    failures past the hard TTL propagate to the caller.
+    """
+
+    def __init__(self, name: str, soft_ttl: float, hard_ttl: float, max_entries: int = SWR_CACHE_SIZE):
+        self.name = name
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.max_entries = max_entries
+        # key -> (stored at, value, stale sources of the inputs)
+        self._entries: Dict[Hashable, Tuple[float, Any, FrozenSet[str]]] = {}
+        self._lock = threading.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _lookup(self, key: Hashable) -> Tuple[Optional[Tuple[float, Any, FrozenSet[str]]], float]:
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry[0] if entry is not None else float('inf')
+        return entry, age
+
+    def _serve(self, entry: Tuple[float, Any, FrozenSet[str]]) -> Any:
+        for source in entry[2]:
+            mark_stale(source)
+        return entry[1]
+
+    def _put(self, key: Hashable, value: Any, stale: FrozenSet[str]):
+        if value is None:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic(), value, stale)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Run ``loader``, collecting the stale marks it makes, and cache the result."""
+        outer = served_stale.get()
+        token = served_stale.set(set())
+        try:
+            value = loader()
+            stale = frozenset(served_stale.get())
+        finally:
+            served_stale.reset(token)
+        self._put(key, value, stale)
+        if outer is not None:
+            outer.update(stale)
+        return value
+
+    async def _aload(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        outer = served_stale.get()
+        token = served_stale.set(set())
+        try:
+            value = await loader()
+            stale = frozenset(served_stale.get())
+        finally:
+            served_stale.reset(token)
+        self._put(key, value, stale)
+        if outer is not None:
+            outer.update(stale)
+        return value
+
+    def _serve_stale(self, entry, error: Exception) -> Any:
+        logger.warning("Serving stale %s after failed refresh: %s", self.name, error)
+        record_stale(self.name)
+        mark_stale(self.name)
+        return self._serve(entry)
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Cached value for ``key``, loading or refreshing it with ``loader`` as
+        its age requires.
+        """
+        entry, age = self._lookup(key)
+        record_cache(self.name, age < self.hard_ttl)
+        if age < self.soft_ttl:
+            return self._serve(entry)
+        if age < self.hard_ttl:
+            refresh_in_background(self.name, key, self._load, key, loader)
+            return self._serve(entry)
+
+        if entry is None:
+            return self._load(key, loader)
+        try:
+            return self._load(key, loader)
+        except OSError as e:
+            return self._serve_stale(entry, e)
+
+    async def aget(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """``get`` for coroutine loaders; background refreshes run as event-loop tasks."""
+        entry, age = self._lookup(key)
+        record_cache(self.name, age < self.hard_ttl)
+        if age < self.soft_ttl:
+            return self._serve(entry)
+        if age < self.hard_ttl:
+            if _claim((self.name, key)):
+                # Tasks copy the current context when created: create it inside an
+                # empty one so the refresh is not billed to this request
+                # (create_task's context argument needs Python 3.11)
+                task = contextvars.Context().run(
+                    asyncio.get_running_loop().create_task, self._arefresh(key, loader)
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return self._serve(entry)
+
+        if entry is None:
+            return await self._aload(key, loader)
+        try:
+            return await self._aload(key, loader)
+        except OSError as e:
+            return self._serve_stale(entry, e)
+
+    async def _arefresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        try:
+            await self._aload(key, loader)
+            record_refresh(self.name, True)
+        except Exception as e:
+            record_refresh(self.name, False)
+            logger.warning("Background refresh of %s %s failed: %s", self.name, key, e)
+        finally:
+            _release((self.name, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
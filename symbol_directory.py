@@ -0,0 +1,203 @@
+"""
+Symbol directory: exchange and currency resolution plus prefix search.
+
+A symbol's exchange is its Yahoo suffix (``PETR4.SA``, ``RY.TO``, ``7203.T``),
+split off once with ``rpartition`` and looked up in ``EXCHANGES``. Symbols
+without a known suffix (``AAPL``, ``BRK-B``) are US listings.
+
+``SymbolDirectory`` loads a CSV of ``symbol,name`` rows (``SYMBOL_LIST_PATH``)
+into two sorted key lists, one of symbols and one of every word-aligned tail
+of the company names ("BANK OF AMERICA CORPORATION", "AMERICA
+CORPORATION", ...). A prefix query is a binary search into each list plus a
+short scan, so autocomplete costs microseconds regardless of list size.
+"""
+
+import bisect
+import csv
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_LIST_PATH = os.getenv("SYMBOL_LIST_PATH", "./symbols.csv")
+
+_APOSTROPHES = re.compile(r"['\u2019]")
+_NON_WORD = re.compile(r'[^A-Z0-9&]+')
+
+
+class Exchange(NamedTuple):
+    name: str
+    currency: str
+    # ``currency`` per quoted price unit (London quotes are in pence)
+    price_scale: float = 1.0
+
+
+# Yahoo symbol suffix -> exchange; '' is the default for unsuffixed symbols
+EXCHANGES: Dict[str, Exchange] = {
+    '': Exchange('NASDAQ/NYSE', 'USD'),
+    'SA': Exchange('B3 (São Paulo)', 'BRL'),
+    'L': Exchange('London Stock Exchange', 'GBP', 0.01),
+    'T': Exchange('Tokyo Stock Exchange', 'JPY'),
+    'TO': Exchange('Toronto Stock Exchange', 'CAD'),
+    'AX': Exchange('Australian Securities Exchange', 'AUD'),
+    'SW': Exchange('Swiss Exchange', 'CHF'),
+    'PA': Exchange('Euronext Paris', 'EUR'),
+    'AS': Exchange('Euronext Amsterdam', 'EUR'),
+    'BR': Exchange('Euronext Brussels', 'EUR'),
+    'MI': Exchange('Borsa Italiana', 'EUR'),
+    'HK': Exchange('Hong Kong Stock Exchange', 'HKD'),
+    'SS': Exchange('Shanghai Stock Exchange', 'CNY'),
+    'SZ': Exchange('Shenzhen Stock Exchange', 'CNY'),
+    'KS': Exchange('Korea Exchange', 'KRW'),
+    'BO': Exchange('Bombay Stock Exchange', 'INR'),
+    'NS': Exchange('National Stock Exchange of India', 'INR'),
+    'MX': Exchange('Mexican Stock Exchange', 'MXN'),
+}
+
+
+def split_symbol(symbol: str) -> Tuple[str, str]:
+    """
+    Split a symbol into its base and exchange suffix.
+
+    Args:
+        symbol (str): Stock symbol (e.g., 'RY.TO', 'AAPL')
+
+    Returns:
+        Tuple[str, str]: Upper-cased base and suffix ('' for US listings and
+            unknown suffixes such as share classes)
+    """
+    symbol = symbol.strip().upper()
+    base, dot, suffix = symbol.rpartition('.')
+    if dot and suffix in EXCHANGES:
+        return base, suffix
+    return symbol, ''
+
+
+def exchange_for(symbol: str) -> Exchange:
+    """Exchange (name and trading currency) a symbol is listed on."""
+    return EXCHANGES[split_symbol(symbol)[1]]
+
+
+def _normalise(text: str) -> str:
+    """Upper-case, strip accents, join apostrophes and collapse other punctuation to spaces."""
+    decomposed = unicodedata.normalize('NFKD', _APOSTROPHES.sub('', text))
+    plain = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', plain.upper()).strip()
+
+
+class SymbolEntry(NamedTuple):
+    symbol: str
+    name: str
+    exchange: str
+    currency: str
+
+
+class SymbolDirectory:
+    """
+    Known symbols with prefix search over symbols and company names.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str]]):
+        self._entries: Dict[str, SymbolEntry] = {}
+        for symbol, name in rows:
+            symbol = symbol.strip().upper()
+            if not symbol:
+                continue
+            exchange = exchange_for(symbol)
+            self._entries[symbol] = SymbolEntry(symbol, name.strip() or symbol, exchange.name, exchange.currency)
+
+        self._symbols = sorted(self._entries)
+        tails = set()
+        for entry in self._entries.values():
+            words = _normalise(entry.name).split()
+            for i in range(len(words)):
+                tails.add((' '.join(words[i:]), entry.symbol))
+        self._tails: List[Tuple[str, str]] = sorted(tails)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "SymbolDirectory":
+        """
+        Load a ``symbol,name`` CSV (header row required). A missing file gives
+        an empty directory.
+        """
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = [(row['symbol'], row.get('name') or '') for row in csv.DictReader(f)]
+        except FileNotFoundError:
+            logger.warning("Symbol list %s not found, search will return no results", path)
+            rows = []
+        directory = cls(rows)
+        logger.info("Loaded %d symbols from %s", len(directory), path)
+        return directory
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def symbols(self) -> List[str]:
+        """Every known symbol, sorted."""
+        return list(self._symbols)
+
+    def get(self, symbol: str) -> Optional[SymbolEntry]:
+        return self._entries.get(symbol.strip().upper())
+
+    def search(self, query: str, limit: int = 10) -> List[SymbolEntry]:
+        """
+        Symbols whose ticker or company name starts with ``query``.
+
+        An exact ticker match comes first, then ticker prefix matches, then
+        name matches, each in alphabetical order.
+
+        Args:
+            query (str): Ticker or name prefix, any case ('pet', 'RY.', 'bank of')
+            limit (int): Maximum results
+
+        Returns:
+            List[SymbolEntry]: Up to ``limit`` matches
+        """
+        results: List[SymbolEntry] = []
+        seen = set()
+
+        def add(symbol: str) -> bool:
+            if symbol not in seen:
+                seen.add(symbol)
+                results.append(self._entries[symbol])
+            return len(results) >= limit
+
+        prefix = query.strip().upper()
+        if not prefix or limit <= 0:
+            return results
+        if prefix in self._entries and add(prefix):
+            return results
+
+        i = bisect.bisect_left(self._symbols, prefix)
+        while i < len(self._symbols) and self._symbols[i].startswith(prefix):
+            if add(self._symbols[i]):
+                return results
+            i += 1
+
+        name_prefix = _normalise(query)
+        if name_prefix:
+            i = bisect.bisect_left(self._tails, (name_prefix, ''))
+            while i < len(self._tails) and self._tails[i][0].startswith(name_prefix):
+                if add(self._tails[i][1]):
+                    return results
+                i += 1
+        return results
+
+
+_directory: Optional[SymbolDirectory] = None
+_directory_lock = threading.Lock()
+
+
+def get_symbol_directory() -> SymbolDirectory:
+    """Return the process-wide directory, loading ``SYMBOL_LIST_PATH`` on first use."""
+    global _directory
+    if _directory is None:
+        with _directory_lock:
+            if _directory is None:
+                _directory = SymbolDirectory.from_csv(SYMBOL_LIST_PATH)
+    return _directory
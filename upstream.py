@@ -0,0 +1,345 @@
+"""
+Rate budget, concurrency limit and retries for calls to the market-data upstream.
+
+Every remote provider runs its upstream calls through an ``UpstreamGovernor``:
+
+- a token bucket (``UPSTREAM_RATE`` calls per second, bursts of
+  ``UPSTREAM_BURST``) whose state lives in a small file under
+  ``UPSTREAM_STATE_DIR`` and is updated under a file lock, so all workers on
+  the machine draw from one budget
+- at most ``UPSTREAM_MAX_CONCURRENCY`` calls in flight per worker, which is
+  also the size of the HTTP connection pool
+- retries with jittered exponential backoff on 429, 5xx and connection errors
+  (``MAX_RETRIES`` of them). A 429 also drains the shared bucket for the
+  ``Retry-After`` interval, so the other workers back off too.
+- a circuit breaker that opens after ``UPSTREAM_BREAKER_FAILURES`` failed
+  attempts in a row. While it is open calls fail immediately instead of
+  queueing against a dead upstream; after ``UPSTREAM_BREAKER_COOLDOWN``
+  seconds one probe call is let through and its outcome closes or reopens it.
+
+Calls refused by the breaker raise ``UpstreamUnavailable`` and calls still
+throttled after the last retry raise ``UpstreamThrottled`` (a subclass). The
+caches serve stale data for either, and the API otherwise reports them as 503
+with a ``Retry-After`` header instead of a 500.
+"""
+
+import logging
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import (
+    observe_stage, record_upstream_rejected, record_upstream_retry, record_upstream_throttled,
+    set_circuit_open
+)
+from utils import file_lock
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "5"))
+UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", "10"))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "4"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "10"))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+UPSTREAM_STATE_DIR = os.getenv("UPSTREAM_STATE_DIR", os.path.join(tempfile.gettempdir(), "stoky-upstream"))
+
+# Bucket file: tokens available and the wall-clock time they were counted
+_BUCKET_STATE = struct.Struct('<dd')
+
+
+class UpstreamUnavailable(ConnectionError):
+    """The upstream cannot be called now; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamThrottled(UpstreamUnavailable):
+    """The upstream kept answering 429 after every retry."""
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every process that uses the same state file.
+
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.path = path
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+
+    def _update(self, change: Callable[[float, float], Tuple[float, float]]) -> float:
+        """
+        Apply ``change(tokens, now) -> (tokens, result)`` to the stored state
+        under the file lock and return ``result``.
+        """
+        with file_lock(f"{self.path}.lock"):
+            now = time.time()
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                raw = os.read(fd, _BUCKET_STATE.size)
+                if len(raw) == _BUCKET_STATE.size:
+                    tokens, updated = _BUCKET_STATE.unpack(raw)
+                    tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+                else:
+                    tokens = self.burst
+                tokens, result = change(tokens, now)
+                os.pwrite(fd, _BUCKET_STATE.pack(tokens, now), 0)
+            finally:
+                os.close(fd)
+        return result
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        def take(tokens, now):
+            if tokens >= 1:
+                return tokens - 1, 0.0
+            return tokens, (1 - tokens) / self.rate
+
+        waited = 0.0
+        while True:
+            wait = self._update(take)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def drain(self, seconds: float):
+        """Empty the bucket so no call is allowed for ``seconds``."""
+        if self.rate > 0:
+            self._update(lambda tokens, now: (min(tokens, 0.0) - seconds * self.rate, 0.0))
+
+
+def _retry_after(response) -> Optional[float]:
+    """``Retry-After`` in seconds (the delta-seconds form only)."""
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def classify_failure(exc: Exception) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Decide whether a failed upstream call is worth retrying.
+
+    Works for ``requests``, ``curl_cffi`` (yfinance) and yfinance's own
+    rate-limit error.
+
+    Returns:
+        Tuple[Optional[str], Optional[float]]: Retry reason ('throttled',
+        'server_error' or 'connection', None when the call should not be
+        retried) and the upstream's ``Retry-After`` if it sent one
+    """
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is not None:
+        if status == 429:
+            return 'throttled', _retry_after(response)
+        if status >= 500:
+            return 'server_error', _retry_after(response)
+        return None, None
+    if type(exc).__name__ == 'YFRateLimitError':
+        return 'throttled', None
+    if isinstance(exc, (OSError, TimeoutError)):
+        # requests and curl_cffi exceptions are OSErrors
+        return 'connection', None
+    return None, None
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker (closed, open, then half-open with a
+    single probe call).
+    """
+
+    def __init__(self, name: str, failure_threshold: int = UPSTREAM_BREAKER_FAILURES,
+                 cooldown: float = UPSTREAM_BREAKER_COOLDOWN):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are refused (open and cooling down, or a probe is out)."""
+        opened_at = self.opened_at
+        return opened_at is not None and (self._probing or time.monotonic() - opened_at < self.cooldown)
+
+    def retry_after(self) -> float:
+        opened_at = self.opened_at
+        if opened_at is None:
+            return 0.0
+        return max(1.0, self.cooldown - (time.monotonic() - opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; claims the probe when half-open."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("%s circuit closed", self.name)
+                set_circuit_open(self.name, False)
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    logger.warning("%s circuit opened after %d failures", self.name, self.failures)
+                    set_circuit_open(self.name, True)
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class UpstreamGovernor:
+    """
+    Rate budget, concurrency limit, retry policy and circuit breaker for one
+    upstream.
+    """
+
+    def __init__(self, name: str, rate: float = UPSTREAM_RATE, burst: float = UPSTREAM_BURST,
+                 max_concurrency: int = UPSTREAM_MAX_CONCURRENCY, max_retries: int = UPSTREAM_MAX_RETRIES,
+                 backoff_base: float = UPSTREAM_BACKOFF_BASE, backoff_max: float = UPSTREAM_BACKOFF_MAX,
+                 state_dir: str = UPSTREAM_STATE_DIR, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(os.path.join(state_dir, f"{name}.bucket"), rate, burst)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before retry number ``attempt + 1``: full jitter over an
+        exponentially growing window, or the upstream's ``Retry-After`` plus
+        a little jitter when it sent one.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max) + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run one upstream call within the rate budget and concurrency limit,
+        retrying transient failures.
+
+        Args:
+            operation (str): Label for metrics and logs ('history', 'fundamentals')
+            fn (Callable): The call, raising on failure
+
+        Returns:
+            Any: Whatever ``fn`` returns
+
+        Raises:
+            UpstreamUnavailable: If the circuit breaker is open
+            UpstreamThrottled: If the upstream still throttles after the last retry
+        """
+        for attempt in range(self.max_retries + 1):
+            # Fail fast rather than wait for a token or a slot behind a dead upstream
+            if self.breaker.is_open:
+                self._reject(operation)
+            waited = self.bucket.acquire()
+            if waited > 0:
+                record_upstream_throttled(self.name, 'budget')
+                observe_stage('throttle', waited)
+
+            with self._slots:
+                if not self.breaker.allow():
+                    self._reject(operation)
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    reason, retry_after = classify_failure(e)
+                    if reason is None:
+                        # The upstream answered; the request itself was bad
+                        self.breaker.record_success()
+                        raise
+                    self.breaker.record_failure()
+                    error = e
+                else:
+                    self.breaker.record_success()
+                    return result
+
+            if reason == 'throttled':
+                record_upstream_throttled(self.name, 'upstream')
+                self.bucket.drain(retry_after if retry_after is not None else self.backoff_base)
+            if attempt == self.max_retries:
+                break
+
+            delay = self.backoff(attempt, retry_after)
+            record_upstream_retry(self.name, operation, reason)
+            logger.warning("%s %s failed (%s: %s), retry %d/%d in %.2fs",
+                           self.name, operation, reason, error, attempt + 1, self.max_retries, delay)
+            time.sleep(delay)
+
+        if reason == 'throttled':
+            raise UpstreamThrottled(f"{self.name} is throttling {operation} calls",
+                                    retry_after if retry_after is not None else self.backoff_max) from error
+        raise error
+
+    def _reject(self, operation: str):
+        record_upstream_rejected(self.name)
+        raise UpstreamUnavailable(f"{self.name} circuit is open, not calling {operation}",
+                                  self.breaker.retry_after())
+
+
+def http_session(pool_size: int = UPSTREAM_MAX_CONCURRENCY):
+    """
+    ``requests.Session`` with a connection pool sized for ``pool_size``
+    concurrent calls and no retries of its own (the governor retries).
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = 'Mozilla/5.0 (stoky)'
+    return session
+
+
+_governors: Dict[str, UpstreamGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(name: str) -> UpstreamGovernor:
+    """Return the process-wide governor for the upstream ``name``."""
+    governor = _governors.get(name)
+    if governor is None:
+        with _governors_lock:
+            governor = _governors.setdefault(name, UpstreamGovernor(name))
+    return governor
@@ -3,11 +3,20 @@ Utility functions for the Stock Advisor backend.
 Contains helper functions for data validation, formatting, and common operations.
 """
 
+import os
 import re
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows: locks only cover threads of this process
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 def validate_stock_symbol(symbol: str) -> tuple[bool, str]:
@@ -210,3 +219,76 @@ def get_market_status() -> dict:
         "next_market_open": "Next business day 9:30 AM EST" if not is_market_hours else "Market is open",
         "note": "This is a simplified market status check"
     }
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on ``path`` across threads and worker processes.
+    
+    Uses ``fcntl.flock`` on a lock file, so every worker on the machine that
+    locks the same path is serialised. Without ``fcntl`` (Windows) only threads
+    of the current process are.
+    
+    Args:
+        path (str): Lock file path, created if missing
+    """
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+    
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class MappedLRU:
+    """
+    Least-recently-used cache of memory-mapped values, bounded by the number
+    of files they map.
+    
+    Every mapping holds an open file descriptor, so caching them per symbol
+    or model without a bound runs into the process's ``ulimit -n``. Evicting
+    an entry only drops the cache's reference: the mappings are closed, and
+    their descriptors released, once no array viewing them is left.
+    """
+    
+    def __init__(self, max_files: int):
+        self.max_files = max_files
+        self.files = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The value cached under ``key`` (now the most recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, key: Hashable, value: Any, files: int):
+        """Cache ``value``, which maps ``files`` files, evicting the least recently used entries over the bound."""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.files -= previous[1]
+            self._entries[key] = (value, files)
+            self.files += files
+            # Always keep the newest entry, even if it alone exceeds the bound
+            while self.files > self.max_files and len(self._entries) > 1:
+                _, (_, evicted_files) = self._entries.popitem(last=False)
+                self.files -= evicted_files